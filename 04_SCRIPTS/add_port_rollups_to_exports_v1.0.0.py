@@ -7,9 +7,12 @@ Purpose:
 - Add Port_Consolidated, Port_Coast, Port_Region columns to export and clearance data
 - These are primary statistical rollup columns for analysis
 - Maps via port names to standardized port groupings
+- Port names and USACE codes resolve to the canonical integer Port_Key
+  (port_keys.py, each distinct string once) and rollups join on that key
 
 Input:
 - Port mapping: 01.01_dictionary/usace_to_census_port_mapping.csv
+  (plus 01_us_port_dictionary.csv and the ACE port codes, via port_keys.py)
 - Panjiva exports: 01_STAGE01_PREPROCESSING/01.01_annual_files/panjiva_exports_2023_PORTCALL_*.csv
 - USACE clearance: 02_STAGE02_CLASSIFICATION/usace_2023_clearance_with_panjiva_match_v1.0.0.csv
 
@@ -18,10 +21,13 @@ Output:
 - USACE clearance with port rollups
 """
 
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
 
+from port_keys import MISSING_KEY, PortKeyResolver, ROLLUP_COLUMNS
+
 print("="*80)
 print("ADD PORT ROLLUPS TO EXPORT/CLEARANCE DATA v1.0.0")
 print("="*80)
@@ -36,82 +42,21 @@ CLEARANCE_FILE = Path(r"G:\My Drive\LLM\project_manifest\02_STAGE02_CLASSIFICATI
 OUTPUT_EXPORT_DIR = EXPORT_DIR
 OUTPUT_CLEARANCE_FILE = Path(r"G:\My Drive\LLM\project_manifest\02_STAGE02_CLASSIFICATION\usace_2023_clearance_with_panjiva_match_v1.0.1.csv")
 
-# Load port mapping
-print("\n1. Loading port mapping dictionary...")
-port_map = pd.read_csv(PORT_MAPPING)
-print(f"   Port mappings loaded: {len(port_map):,}")
-
-# Create lookup dictionaries
-# For USACE ports (code-based)
-port_lookup_usace = {}
-for _, row in port_map.iterrows():
-    usace_port = str(row['USACE_PORT']).strip()
-    port_lookup_usace[usace_port] = {
-        'Port_Consolidated': row.get('Port_Consolidated', ''),
-        'Port_Coast': row.get('Port_Coast', ''),
-        'Port_Region': row.get('Port_Region', '')
-    }
-
-# For Panjiva ports (name-based - need fuzzy matching)
-# Use USACE_PORT_NAME column for matching
-port_lookup_name = {}
-for _, row in port_map.iterrows():
-    usace_name = str(row.get('USACE_PORT_NAME', '')).strip().upper()
-    if usace_name:
-        # Extract city portion for matching
-        city = usace_name.split(',')[0].strip()
-        city = city.replace('PORT OF ', '').replace('PORT ', '').replace('THE ', '')
-        port_lookup_name[city] = {
-            'Port_Consolidated': row.get('Port_Consolidated', ''),
-            'Port_Coast': row.get('Port_Coast', ''),
-            'Port_Region': row.get('Port_Region', '')
-        }
-
-print(f"   USACE port codes: {len(port_lookup_usace):,}")
-print(f"   Census port names: {len(port_lookup_name):,}")
-
-# Function to match Panjiva port names to USACE port names
-def match_port_name(panjiva_port):
-    """Match Panjiva port name to USACE port for rollup lookup"""
-    if pd.isna(panjiva_port) or panjiva_port == '':
-        return None, None, None
-
-    # Normalize the port name
-    port_str = str(panjiva_port).upper().strip()
-
-    # Extract city portion (first part before comma)
-    parts = port_str.split(',')
-    if len(parts) > 0:
-        city = parts[0].strip()
-        # Also try to get second part which might be city name
-        city2 = parts[1].strip() if len(parts) > 1 else None
-
-        # Clean city names
-        city = city.replace('PORT OF ', '').replace('PORT ', '').replace('THE ', '')
-        city = city.replace('ENTRY-', '').replace('PORT ENTRY-', '')
-
-        # Try exact match on first city
-        if city in port_lookup_name:
-            return (port_lookup_name[city]['Port_Consolidated'],
-                    port_lookup_name[city]['Port_Coast'],
-                    port_lookup_name[city]['Port_Region'])
-
-        # Try second part (e.g., "Port Freeport, Freeport, Texas" -> "FREEPORT")
-        if city2:
-            city2_clean = city2.replace('PORT OF ', '').replace('PORT ', '').replace('THE ', '')
-            if city2_clean in port_lookup_name:
-                return (port_lookup_name[city2_clean]['Port_Consolidated'],
-                        port_lookup_name[city2_clean]['Port_Coast'],
-                        port_lookup_name[city2_clean]['Port_Region'])
-
-        # Try partial matching
-        for port_name, rollup in port_lookup_name.items():
-            if city in port_name or port_name in city:
-                return rollup['Port_Consolidated'], rollup['Port_Coast'], rollup['Port_Region']
-            if city2 and (city2_clean in port_name or port_name in city2_clean):
-                return rollup['Port_Consolidated'], rollup['Port_Coast'], rollup['Port_Region']
-
-    return None, None, None
+# Load canonical port keys
+print("\n1. Loading port key dictionaries...")
+port_resolver = PortKeyResolver.load(mapping_file=PORT_MAPPING)
+port_rollups = port_resolver.rollups()[ROLLUP_COLUMNS]
+summary = port_resolver.summary()
+print(f"   Ports: {summary['ports']:,} ({summary['with_rollups']:,} with rollups)")
+print(f"   Name aliases: {summary['aliases']:,}")
+print(f"   USACE port codes: {summary['usace_codes']:,}")
+
+def add_rollups(frame, port_keys):
+    """Port_Key plus Port_Consolidated / Port_Coast / Port_Region joined on the integer key"""
+    frame['Port_Key'] = port_keys
+    rollups = port_rollups.reindex(frame['Port_Key'])
+    for col in ROLLUP_COLUMNS:
+        frame[col] = rollups[col].to_numpy()
 
 # Process Panjiva Exports
 print(f"\n2. Processing Panjiva export port call file...")
@@ -127,12 +72,9 @@ else:
     print(f"   Records: {len(exports):,}")
     print(f"   Current columns: {len(exports.columns)}")
 
-    # Add rollup columns using name matching
-    print(f"   Matching ports to rollup categories...")
-    rollup_results = exports['Port_of_Lading'].apply(match_port_name)
-    exports['Port_Consolidated'] = [r[0] for r in rollup_results]
-    exports['Port_Coast'] = [r[1] for r in rollup_results]
-    exports['Port_Region'] = [r[2] for r in rollup_results]
+    # Add rollup columns through the canonical port key
+    print(f"   Resolving {exports['Port_of_Lading'].nunique():,} distinct port names to port keys...")
+    add_rollups(exports, port_resolver.keys(exports['Port_of_Lading']))
 
     # Count matches
     matched = (exports['Port_Consolidated'].notna()).sum()
@@ -151,26 +93,25 @@ clearance = pd.read_csv(CLEARANCE_FILE, low_memory=False)
 print(f"   Records: {len(clearance):,}")
 print(f"   Current columns: {len(clearance.columns)}")
 
-# Add rollup columns (use PORT code if it exists)
-if 'PORT' in clearance.columns:
-    port_col = 'PORT'
-elif 'Clearance_Port' in clearance.columns:
-    port_col = 'Clearance_Port'
-else:
-    print("   WARNING: No port column found, trying name-based matching...")
-    port_col = None
-
+# Add rollup columns: the USACE PORT code is authoritative; records without one fall back
+# to the matcher's name-based Port_Key, else to the port name
+port_col = next((col for col in ('PORT', 'Clearance_Port') if col in clearance.columns), None)
 if port_col:
-    clearance[port_col] = clearance[port_col].astype(str).str.strip()
-    clearance['Port_Consolidated'] = clearance[port_col].map(lambda x: port_lookup_usace.get(x, {}).get('Port_Consolidated', ''))
-    clearance['Port_Coast'] = clearance[port_col].map(lambda x: port_lookup_usace.get(x, {}).get('Port_Coast', ''))
-    clearance['Port_Region'] = clearance[port_col].map(lambda x: port_lookup_usace.get(x, {}).get('Port_Region', ''))
+    print(f"   Resolving USACE port codes ({port_col})")
+    port_keys = port_resolver.code_keys(clearance[port_col])
 else:
-    # Fall back to name matching
-    rollup_results = clearance['Clearance_Port_Name'].apply(match_port_name)
-    clearance['Port_Consolidated'] = [r[0] for r in rollup_results]
-    clearance['Port_Coast'] = [r[1] for r in rollup_results]
-    clearance['Port_Region'] = [r[2] for r in rollup_results]
+    port_keys = np.full(len(clearance), MISSING_KEY, dtype=np.int64)
+no_code = port_keys == MISSING_KEY
+if no_code.any() and 'Port_Key' in clearance.columns:
+    print(f"   {no_code.sum():,} records without a port code: Port_Key from the matcher")
+    matcher_keys = clearance['Port_Key'].fillna(MISSING_KEY).astype('int64').to_numpy()
+    port_keys = np.where(no_code, matcher_keys, port_keys)
+elif no_code.any():
+    print(f"   WARNING: {no_code.sum():,} records without a port code, using name-based resolution...")
+    port_keys = np.where(no_code, port_resolver.keys(clearance['Clearance_Port_Name']), port_keys)
+add_rollups(clearance, port_keys)
+for col in ROLLUP_COLUMNS:
+    clearance[col] = clearance[col].fillna('')
 
 # Count matches
 matched = (clearance['Port_Consolidated'] != '').sum()
@@ -0,0 +1,154 @@
+"""
+Benchmark HS Code Extraction: Per-Row apply vs Vectorized hs_codes.py
+Version: 1.0.0
+Date: 2026-10-19
+
+Purpose:
+- Time the original per-row extract_hs_codes() apply against the shared
+  vectorized normalizer (add_hs_columns, string and integer-coded outputs)
+  on several million synthetic HS values
+- Values are drawn from hs6_lookup.csv in the formats Panjiva delivers:
+  "8471.30", numeric 8471.3, "847130", chapter-only, blank/NaN and a few
+  unknown codes
+- Agreement with the per-row output is reported; the known differences are
+  the short-heading fix ("101.21" -> "010121") and text after the code
+
+Input:
+- 01.01_dictionary/hs6_lookup.csv
+
+Output:
+- 01.01_dictionary/hs_codes_benchmark_{timestamp}.csv (or --output-dir)
+
+Usage:
+    python benchmark_hs_codes_v1.0.0.py --rows 5000000 [--repeats 3]
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from pathlib import Path
+
+from hs_codes import HS6_LOOKUP_FILE, HS_LEVELS, add_hs_columns, load_hs6_lookup
+from pipeline_common import DICT_PATH
+
+
+def extract_hs_codes_row(hs_code):
+    """Per-row HS2, HS4, HS6 (process_panjiva_exports_v1.0.0.py before hs_codes.py)"""
+    if pd.isna(hs_code):
+        return '', '', ''
+
+    hs_str = str(hs_code).replace('.', '').strip()
+    hs_str = hs_str.ljust(6, '0')
+
+    hs2 = hs_str[:2] if len(hs_str) >= 2 else ''
+    hs4 = hs_str[:4] if len(hs_str) >= 4 else ''
+    hs6 = hs_str[:6] if len(hs_str) >= 6 else ''
+
+    return hs2, hs4, hs6
+
+
+def best_time(func, repeats):
+    """Best-of-N wall time in seconds plus the last result"""
+    best = None
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def synthetic_hs_column(hs6_codes, rows, seed):
+    """Object column of raw HS values in mixed Panjiva formats"""
+    rng = np.random.default_rng(seed)
+    codes = np.asarray(sorted(hs6_codes), dtype=object)
+    formats = [
+        lambda c: f"{c[:4]}.{c[4:]}",                 # 8471.30
+        lambda c: float(f"{c[:4]}.{c[4:]}"),          # 8471.3 (numeric CSV read)
+        lambda c: c,                                  # 847130
+        lambda c: f"{c[:4]}.{c[4:]}00",               # 8471.3000 (10-digit tariff line)
+        lambda c: c[:2],                              # chapter only
+    ]
+    # Distinct raw values first (codes x formats), then a skewed draw of rows
+    values = [fmt(code) for code in codes for fmt in formats] + ['9999.99', 'N/A']
+    weights = rng.pareto(1.2, len(values)) + 1e-3
+    column = pd.Series(np.asarray(values, dtype=object)[rng.choice(len(values), rows, p=weights / weights.sum())])
+    column[rng.random(rows) < 0.02] = np.nan
+    return column
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-row and vectorized HS code extraction")
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--lookup', type=Path, default=HS6_LOOKUP_FILE)
+    parser.add_argument('--output-dir', type=Path, default=DICT_PATH)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+
+    print("=" * 80)
+    print("HS CODE EXTRACTION BENCHMARK v1.0.0 (PER-ROW vs VECTORIZED)")
+    print("=" * 80)
+
+    lookup = load_hs6_lookup(args.lookup)
+    column = synthetic_hs_column(lookup['HS6'], args.rows, args.seed)
+    print(f"\nSynthetic HS Code column: {len(column):,} rows, {column.nunique():,} distinct values")
+
+    def per_row():
+        return pd.DataFrame(column.apply(extract_hs_codes_row).tolist(), columns=list(HS_LEVELS))
+
+    def vectorized(as_int):
+        def run():
+            df = pd.DataFrame({'HS Code': column})
+            add_hs_columns(df, 'HS Code', lookup=lookup, as_int=as_int)
+            return df
+        return run
+
+    runs = {
+        'Per-row apply': per_row,
+        'Vectorized (strings)': vectorized(False),
+        'Vectorized (int-coded)': vectorized(True),
+    }
+
+    results = []
+    reference = None
+    for name, func in runs.items():
+        seconds, df = best_time(func, args.repeats)
+        if reference is None:
+            reference = df
+        hs6 = df['HS6'].to_numpy(dtype=object)
+        if pd.api.types.is_integer_dtype(df['HS6']):
+            hs6 = np.where(df['HS6'] < 0, '', df['HS6'].astype(str).str.zfill(6))
+        agreement = (hs6 == reference['HS6'].to_numpy(dtype=object)).mean()
+        results.append({
+            'Method': name,
+            'Rows': len(df),
+            'Seconds': round(seconds, 3),
+            'Rows_Per_Second': round(len(df) / seconds),
+            'Memory_MB': round(df[list(HS_LEVELS)].memory_usage(deep=True).sum() / 1024 ** 2, 1),
+            'HS6_Agreement': round(agreement, 4),
+        })
+        print(f"   {name:<24} {seconds:>8.3f}s  {len(df) / seconds:>14,.0f} rows/s")
+        if 'HS_Check' in df.columns and name == 'Vectorized (strings)':
+            print(f"      HS_Check: {df['HS_Check'].value_counts().to_dict()}")
+
+    report = pd.DataFrame(results)
+    report['Speedup_vs_Per_Row'] = (report.loc[0, 'Seconds'] / report['Seconds']).round(1)
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    report_file = args.output_dir / f"hs_codes_benchmark_{timestamp}.csv"
+    report.to_csv(report_file, index=False)
+
+    print("\n" + "=" * 80)
+    print("BENCHMARK SUMMARY")
+    print("=" * 80)
+    print(report.to_string(index=False))
+    print(f"\nReport: {report_file}")
+
+
+if __name__ == "__main__":
+    main()
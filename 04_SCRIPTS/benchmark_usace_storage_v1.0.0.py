@@ -0,0 +1,150 @@
+"""
+Benchmark USACE Storage: CSV vs Partitioned Parquet
+Version: 1.0.0
+Date: 2026-10-19
+
+Purpose:
+- Measure bytes on disk and load time for the transformed USACE files
+  as CSV against the Year/Direction/Port_Coast partitioned Parquet dataset
+- Time the reads downstream stages actually do: full partition, a column
+  subset (matching keys only), and a single-coast partition
+- Round-trip check: the CSV and Parquet full reads must give the same
+  columns and dtypes (IMO/PORT keys typed the same, so joins work across sources)
+
+Input:
+- 02_STAGE02_CLASSIFICATION/usace_{YEAR}_inbound_entrance_transformed_v2.2.0.csv
+- 02_STAGE02_CLASSIFICATION/usace_{YEAR}_outbound_clearance_transformed_v2.2.0.csv
+- 02_STAGE02_CLASSIFICATION/usace_transformed_parquet/ (built from the CSVs if missing)
+
+Output:
+- 02_STAGE02_CLASSIFICATION/usace_storage_benchmark_{timestamp}.csv
+
+Usage:
+    python benchmark_usace_storage_v1.0.0.py --year 2023 [--repeats 3]
+"""
+
+import argparse
+import time
+import pandas as pd
+from datetime import datetime
+from pathlib import Path
+
+from pipeline_common import (STAGE02_DIR, USACE_PARQUET_ROOT, compare_usace_sources, read_usace_table,
+                             write_usace_parquet)
+
+# Direction -> (transformed CSV label, date column, port name column)
+DIRECTIONS = {
+    'Inbound': ("inbound_entrance", 'Arrival_Date', 'Arrival_Port_Name'),
+    'Outbound': ("outbound_clearance", 'Clearance_Date', 'Clearance_Port_Name'),
+}
+
+
+def dir_size(path):
+    return sum(f.stat().st_size for f in Path(path).rglob('*') if f.is_file())
+
+
+def best_time(func, repeats):
+    """Best-of-N wall time in seconds plus the last result"""
+    best = None
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CSV and Parquet storage for transformed USACE data")
+    parser.add_argument('--year', type=int, default=2023)
+    parser.add_argument('--data-dir', type=Path, default=STAGE02_DIR)
+    parser.add_argument('--parquet-root', type=Path, default=None)
+    parser.add_argument('--coast', default='Gulf', help="Coast used for the partition-pruned read")
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    parquet_root = args.parquet_root or (args.data_dir / USACE_PARQUET_ROOT.name)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+
+    print("=" * 80)
+    print("USACE STORAGE BENCHMARK v1.0.0 (CSV vs PARQUET)")
+    print("=" * 80)
+
+    results = []
+    for direction, (label, date_col, port_col) in DIRECTIONS.items():
+        csv_file = args.data_dir / f"usace_{args.year}_{label}_transformed_v2.2.0.csv"
+        if not csv_file.exists():
+            print(f"\n[--] {direction}: {csv_file.name} not found, skipping")
+            continue
+
+        print(f"\n{direction}: {csv_file.name}")
+        partition = parquet_root / f"Year={args.year}" / f"Direction={direction}"
+        if not partition.exists():
+            print(f"   Building Parquet partition from CSV...")
+            write_usace_parquet(pd.read_csv(csv_file, low_memory=False),
+                                parquet_root, args.year, direction)
+
+        key_columns = ['RECID', 'Vessel', 'IMO', 'PORT', port_col, date_col]
+        reads = {
+            'CSV full': lambda: pd.read_csv(csv_file, low_memory=False),
+            'CSV key columns': lambda: pd.read_csv(csv_file, usecols=key_columns, low_memory=False),
+            'Parquet full': lambda: read_usace_table(parquet_root, years=[args.year], directions=[direction]),
+            'Parquet key columns': lambda: read_usace_table(parquet_root, columns=key_columns,
+                                                            years=[args.year], directions=[direction]),
+            f'Parquet {args.coast} only': lambda: read_usace_table(parquet_root, years=[args.year],
+                                                                  directions=[direction], coasts=[args.coast]),
+        }
+        csv_bytes = csv_file.stat().st_size
+        parquet_bytes = dir_size(partition)
+
+        frames = {}
+        for name, func in reads.items():
+            seconds, df = best_time(func, args.repeats)
+            frames[name] = df
+            results.append({
+                'Year': args.year,
+                'Direction': direction,
+                'Read': name,
+                'Bytes_On_Disk': csv_bytes if name.startswith('CSV') else parquet_bytes,
+                'Rows': len(df),
+                'Columns': len(df.columns),
+                'Seconds': round(seconds, 3),
+                'Memory_MB': round(df.memory_usage(deep=True).sum() / 1024 ** 2, 1),
+            })
+            print(f"   {name:<24} {len(df):>10,} rows x {len(df.columns):>3} cols  {seconds:>7.3f}s")
+
+        problems = compare_usace_sources(frames['CSV full'], frames['Parquet full'])
+        if problems:
+            print(f"   [--] Round trip: {len(problems)} columns differ from the CSV read:")
+            for col, csv_dtype, parquet_dtype in problems:
+                print(f"        {col}: CSV {csv_dtype} vs Parquet {parquet_dtype}")
+        else:
+            print(f"   [OK] Round trip: CSV and Parquet reads have the same columns and dtypes")
+        for row in results:
+            if row['Direction'] == direction:
+                row['Round_Trip_OK'] = not problems
+
+        print(f"   Size: CSV {csv_bytes / 1024 ** 2:,.1f} MB  vs  Parquet {parquet_bytes / 1024 ** 2:,.1f} MB "
+              f"({csv_bytes / max(parquet_bytes, 1):.1f}x smaller)")
+
+    if not results:
+        print("\nERROR: No transformed CSV files found!")
+        exit(1)
+
+    report = pd.DataFrame(results)
+    baseline = report[report['Read'] == 'CSV full'].set_index('Direction')['Seconds']
+    report['Speedup_vs_CSV_full'] = (report['Direction'].map(baseline) / report['Seconds']).round(1)
+    report_file = args.data_dir / f"usace_storage_benchmark_{timestamp}.csv"
+    report.to_csv(report_file, index=False)
+
+    print("\n" + "=" * 80)
+    print("BENCHMARK SUMMARY")
+    print("=" * 80)
+    print(report[['Direction', 'Read', 'Bytes_On_Disk', 'Seconds', 'Memory_MB', 'Speedup_vs_CSV_full']]
+          .to_string(index=False))
+    print(f"\nReport: {report_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Build Vessel Itineraries and Port-Pair Edges from the Port Call Master
+Version: 1.0.0
+Date: 2026-10-19
+
+Purpose:
+- Chain each IMO's port calls into a voyage sequence (previous / next call)
+- Transit days between calls: arrival at this call minus departure from the
+  previous one (previous arrival when the previous call has no clearance)
+- Aggregate consecutive calls into port-pair edges (From_PORT -> To_PORT)
+  with leg counts, distinct vessels and median transit time
+
+Everything is one sort plus shifted columns within IMO groups - no Python loop
+per vessel - so several years of masters can be chained together (a vessel's
+December call links to its January call in the next year's master).
+
+Input:
+- 02_STAGE02_CLASSIFICATION/usace_{YEAR}_portcall_master_v1.0.0.csv (one or more years)
+
+Output:
+- 02_STAGE02_CLASSIFICATION/usace_vessel_itinerary_v1.0.0.csv (one row per port call with an IMO)
+- 02_STAGE02_CLASSIFICATION/usace_port_pair_edges_v1.0.0.csv (adjacency table)
+
+Usage:
+    python build_vessel_itinerary_v1.0.0.py
+    python build_vessel_itinerary_v1.0.0.py --masters usace_2022_portcall_master_v1.0.0.csv usace_2023_portcall_master_v1.0.0.csv
+"""
+
+import argparse
+import time
+import pandas as pd
+import numpy as np
+from pathlib import Path
+
+from pipeline_common import STAGE02_DIR, source_year_from_filename
+
+DEFAULT_MASTER = STAGE02_DIR / "usace_2023_portcall_master_v1.0.0.csv"
+ITINERARY_FILE = STAGE02_DIR / "usace_vessel_itinerary_v1.0.0.csv"
+EDGES_FILE = STAGE02_DIR / "usace_port_pair_edges_v1.0.0.csv"
+
+# Master columns needed (either side of the port call may be missing)
+MASTER_COLUMNS = [
+    'PORTCALL_ID', 'Match_Type',
+    'Entrance_IMO', 'Entrance_Vessel', 'Entrance_PORT', 'Entrance_US_Port_USACE', 'Entrance_Arrival_Date_Parsed',
+    'Clearance_IMO', 'Clearance_Vessel', 'Clearance_PORT', 'Clearance_US_Port_USACE', 'Clearance_Clearance_Date_Parsed',
+]
+
+
+def load_port_calls(master_files):
+    """One row per port call: Call_ID, IMO, Vessel, PORT, Port_Name, Arrival, Departure, Event_Date"""
+    frames = []
+    for master_file in master_files:
+        master = pd.read_csv(master_file, usecols=lambda c: c in MASTER_COLUMNS, low_memory=False)
+        for col in MASTER_COLUMNS:
+            if col not in master.columns:
+                master[col] = np.nan
+        year = source_year_from_filename(master_file)
+        calls = pd.DataFrame({
+            'Call_ID': str(year) + '_' + master['PORTCALL_ID'].astype(str),
+            'Source_Year': year,
+            'PORTCALL_ID': master['PORTCALL_ID'],
+            'Match_Type': master['Match_Type'],
+            'IMO': master['Entrance_IMO'].combine_first(master['Clearance_IMO']),
+            'Vessel': master['Entrance_Vessel'].combine_first(master['Clearance_Vessel']),
+            'PORT': master['Entrance_PORT'].combine_first(master['Clearance_PORT']),
+            'Port_Name': master['Entrance_US_Port_USACE'].combine_first(master['Clearance_US_Port_USACE']),
+            'Arrival': pd.to_datetime(master['Entrance_Arrival_Date_Parsed'], errors='coerce'),
+            'Departure': pd.to_datetime(master['Clearance_Clearance_Date_Parsed'], errors='coerce'),
+        })
+        print(f"   {Path(master_file).name}: {len(calls):,} port calls")
+        frames.append(calls)
+
+    calls = pd.concat(frames, ignore_index=True)
+    # Clearance-only calls are ordered by their departure
+    calls['Event_Date'] = calls['Arrival'].fillna(calls['Departure'])
+    return calls
+
+
+def build_itinerary(calls):
+    """
+    Sort by IMO and date, then link each call to its neighbours within the IMO.
+
+    Shifts run over the whole frame; a mask of "same IMO as the previous row"
+    blanks the links that would cross from one vessel to the next.
+    """
+    itinerary = calls[calls['IMO'].notna() & calls['Event_Date'].notna()]
+    itinerary = itinerary.sort_values(['IMO', 'Event_Date', 'Source_Year', 'PORTCALL_ID'],
+                                      kind='stable').reset_index(drop=True)
+
+    imo = itinerary['IMO']
+    same_prev = imo.eq(imo.shift(1))
+    same_next = imo.eq(imo.shift(-1))
+
+    itinerary['Leg_Seq'] = itinerary.groupby('IMO', sort=False).cumcount() + 1
+    itinerary['Prev_Call_ID'] = itinerary['Call_ID'].shift(1).where(same_prev)
+    itinerary['Next_Call_ID'] = itinerary['Call_ID'].shift(-1).where(same_next)
+    itinerary['Prev_PORT'] = itinerary['PORT'].shift(1).where(same_prev)
+    itinerary['Next_PORT'] = itinerary['PORT'].shift(-1).where(same_next)
+
+    prev_left = itinerary['Departure'].fillna(itinerary['Arrival']).shift(1).where(same_prev)
+    itinerary['Transit_Days_From_Prev'] = (itinerary['Event_Date'] - prev_left).dt.total_seconds() / (24 * 3600)
+    return itinerary
+
+
+def build_edges(itinerary):
+    """Port-pair adjacency: one row per (From_PORT, To_PORT) with counts and transit stats"""
+    legs = itinerary[itinerary['Prev_PORT'].notna()]
+    legs = pd.DataFrame({
+        'From_PORT': legs['Prev_PORT'],
+        'To_PORT': legs['PORT'],
+        'To_Port_Name': legs['Port_Name'],
+        'IMO': legs['IMO'],
+        'Transit_Days': legs['Transit_Days_From_Prev'],
+        'Arrival': legs['Event_Date'],
+    })
+    port_names = itinerary.dropna(subset=['Port_Name']).drop_duplicates('PORT').set_index('PORT')['Port_Name']
+
+    edges = legs.groupby(['From_PORT', 'To_PORT'], sort=False).agg(
+        Legs=('IMO', 'size'),
+        Vessels=('IMO', 'nunique'),
+        Median_Transit_Days=('Transit_Days', 'median'),
+        Mean_Transit_Days=('Transit_Days', 'mean'),
+        First_Arrival=('Arrival', 'min'),
+        Last_Arrival=('Arrival', 'max'),
+    ).reset_index()
+    edges.insert(1, 'From_Port_Name', edges['From_PORT'].map(port_names))
+    edges.insert(3, 'To_Port_Name', edges['To_PORT'].map(port_names))
+    edges['Same_Port'] = edges['From_PORT'] == edges['To_PORT']
+    return edges.sort_values(['Legs', 'From_PORT', 'To_PORT'], ascending=[False, True, True]).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build vessel itineraries and port-pair edges from port call masters")
+    parser.add_argument('--masters', type=Path, nargs='+', default=[DEFAULT_MASTER])
+    parser.add_argument('--itinerary-output', type=Path, default=ITINERARY_FILE)
+    parser.add_argument('--edges-output', type=Path, default=EDGES_FILE)
+    args = parser.parse_args()
+
+    print("="*80)
+    print("BUILD VESSEL ITINERARY v1.0.0")
+    print("="*80)
+
+    start = time.perf_counter()
+    print(f"\n1. Loading port call master(s)...")
+    calls = load_port_calls(args.masters)
+    print(f"   Total port calls: {len(calls):,}")
+    print(f"   Without IMO (excluded): {int(calls['IMO'].isna().sum()):,}")
+
+    print(f"\n2. Chaining port calls per IMO...")
+    itinerary = build_itinerary(calls)
+    n_vessels = itinerary['IMO'].nunique()
+    linked = itinerary['Prev_Call_ID'].notna()
+    print(f"   Vessels: {n_vessels:,}")
+    print(f"   Port calls chained: {len(itinerary):,} ({int(linked.sum()):,} with a previous call)")
+    overlaps = int((itinerary['Transit_Days_From_Prev'] < 0).sum())
+    if overlaps:
+        print(f"   [--] {overlaps:,} calls arrive before the previous call departed (overlapping records)")
+
+    print(f"\n3. Aggregating port-pair edges...")
+    edges = build_edges(itinerary)
+    print(f"   Port pairs: {len(edges):,} ({int(edges['Same_Port'].sum()):,} same-port repeats)")
+
+    itinerary_columns = ['Call_ID', 'Source_Year', 'PORTCALL_ID', 'IMO', 'Vessel', 'Leg_Seq',
+                         'PORT', 'Port_Name', 'Arrival', 'Departure', 'Match_Type',
+                         'Prev_Call_ID', 'Prev_PORT', 'Transit_Days_From_Prev', 'Next_Call_ID', 'Next_PORT']
+    itinerary[itinerary_columns].to_csv(args.itinerary_output, index=False)
+    edges.to_csv(args.edges_output, index=False)
+    print(f"\n4. Saved:")
+    print(f"   {args.itinerary_output.name}")
+    print(f"   {args.edges_output.name}")
+
+    print("\n" + "="*80)
+    print("TOP PORT PAIRS")
+    print("="*80)
+    top = edges[~edges['Same_Port']].head(15)
+    try:
+        print(top[['From_PORT', 'From_Port_Name', 'To_PORT', 'To_Port_Name', 'Legs', 'Vessels',
+                   'Median_Transit_Days']].to_string(index=False))
+    except UnicodeEncodeError:
+        print("   [Display skipped due to unicode characters]")
+
+    print(f"\nCompleted in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
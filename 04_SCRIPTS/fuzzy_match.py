@@ -0,0 +1,232 @@
+"""
+Fuzzy Vessel Name Matching Helpers
+Version: 1.0.0
+Date: 2026-10-19
+
+Purpose:
+- Canonical vessel keys that drop "M/V"-style prefixes, "NO." markers,
+  ordinal suffixes and trailing roman numerals before comparison
+- Character-trigram inverted index over registry names: candidates come from
+  shared trigrams (blocking), so queries never scan every registry name
+- Bounded (banded) Levenshtein distance for scoring; similarity is
+  1 - distance / longer length, accepted only above a threshold
+- Hull numbers must agree exactly: "SEA STAR 12" never matches "SEA STAR 13"
+  (sister ships differ only by number and would otherwise score 0.9); the
+  index is partitioned by hull digits so other numbers are never scored
+
+Cost per query is bounded by the trigram posting lists it touches, so a batch
+of unmatched vessels runs in near-linear time. Very common trigrams
+(postings longer than max_posting) are skipped and the shared-trigram lower
+bound is relaxed by the number skipped, so no admissible candidate is lost.
+"""
+
+import re
+import pandas as pd
+from collections import defaultdict
+
+DEFAULT_THRESHOLD = 0.85
+MIN_KEY_LENGTH = 5  # shorter keys are too ambiguous to fuzzy match
+
+# Leading vessel designators: M/V, M/T, M.V., MV, MT, S/S, SS
+VESSEL_PREFIX_RE = re.compile(r'^(M\s*/\s*[VTY]|M\.\s*[VT]\.?|MV|MT|S\s*/\s*S|SS)\s+')
+NUMBER_MARKER_RE = re.compile(r'\bNO\.?\s*(?=\d)')
+ORDINAL_RE = re.compile(r'\b(\d+)(ST|ND|RD|TH)\b')
+ROMAN_NUMERALS = {'I': '1', 'II': '2', 'III': '3', 'IV': '4', 'V': '5',
+                  'VI': '6', 'VII': '7', 'VIII': '8', 'IX': '9', 'X': '10'}
+
+
+def vessel_name_tokens(name):
+    """Uppercase vessel name tokens with designators and numbering noise removed"""
+    if pd.isna(name) or name == '':
+        return []
+    text = str(name).upper().strip()
+    text = VESSEL_PREFIX_RE.sub('', text)
+    text = NUMBER_MARKER_RE.sub('', text)
+    text = ORDINAL_RE.sub(r'\1', text)
+    tokens = re.sub(r'[^A-Z0-9 ]', ' ', text).split()
+    # Roman numerals only after the first token ("SEA STAR II" -> SEA STAR 2, not "IV ...")
+    return [tok if i == 0 else ROMAN_NUMERALS.get(tok, tok) for i, tok in enumerate(tokens)]
+
+
+def fuzzy_vessel_key(name):
+    """Compact canonical key used for trigram matching ("M/V Sea Star II" -> SEASTAR2)"""
+    return ''.join(vessel_name_tokens(name))
+
+
+def key_digits(key):
+    """Digits of a key in order - sister-ship hull numbers that must match exactly"""
+    return ''.join(ch for ch in key if ch.isdigit())
+
+
+def trigrams(key):
+    """Padded character trigrams of a key (padding keeps start/end characters weighted)"""
+    padded = f"##{key}##"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_levenshtein(a, b, max_dist):
+    """
+    Levenshtein distance limited to a diagonal band of width max_dist.
+
+    Returns max_dist + 1 as soon as the distance is known to exceed max_dist.
+    """
+    if a == b:
+        return 0
+    if len(a) > len(b):
+        a, b = b, a
+    la, lb = len(a), len(b)
+    over = max_dist + 1
+    if lb - la > max_dist:
+        return over
+
+    prev = [j if j <= max_dist else over for j in range(lb + 1)]
+    for i in range(1, la + 1):
+        cur = [over] * (lb + 1)
+        cur[0] = i if i <= max_dist else over
+        row_min = cur[0]
+        ca = a[i - 1]
+        for j in range(max(1, i - max_dist), min(lb, i + max_dist) + 1):
+            cost = 0 if ca == b[j - 1] else 1
+            value = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost, over)
+            cur[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_dist:
+            return over
+        prev = cur
+    return prev[lb] if prev[lb] <= max_dist else over
+
+
+def similarity(a, b, threshold=0.0):
+    """1 - edit distance / longer length; 0.0 when below threshold"""
+    longest = max(len(a), len(b))
+    if longest == 0:
+        return 0.0
+    max_dist = int((1.0 - threshold) * longest + 1e-9)  # guard float truncation (0.999.. -> 0)
+    dist = bounded_levenshtein(a, b, max_dist)
+    if dist > max_dist:
+        return 0.0
+    return 1.0 - dist / longest
+
+
+class TrigramIndex:
+    """
+    Inverted index: (hull digits, trigram) -> ids of registry keys containing it.
+
+    Keying postings by the digits means a query only ever counts keys with the
+    same hull number - the others could never be accepted.
+    """
+
+    def __init__(self, keys, max_posting=2000):
+        self.keys = list(keys)
+        self.max_posting = max_posting
+        postings = defaultdict(list)
+        for key_id, key in enumerate(self.keys):
+            digits = key_digits(key)
+            for gram in trigrams(key):
+                postings[digits, gram].append(key_id)
+        self.postings = dict(postings)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def candidates(self, key, threshold=DEFAULT_THRESHOLD):
+        """
+        (registry id, distance lower bound) for keys with the same hull digits
+        that could score >= threshold, most promising first.
+
+        q-gram lemma: one edit removes at most 3 trigrams, so a string within
+        edit distance k keeps at least |trigrams| - 3k of them; k is the largest
+        distance any admissible candidate may have (length <= len / threshold).
+        """
+        grams = trigrams(key)
+        digits = key_digits(key)
+        max_dist = int((1.0 - threshold) * len(key) / max(threshold, 1e-9) + 1e-9)
+
+        counts = defaultdict(int)
+        skipped = 0
+        for gram in grams:
+            ids = self.postings.get((digits, gram))
+            if ids is None:
+                continue
+            if len(ids) > self.max_posting:
+                skipped += 1
+                continue
+            for key_id in ids:
+                counts[key_id] += 1
+
+        # Skipped grams may be shared, so credit them to every candidate;
+        # edit distance is also at least the length difference
+        keys = self.keys
+        lo, hi = len(key) - max_dist, len(key) + max_dist
+        found = []
+        for key_id, shared in counts.items():
+            lower_bound = max(-(-(len(grams) - shared - skipped) // 3), abs(len(keys[key_id]) - len(key)))
+            if lower_bound <= max_dist and lo <= len(keys[key_id]) <= hi:
+                found.append((key_id, lower_bound))
+        found.sort(key=lambda item: item[1])
+        return found
+
+    def best_match(self, key, threshold=DEFAULT_THRESHOLD):
+        """
+        (matched key, score) for the best candidate at or above threshold.
+
+        Ties between different registry keys are ambiguous and return (None, score).
+        Candidates whose distance lower bound cannot beat the current best are
+        skipped, and the edit-distance band tightens as the best score rises.
+        """
+        if len(key) < MIN_KEY_LENGTH:
+            return None, 0.0
+        best_key, best_score, tied = None, 0.0, False
+        for key_id, lower_bound in self.candidates(key, threshold):
+            candidate = self.keys[key_id]
+            longest = max(len(key), len(candidate))
+            if 1.0 - lower_bound / longest < best_score:
+                continue
+            score = similarity(key, candidate, max(threshold, best_score))
+            if score < threshold:
+                continue
+            if score > best_score:
+                best_key, best_score, tied = candidate, score, False
+            elif score == best_score:
+                tied = True
+        if tied:
+            return None, best_score
+        return best_key, best_score
+
+    def matches(self, key, threshold=DEFAULT_THRESHOLD):
+        """
+        Every (registry key, score) at or above threshold, for callers that block further (e.g. by port and date) and
+        need all admissible names rather than one global best.
+        """
+        if len(key) < MIN_KEY_LENGTH:
+            return []
+        found = []
+        for key_id, _ in self.candidates(key, threshold):
+            candidate = self.keys[key_id]
+            score = similarity(key, candidate, threshold)
+            if score >= threshold:
+                found.append((candidate, score))
+        return found
+
+
+def fuzzy_match_keys(keys, index, threshold=DEFAULT_THRESHOLD):
+    """Match each distinct key once; returns {key: (matched key, score)} for accepted matches"""
+    matches = {}
+    for key in set(keys):
+        if not key:
+            continue
+        matched, score = index.best_match(key, threshold)
+        if matched is not None:
+            matches[key] = (matched, score)
+    return matches
+
+
+def fuzzy_match_key_pairs(keys, index, threshold=DEFAULT_THRESHOLD):
+    """All admissible matches per distinct key: list of (key, matched key, score)"""
+    pairs = []
+    for key in set(keys):
+        if not key:
+            continue
+        pairs.extend((key, matched, score) for matched, score in index.matches(key, threshold))
+    return pairs
@@ -0,0 +1,129 @@
+"""
+HS Code Normalization and Validation
+Version: 1.0.0
+Date: 2026-10-19
+
+Purpose:
+- One HS normalizer for Panjiva preprocessing: raw HS values
+  ("8471.30", 8471.3, "847130", "1431.49 XXXX description", NaN) -> the
+  6-digit HS code, then HS2 / HS4 / HS6 by slicing
+- Used by process_panjiva_exports_v1.0.0.py; the pinned v3.6.0 classifier
+  keeps the HS2/HS4/HS6 columns of its STAGE00 input unchanged
+- Vectorized: each distinct raw value is normalized once with string-dtype
+  operations and broadcast to every row through its factorized code (HS
+  codes repeat heavily, so millions of rows are a few thousand distinct values)
+- Optional integer-coded outputs (int8 / int16 / int32, -1 when missing) for
+  in-memory grouping; CSV outputs stay strings to keep leading zeros
+- Validation against 01.01_dictionary/hs6_lookup.csv: HS_Check is VALID (HS6
+  in the lookup), HS4_ONLY / HS2_ONLY (only the heading / chapter is known),
+  UNKNOWN or MISSING
+
+Normalization: the leading code token (digits and dots) is taken, a dotted
+heading with 3 digits gets its leading zero back ("101.21" -> "010121", the
+form a numeric CSV read leaves of "0101.21"), dots are removed and the code
+is right-padded with zeros to 6 digits.
+
+Usage:
+    from hs_codes import add_hs_columns, load_hs6_lookup
+    lookup = load_hs6_lookup()
+    stats = add_hs_columns(df, 'HS Code', lookup=lookup)
+"""
+
+import time
+import numpy as np
+import pandas as pd
+
+from pipeline_common import DICT_PATH
+
+HS6_LOOKUP_FILE = DICT_PATH / "hs6_lookup.csv"
+
+HS_LEVELS = {'HS2': 2, 'HS4': 4, 'HS6': 6}
+HS_INT_DTYPES = {'HS2': np.int8, 'HS4': np.int16, 'HS6': np.int32}
+MISSING_HS = -1
+HS_CHECK_VALUES = ['VALID', 'HS4_ONLY', 'HS2_ONLY', 'UNKNOWN', 'MISSING']
+
+# Leading code token; a heading written without its leading zero ("101.21")
+LEADING_CODE_RE = r'^\s*([0-9][0-9.]*)'
+SHORT_HEADING_RE = r'^(\d{3})\.'
+
+
+def load_hs6_lookup(path=HS6_LOOKUP_FILE):
+    """Known codes per level from hs6_lookup.csv: {'HS2': set, 'HS4': set, 'HS6': set}"""
+    table = pd.read_csv(path, dtype=str, usecols=list(HS_LEVELS)).fillna('')
+    return {level: set(table[level].str.strip()) - {''} for level in HS_LEVELS}
+
+
+def normalize_hs_codes(values):
+    """
+    Raw HS values -> 6-digit HS code strings ('' when missing or no code).
+
+    Works on whatever is passed in, so pass distinct values (add_hs_columns
+    does) when the column is large.
+    """
+    text = pd.Series(values).astype('string')
+    code = text.str.extract(LEADING_CODE_RE, expand=False)
+    code = code.str.replace(SHORT_HEADING_RE, r'0\1.', regex=True)
+    code = code.str.replace('.', '', regex=False).str.slice(0, 6).str.pad(6, side='right', fillchar='0')
+    return code.fillna('').astype(object)
+
+
+def split_hs_codes(hs6, as_int=False):
+    """HS2 / HS4 / HS6 frame from 6-digit codes ('' missing; with as_int, integer codes and -1)"""
+    hs6 = pd.Series(hs6, dtype=object)
+    levels = pd.DataFrame({level: hs6.str.slice(0, digits) for level, digits in HS_LEVELS.items()},
+                          index=hs6.index)
+    if as_int:
+        for level, dtype in HS_INT_DTYPES.items():
+            levels[level] = (pd.to_numeric(levels[level].replace('', np.nan), errors='coerce')
+                             .fillna(MISSING_HS).astype(dtype))
+    return levels
+
+
+def check_hs_codes(hs6, lookup, present=None):
+    """
+    HS_Check per 6-digit code against load_hs6_lookup() sets. present marks
+    rows whose raw value was not blank, so text without a code is UNKNOWN
+    rather than MISSING.
+    """
+    hs6 = pd.Series(hs6, dtype=object)
+    missing = hs6.eq('') if present is None else ~np.asarray(present, dtype=bool)
+    return pd.Series(np.select(
+        [missing, hs6.eq(''), hs6.isin(lookup['HS6']), hs6.str.slice(0, 4).isin(lookup['HS4']),
+         hs6.str.slice(0, 2).isin(lookup['HS2'])],
+        ['MISSING', 'UNKNOWN', 'VALID', 'HS4_ONLY', 'HS2_ONLY'], 'UNKNOWN'), index=hs6.index)
+
+
+def add_hs_columns(df, source_col, lookup=None, as_int=False):
+    """
+    Add HS2, HS4, HS6 (and HS_Check when a lookup is given) from source_col.
+
+    Each distinct raw value is normalized and checked once; results are
+    broadcast back with np.take on the factorized codes (NaN -> missing).
+    Returns stats: rows, distinct values, rows per HS_Check value, seconds.
+    """
+    start = time.perf_counter()
+    codes, uniques = pd.factorize(df[source_col])
+    hs6 = normalize_hs_codes(pd.Series(uniques, dtype=object))
+    # Trailing slot is the missing value for code -1 (NaN)
+    hs6 = pd.concat([hs6, pd.Series([''], dtype=object)], ignore_index=True)
+    levels = split_hs_codes(hs6, as_int=as_int)
+    for level in HS_LEVELS:
+        df[level] = np.take(levels[level].to_numpy(), codes)
+
+    stats = {'key': source_col, 'rows': len(df), 'distinct': len(uniques)}
+    if lookup is not None:
+        present = np.append(pd.Series(uniques, dtype=object).astype(str).str.strip().ne('').to_numpy(), False)
+        check = check_hs_codes(hs6, lookup, present).to_numpy(dtype=object)
+        df['HS_Check'] = np.take(check, codes)
+        rows_per_value = np.bincount(np.where(codes < 0, len(uniques), codes), minlength=len(check))
+        stats.update({value: int(rows_per_value[check == value].sum()) for value in HS_CHECK_VALUES})
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def format_hs_stats(stats):
+    """One log line for an add_hs_columns() result"""
+    line = f"{stats['distinct']:,} distinct {stats['key']} values -> {stats['rows']:,} rows in {stats['seconds']:.3f}s"
+    if 'VALID' in stats:
+        line += ", " + ", ".join(f"{value} {stats[value]:,}" for value in HS_CHECK_VALUES if stats[value])
+    return line
@@ -13,277 +13,641 @@ Matching Logic:
 - Primary: IMO + PORT + sequential date (clearance after arrival)
 - Fallback: Vessel Name + PORT + sequential date (if IMO missing)
 - Take FIRST clearance after each entrance (closest in time)
+- Matcher outputs index pairs; the master is assembled column-wise
+  (Entrance_* block, Clearance_* block, match metadata)
+
+Sort-merge matcher: clearances are grouped once by (IMO, PORT) and by
+(Vessel, PORT), each group sorted by date. Each entrance binary-searches its
+group for the first clearance strictly after arrival and skips already-matched
+clearances through "next unmatched" pointers, so the whole step is
+O((E + C) log C) instead of filtering every clearance for every entrance.
+
+Port-partitioned mode (--workers N): a vessel can only marry a clearance at
+the same PORT, so both inputs are split by PORT and each partition is matched
+on a worker process. Partition results are scattered back to the global
+(sorted) positions, so rows, order and PORTCALL_IDs equal the serial run.
+
+Incremental mode (--incremental): for monthly USACE drops. Loads the existing
+port call master and only the new entrance/clearance rows. ENTRANCE_ONLY port
+calls are re-opened when they arrived within --reopen-days of the master's
+cutoff date or share an (IMO, PORT) / (Vessel, PORT) key with a new clearance
+dated after their arrival. Re-opened rows are married together with the new
+rows and keep their PORTCALL_ID; new port calls continue the ID sequence.
+BOTH and CLEARANCE_ONLY rows are never touched.
 
 Input:
 - Entrance: 02_STAGE02_CLASSIFICATION/usace_2023_entrance_with_panjiva_match_v1.3.1.csv
 - Clearance: 02_STAGE02_CLASSIFICATION/usace_2023_clearance_with_panjiva_match_v1.0.1.csv
 
+Either input may also be a Parquet dataset directory (see pipeline_common.read_usace_table):
+only its Inbound / Outbound partitions are read, for --year or every Year partition,
+and clearance dates are decoded on each partition's year.
+
 Output:
 - Port Call Master: 02_STAGE02_CLASSIFICATION/usace_2023_portcall_master_v1.0.0.csv
+- With --workers: usace_2023_portcall_partition_report_{timestamp}.csv (per-port timing)
+
+Usage:
+    python marry_entrance_clearance_v1.0.0.py
+    python marry_entrance_clearance_v1.0.0.py --workers 8
+    python marry_entrance_clearance_v1.0.0.py --keys-only   (read only the matching columns)
+    python marry_entrance_clearance_v1.0.0.py --entrance usace_transformed_parquet --clearance usace_transformed_parquet --year 2023
+    python marry_entrance_clearance_v1.0.0.py --incremental --new-entrance usace_2023_entrance_2023-12.csv
+        --new-clearance usace_2023_clearance_2023-12.csv [--master ...] [--reopen-days 60]
 """
 
+import argparse
+import os
+import time
 import pandas as pd
 import numpy as np
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 
-print("="*80)
-print("MARRY ENTRANCE AND CLEARANCE v1.0.0")
-print("="*80)
-print("\nGenesis Event: Ship Arriving + Departing = Port Call")
-print("Preserving ALL vessel movements (matched or unmatched)")
-
-timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+from pipeline_common import decode_usace_dates, read_usace_table, source_year_from_filename
 
 # File paths
 ENTRANCE_FILE = Path(r"G:\My Drive\LLM\project_manifest\02_STAGE02_CLASSIFICATION\usace_2023_entrance_with_panjiva_match_v1.3.1.csv")
 CLEARANCE_FILE = Path(r"G:\My Drive\LLM\project_manifest\02_STAGE02_CLASSIFICATION\usace_2023_clearance_with_panjiva_match_v1.0.1.csv")
 OUTPUT_FILE = Path(r"G:\My Drive\LLM\project_manifest\02_STAGE02_CLASSIFICATION\usace_2023_portcall_master_v1.0.0.csv")
 
-# Parse USACE dates (mmydd format)
-def parse_usace_date(date_val):
-    """Convert mmydd integer to timestamp (e.g., 8329 -> 2023-08-29)"""
-    if pd.isna(date_val):
-        return None
-    try:
-        date_str = str(int(date_val)).zfill(5)
-        month = int(date_str[:2])
-        year_digit = int(date_str[2])
-        day = int(date_str[3:])
-        year = 2020 + year_digit
-        return pd.Timestamp(year=year, month=month, day=day)
-    except:
-        return None
-
-# Load entrance data
-print(f"\n1. Loading entrance data...")
-entrance = pd.read_csv(ENTRANCE_FILE, low_memory=False)
-print(f"   Entrance records: {len(entrance):,}")
-
-# Parse entrance dates (already in YYYY-MM-DD format from v1.3.1)
-entrance['Arrival_Date_Parsed'] = pd.to_datetime(entrance['Arrival_Date'], errors='coerce')
-print(f"   Dates parsed: {entrance['Arrival_Date_Parsed'].notna().sum():,}")
-
-# Load clearance data
-print(f"\n2. Loading clearance data...")
-clearance = pd.read_csv(CLEARANCE_FILE, low_memory=False)
-print(f"   Clearance records: {len(clearance):,}")
-
-# Parse clearance dates
-clearance['Clearance_Date_Parsed'] = clearance['Clearance_Date'].apply(parse_usace_date)
-print(f"   Dates parsed: {clearance['Clearance_Date_Parsed'].notna().sum():,}")
-
-# Sort by vessel, port, date for sequential matching
-print(f"\n3. Sorting data for sequential matching...")
-entrance_sorted = entrance.sort_values(['IMO', 'PORT', 'Arrival_Date_Parsed']).reset_index(drop=True)
-clearance_sorted = clearance.sort_values(['IMO', 'PORT', 'Clearance_Date_Parsed']).reset_index(drop=True)
-
-# Track which clearances have been matched (prevent double-matching)
-clearance_matched = set()
-
-# Sequential matching
-print(f"\n4. Sequential matching: For each entrance, find NEXT clearance...")
-matched_records = []
-match_stats = {'IMO': 0, 'Vessel_Name': 0, 'No_Match': 0}
-
-for idx, ent_row in entrance_sorted.iterrows():
-    if idx % 5000 == 0:
-        print(f"   Processing entrance {idx:,}/{len(entrance_sorted):,}")
-
-    vessel_imo = ent_row.get('IMO', '')
-    vessel_name = ent_row.get('Vessel', '')
-    port = ent_row.get('PORT', '')
-    arrival_date = ent_row['Arrival_Date_Parsed']
-
-    if pd.isna(arrival_date):
-        # Can't match without arrival date
-        merged_row = {f"Entrance_{k}": v for k, v in ent_row.items()}
-        merged_row.update({
-            'Port_Stay_Days_Decimal': None,
-            'Port_Stay_Days_Int': None,
-            'Match_Score': None,
-            'Match_Type': 'ENTRANCE_ONLY',
-            'Match_Method': 'NO_DATE'
-        })
-        matched_records.append(merged_row)
-        match_stats['No_Match'] += 1
-        continue
-
-    # Try IMO match first (if IMO exists and is not null)
-    clear_match = None
-    match_method = None
-
-    if pd.notna(vessel_imo) and str(vessel_imo).strip() != '':
-        # Find clearances: same IMO + same PORT + after arrival + not already matched
-        candidates = clearance_sorted[
-            (clearance_sorted['IMO'] == vessel_imo) &
-            (clearance_sorted['PORT'] == port) &
-            (clearance_sorted['Clearance_Date_Parsed'] > arrival_date) &
-            (~clearance_sorted.index.isin(clearance_matched))
-        ]
-
-        if len(candidates) > 0:
-            # Take FIRST clearance (closest in time)
-            clear_match = candidates.iloc[0]
-            clearance_matched.add(clear_match.name)  # Mark as matched
-            match_method = 'IMO'
-            match_stats['IMO'] += 1
-
-    # Fallback to vessel name if IMO didn't match
-    if clear_match is None and pd.notna(vessel_name) and str(vessel_name).strip() != '':
-        candidates = clearance_sorted[
-            (clearance_sorted['Vessel'] == vessel_name) &
-            (clearance_sorted['PORT'] == port) &
-            (clearance_sorted['Clearance_Date_Parsed'] > arrival_date) &
-            (~clearance_sorted.index.isin(clearance_matched))
-        ]
-
-        if len(candidates) > 0:
-            clear_match = candidates.iloc[0]
-            clearance_matched.add(clear_match.name)
-            match_method = 'Vessel_Name'
-            match_stats['Vessel_Name'] += 1
-
-    # Build merged row
-    if clear_match is not None:
-        # Calculate port stay in DECIMAL DAYS
-        port_stay_decimal = (clear_match['Clearance_Date_Parsed'] - arrival_date).total_seconds() / (24 * 3600)
-        port_stay_int = int(port_stay_decimal)
-
-        # Match confidence based on port stay duration
-        if port_stay_decimal <= 15:
-            match_score = 1.0  # High confidence
-        elif port_stay_decimal <= 45:
-            match_score = 0.8  # Medium confidence
-        else:
-            match_score = 0.5  # Low confidence (extended stay)
-
-        # Merge entrance + clearance columns
-        merged_row = {f"Entrance_{k}": v for k, v in ent_row.items()}
-        merged_row.update({f"Clearance_{k}": v for k, v in clear_match.items()})
-        merged_row.update({
-            'Port_Stay_Days_Decimal': port_stay_decimal,
-            'Port_Stay_Days_Int': port_stay_int,
-            'Match_Score': match_score,
-            'Match_Type': 'BOTH',
-            'Match_Method': match_method
-        })
-        matched_records.append(merged_row)
-    else:
-        # No matching clearance - entrance only
-        merged_row = {f"Entrance_{k}": v for k, v in ent_row.items()}
-        merged_row.update({
-            'Port_Stay_Days_Decimal': None,
-            'Port_Stay_Days_Int': None,
-            'Match_Score': None,
-            'Match_Type': 'ENTRANCE_ONLY',
-            'Match_Method': None
-        })
-        matched_records.append(merged_row)
-        match_stats['No_Match'] += 1
-
-print(f"\n5. Adding unmatched clearances (CLEARANCE_ONLY)...")
-# Add clearances that were never matched to any entrance
-unmatched_clearance_count = 0
-for idx, clear_row in clearance_sorted.iterrows():
-    if idx not in clearance_matched:
-        # This clearance has no entrance match
-        merged_row = {f"Clearance_{k}": v for k, v in clear_row.items()}
-        merged_row.update({
-            'Port_Stay_Days_Decimal': None,
-            'Port_Stay_Days_Int': None,
-            'Match_Score': None,
-            'Match_Type': 'CLEARANCE_ONLY',
-            'Match_Method': None
-        })
-        matched_records.append(merged_row)
-        unmatched_clearance_count += 1
-
-print(f"   Unmatched clearances added: {unmatched_clearance_count:,}")
-
-# Convert to DataFrame
-print(f"\n6. Creating port call master DataFrame...")
-portcall_master = pd.DataFrame(matched_records)
-print(f"   Total port call records: {len(portcall_master):,}")
-
-# Add unique port call ID
-portcall_master.insert(0, 'PORTCALL_ID', range(1, len(portcall_master) + 1))
-portcall_master['PORTCALL_ID'] = 'PC_' + portcall_master['PORTCALL_ID'].astype(str).str.zfill(6)
-
-# Save
-portcall_master.to_csv(OUTPUT_FILE, index=False)
-print(f"\n7. Saved: {OUTPUT_FILE.name}")
-print(f"   Columns: {len(portcall_master.columns)}")
-
-# Summary statistics
-print("\n" + "="*80)
-print("MATCHING SUMMARY")
-print("="*80)
-
-match_type_counts = portcall_master['Match_Type'].value_counts()
-print(f"\nTotal port call records: {len(portcall_master):,}")
-print(f"\nMatch Type Distribution:")
-for match_type, count in match_type_counts.items():
-    pct = count / len(portcall_master) * 100
-    print(f"  {match_type:<20} {count:>8,} ({pct:>5.1f}%)")
-
-print(f"\nMatching Method (for BOTH):")
-both_records = portcall_master[portcall_master['Match_Type'] == 'BOTH']
-if len(both_records) > 0:
-    for method, count in match_stats.items():
-        if method != 'No_Match' and count > 0:
+# Columns the matcher needs (partitions ship only these to workers)
+ENTRANCE_MATCH_COLUMNS = ['IMO', 'Vessel', 'PORT', 'Arrival_Date_Parsed']
+CLEARANCE_MATCH_COLUMNS = ['IMO', 'Vessel', 'PORT', 'Clearance_Date_Parsed']
+# Source columns read with --keys-only (matching keys and the raw date)
+ENTRANCE_READ_COLUMNS = ['IMO', 'Vessel', 'PORT', 'Arrival_Date']
+CLEARANCE_READ_COLUMNS = ['IMO', 'Vessel', 'PORT', 'Clearance_Date']
+
+# Incremental mode: ENTRANCE_ONLY port calls this close to the cutoff are re-opened
+REOPEN_DAYS = 60
+
+# Numeric match keys; one dtype whatever the source (CSV int64, Parquet, NaN-padded master float)
+NUMERIC_KEYS = ['IMO', 'PORT']
+
+def canonical_keys(frame, prefix=''):
+    """Cast the IMO/PORT key columns (with an optional Entrance_/Clearance_ prefix) to float64 in place"""
+    for key in NUMERIC_KEYS:
+        col = prefix + key
+        if col in frame.columns:
+            frame[col] = pd.to_numeric(frame[col], errors='coerce').astype('float64')
+    return frame
+
+def match_scores(port_stay_days):
+    """Match confidence based on port stay duration (NaN where there is no stay)"""
+    return np.select(
+        [port_stay_days <= 15, port_stay_days <= 45, port_stay_days > 45],
+        [1.0,                  0.8,                  0.5],  # High / Medium / Low (extended stay)
+        default=np.nan)
+
+class ClearanceQueue:
+    """Date-sorted clearances for one (key, PORT) group"""
+
+    def __init__(self):
+        self.dates = []
+        self.positions = []
+        self.next_free = None
+
+    def take_first_after(self, arrival, matched):
+        """
+        Claim the first unmatched clearance strictly after arrival.
+
+        next_free[i] points past a run of clearances already known to be
+        matched (through this group or the other key), with path compression.
+        """
+        n = len(self.positions)
+        if self.next_free is None:
+            self.next_free = list(range(1, n + 1))
+        i = bisect_right(self.dates, arrival)
+        skipped = []
+        while i < n and matched[self.positions[i]]:
+            skipped.append(i)
+            i = self.next_free[i]
+        for s in skipped:
+            self.next_free[s] = i
+        if i == n:
+            return -1
+        position = self.positions[i]
+        matched[position] = True
+        return position
+
+def build_clearance_queues(clearance_sorted, key_col):
+    """
+    {(key, PORT): ClearanceQueue} over clearances with a key, PORT and date.
+
+    Within a group, clearances are ordered by date and then by their row in
+    clearance_sorted, so equal dates resolve the same way as a filtered scan.
+    """
+    dates = clearance_sorted['Clearance_Date_Parsed']
+    valid = clearance_sorted[key_col].notna() & clearance_sorted['PORT'].notna() & dates.notna()
+    if clearance_sorted[key_col].dtype == object:
+        valid &= clearance_sorted[key_col].astype(str).str.strip() != ''
+    positions = np.flatnonzero(valid.values)
+    order = np.lexsort((positions, dates.values[positions].astype('datetime64[ns]').astype('int64')))
+    positions = positions[order]
+
+    # Plain object arrays: element access on Arrow-backed string arrays is slow
+    keys = clearance_sorted[key_col].to_numpy(dtype=object)
+    ports = clearance_sorted['PORT'].to_numpy(dtype=object)
+    date_ns = dates.values.astype('datetime64[ns]').astype('int64')
+    queues = {}
+    for position in positions.tolist():
+        group_key = (keys[position], ports[position])
+        queue = queues.get(group_key)
+        if queue is None:
+            queue = queues[group_key] = ClearanceQueue()
+        queue.dates.append(date_ns[position])
+        queue.positions.append(position)
+    return queues
+
+def match_sequential(entrance_sorted, clearance_sorted, verbose=True):
+    """
+    Greedy sequential matching in entrance order.
+
+    Returns (clearance position per entrance or -1, match method per entrance,
+    matched flags per clearance).
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    imo_queues = build_clearance_queues(clearance_sorted, 'IMO')
+    name_queues = build_clearance_queues(clearance_sorted, 'Vessel')
+    log(f"   Clearance groups: {len(imo_queues):,} (IMO, PORT), {len(name_queues):,} (Vessel, PORT)")
+
+    matched = np.zeros(len(clearance_sorted), dtype=bool)
+    clearance_pos = np.full(len(entrance_sorted), -1, dtype=np.int64)
+    methods = np.full(len(entrance_sorted), None, dtype=object)
+
+    imos = entrance_sorted['IMO'].to_numpy(dtype=object)
+    names = entrance_sorted['Vessel'].to_numpy(dtype=object)
+    ports = entrance_sorted['PORT'].to_numpy(dtype=object)
+    arrival_na = entrance_sorted['Arrival_Date_Parsed'].isna().values
+    arrivals = entrance_sorted['Arrival_Date_Parsed'].values.astype('datetime64[ns]').astype('int64')
+
+    for idx in range(len(entrance_sorted)):
+        if idx % 50000 == 0:
+            log(f"   Processing entrance {idx:,}/{len(entrance_sorted):,}")
+
+        if arrival_na[idx]:
+            # Can't match without arrival date
+            methods[idx] = 'NO_DATE'
+            continue
+
+        port = ports[idx]
+        if pd.isna(port):
+            continue
+        arrival = arrivals[idx]
+
+        # Try IMO match first (if IMO exists and is not null)
+        vessel_imo = imos[idx]
+        if pd.notna(vessel_imo) and str(vessel_imo).strip() != '':
+            queue = imo_queues.get((vessel_imo, port))
+            if queue is not None:
+                position = queue.take_first_after(arrival, matched)
+                if position >= 0:
+                    clearance_pos[idx] = position
+                    methods[idx] = 'IMO'
+                    continue
+
+        # Fallback to vessel name if IMO didn't match
+        vessel_name = names[idx]
+        if pd.notna(vessel_name) and str(vessel_name).strip() != '':
+            queue = name_queues.get((vessel_name, port))
+            if queue is not None:
+                position = queue.take_first_after(arrival, matched)
+                if position >= 0:
+                    clearance_pos[idx] = position
+                    methods[idx] = 'Vessel_Name'
+
+    return clearance_pos, methods, matched
+
+def _match_partition(port, entrance_part, clearance_part):
+    """Worker: match one PORT partition; positions come back in global (sorted) terms"""
+    start = time.perf_counter()
+    clearance_pos, methods, matched = match_sequential(entrance_part.reset_index(drop=True),
+                                                       clearance_part.reset_index(drop=True), verbose=False)
+    clearance_global = clearance_part.index.values
+    hit = clearance_pos >= 0
+    clearance_pos[hit] = clearance_global[clearance_pos[hit]]
+    return {
+        'port': port,
+        'entrance_positions': entrance_part.index.values,
+        'clearance_pos': clearance_pos,
+        'methods': methods,
+        'matched_positions': clearance_global[matched],
+        'seconds': time.perf_counter() - start,
+        'pid': os.getpid(),
+    }
+
+def partition_by_port(frame):
+    """{PORT: global row positions}; rows without a PORT form their own partition"""
+    ports = frame['PORT'].astype(object).where(frame['PORT'].notna(), '(none)')
+    return {port: positions for port, positions in ports.groupby(ports, sort=False).indices.items()}
+
+def match_by_port_parallel(entrance_sorted, clearance_sorted, workers):
+    """
+    Same result as match_sequential, computed per PORT on a process pool.
+
+    Partitions are submitted largest first so a big port (Houston) starts
+    immediately instead of being the straggler. Returns the serial outputs
+    plus a per-partition timing report.
+    """
+    entrance_parts = partition_by_port(entrance_sorted)
+    clearance_parts = partition_by_port(clearance_sorted)
+    ports = sorted(set(entrance_parts) | set(clearance_parts),
+                   key=lambda p: -(len(entrance_parts.get(p, ())) + len(clearance_parts.get(p, ()))))
+    empty = np.array([], dtype=np.int64)
+    print(f"   Partitions: {len(ports):,} ports on {workers} worker processes")
+
+    clearance_pos = np.full(len(entrance_sorted), -1, dtype=np.int64)
+    methods = np.full(len(entrance_sorted), None, dtype=object)
+    matched = np.zeros(len(clearance_sorted), dtype=bool)
+    report = []
+    # Column subsets built once; each partition is an .iloc slice of these
+    entrance_keys = entrance_sorted[ENTRANCE_MATCH_COLUMNS]
+    clearance_keys = clearance_sorted[CLEARANCE_MATCH_COLUMNS]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for port in ports:
+            entrance_part = entrance_keys.iloc[entrance_parts.get(port, empty)]
+            clearance_part = clearance_keys.iloc[clearance_parts.get(port, empty)]
+            futures.append(pool.submit(_match_partition, port, entrance_part, clearance_part))
+
+        for future in as_completed(futures):
+            result = future.result()
+            positions = result['entrance_positions']
+            clearance_pos[positions] = result['clearance_pos']
+            methods[positions] = result['methods']
+            matched[result['matched_positions']] = True
+            report.append({
+                'PORT': result['port'],
+                'Entrances': len(positions),
+                'Clearances': len(clearance_parts.get(result['port'], empty)),
+                'Matched': len(result['matched_positions']),
+                'Seconds': round(result['seconds'], 3),
+                'Worker_PID': result['pid'],
+            })
+
+    report = pd.DataFrame(report).sort_values('Seconds', ascending=False).reset_index(drop=True)
+    return clearance_pos, methods, matched, report
+
+def portcall_pairs(clearance_pos, methods, matched):
+    """
+    Port call rows as index pairs: every entrance (in sorted order), then every
+    unmatched clearance. -1 marks the missing side.
+    """
+    unmatched = np.flatnonzero(~matched)
+    return pd.DataFrame({
+        'entrance_idx': np.concatenate([np.arange(len(clearance_pos)), np.full(len(unmatched), -1)]),
+        'clearance_idx': np.concatenate([clearance_pos, unmatched]),
+        'Match_Method': np.concatenate([methods, np.full(len(unmatched), None, dtype=object)]),
+    })
+
+def build_portcall_master(entrance_sorted, clearance_sorted, pairs):
+    """
+    Assemble the master from index pairs: one prefixed take per side plus a concat.
+
+    -1 positions are absent from the RangeIndex, so reindex fills those rows
+    with NaN - no per-row dicts are built.
+    """
+    entrance_idx = pairs['entrance_idx'].to_numpy()
+    clearance_idx = pairs['clearance_idx'].to_numpy()
+    entrance_part = entrance_sorted.add_prefix('Entrance_').reindex(entrance_idx).reset_index(drop=True)
+    clearance_part = clearance_sorted.add_prefix('Clearance_').reindex(clearance_idx).reset_index(drop=True)
+
+    both = (entrance_idx >= 0) & (clearance_idx >= 0)
+    # Calculate port stay in DECIMAL DAYS
+    port_stay_decimal = ((clearance_part['Clearance_Clearance_Date_Parsed'] - entrance_part['Entrance_Arrival_Date_Parsed'])
+                         .dt.total_seconds() / (24 * 3600)).where(both)
+    meta = pd.DataFrame({
+        'Port_Stay_Days_Decimal': port_stay_decimal,
+        'Port_Stay_Days_Int': np.trunc(port_stay_decimal),
+        'Match_Score': match_scores(port_stay_decimal),
+        'Match_Type': np.where(both, 'BOTH', np.where(entrance_idx >= 0, 'ENTRANCE_ONLY', 'CLEARANCE_ONLY')),
+        'Match_Method': pairs['Match_Method'].to_numpy(),
+    })
+
+    portcall_master = pd.concat([entrance_part, clearance_part, meta], axis=1)
+    print(f"   Entrance-side rows: {int((entrance_idx >= 0).sum()):,}, unmatched clearances added: {int((entrance_idx < 0).sum()):,}")
+    print(f"   Total port call records: {len(portcall_master):,}")
+
+    # Add unique port call ID
+    portcall_master.insert(0, 'PORTCALL_ID', range(1, len(portcall_master) + 1))
+    portcall_master['PORTCALL_ID'] = 'PC_' + portcall_master['PORTCALL_ID'].astype(str).str.zfill(6)
+    return portcall_master
+
+def print_summary(portcall_master, match_stats):
+    print("\n" + "="*80)
+    print("MATCHING SUMMARY")
+    print("="*80)
+
+    match_type_counts = portcall_master['Match_Type'].value_counts()
+    print(f"\nTotal port call records: {len(portcall_master):,}")
+    print(f"\nMatch Type Distribution:")
+    for match_type, count in match_type_counts.items():
+        pct = count / len(portcall_master) * 100
+        print(f"  {match_type:<20} {count:>8,} ({pct:>5.1f}%)")
+
+    print(f"\nMatching Method (for BOTH):")
+    both_records = portcall_master[portcall_master['Match_Type'] == 'BOTH']
+    if len(both_records) > 0:
+        for method, count in match_stats.items():
+            if method != 'No_Match' and count > 0:
+                pct = count / len(both_records) * 100
+                print(f"  {method:<20} {count:>8,} ({pct:>5.1f}%)")
+
+    # Port stay statistics
+    if len(both_records) > 0:
+        print(f"\nPort Stay Duration (for matched records):")
+        print(f"  Average: {both_records['Port_Stay_Days_Decimal'].mean():.1f} days")
+        print(f"  Median:  {both_records['Port_Stay_Days_Decimal'].median():.1f} days")
+        print(f"  Min:     {both_records['Port_Stay_Days_Decimal'].min():.1f} days")
+        print(f"  Max:     {both_records['Port_Stay_Days_Decimal'].max():.1f} days")
+
+        # Distribution by duration
+        print(f"\n  Duration Distribution:")
+        print(f"    ≤15 days:  {(both_records['Port_Stay_Days_Decimal'] <= 15).sum():,} ({(both_records['Port_Stay_Days_Decimal'] <= 15).sum()/len(both_records)*100:.1f}%)")
+        print(f"    16-45 days: {((both_records['Port_Stay_Days_Decimal'] > 15) & (both_records['Port_Stay_Days_Decimal'] <= 45)).sum():,} ({((both_records['Port_Stay_Days_Decimal'] > 15) & (both_records['Port_Stay_Days_Decimal'] <= 45)).sum()/len(both_records)*100:.1f}%)")
+        print(f"    >45 days:  {(both_records['Port_Stay_Days_Decimal'] > 45).sum():,} ({(both_records['Port_Stay_Days_Decimal'] > 45).sum()/len(both_records)*100:.1f}%)")
+
+    # Match score distribution
+    if len(both_records) > 0:
+        print(f"\n  Match Score Distribution:")
+        score_counts = both_records['Match_Score'].value_counts().sort_index(ascending=False)
+        for score, count in score_counts.items():
             pct = count / len(both_records) * 100
-            print(f"  {method:<20} {count:>8,} ({pct:>5.1f}%)")
-
-# Port stay statistics
-if len(both_records) > 0:
-    print(f"\nPort Stay Duration (for matched records):")
-    print(f"  Average: {both_records['Port_Stay_Days_Decimal'].mean():.1f} days")
-    print(f"  Median:  {both_records['Port_Stay_Days_Decimal'].median():.1f} days")
-    print(f"  Min:     {both_records['Port_Stay_Days_Decimal'].min():.1f} days")
-    print(f"  Max:     {both_records['Port_Stay_Days_Decimal'].max():.1f} days")
-
-    # Distribution by duration
-    print(f"\n  Duration Distribution:")
-    print(f"    ≤15 days:  {(both_records['Port_Stay_Days_Decimal'] <= 15).sum():,} ({(both_records['Port_Stay_Days_Decimal'] <= 15).sum()/len(both_records)*100:.1f}%)")
-    print(f"    16-45 days: {((both_records['Port_Stay_Days_Decimal'] > 15) & (both_records['Port_Stay_Days_Decimal'] <= 45)).sum():,} ({((both_records['Port_Stay_Days_Decimal'] > 15) & (both_records['Port_Stay_Days_Decimal'] <= 45)).sum()/len(both_records)*100:.1f}%)")
-    print(f"    >45 days:  {(both_records['Port_Stay_Days_Decimal'] > 45).sum():,} ({(both_records['Port_Stay_Days_Decimal'] > 45).sum()/len(both_records)*100:.1f}%)")
-
-# Match score distribution
-if len(both_records) > 0:
-    print(f"\n  Match Score Distribution:")
-    score_counts = both_records['Match_Score'].value_counts().sort_index(ascending=False)
-    for score, count in score_counts.items():
-        pct = count / len(both_records) * 100
-        print(f"    {score:.1f}: {count:,} ({pct:.1f}%)")
-
-# Sample records
-print(f"\n" + "="*80)
-print("SAMPLE RECORDS (First 3 of each type)")
-print("="*80)
-
-for match_type in ['BOTH', 'ENTRANCE_ONLY', 'CLEARANCE_ONLY']:
-    sample = portcall_master[portcall_master['Match_Type'] == match_type].head(3)
-    if len(sample) > 0:
-        print(f"\n{match_type}:")
-        if match_type == 'BOTH':
-            cols = ['PORTCALL_ID', 'Entrance_Vessel', 'Entrance_PORT', 'Entrance_Arrival_Date',
-                    'Clearance_Clearance_Date', 'Port_Stay_Days_Decimal', 'Match_Score']
-        elif match_type == 'ENTRANCE_ONLY':
-            cols = ['PORTCALL_ID', 'Entrance_Vessel', 'Entrance_PORT', 'Entrance_Arrival_Date']
-        else:  # CLEARANCE_ONLY
-            cols = ['PORTCALL_ID', 'Clearance_Vessel', 'Clearance_PORT', 'Clearance_Clearance_Date']
-
-        # Filter to columns that exist
-        cols = [c for c in cols if c in sample.columns]
-        try:
-            print(sample[cols].to_string(index=False))
-        except UnicodeEncodeError:
-            print("   [Sample display skipped due to unicode characters]")
-
-print(f"\n" + "="*80)
-print("COMPLETE!")
-print("="*80)
-print(f"\nGenesis Event Established: {len(portcall_master):,} port calls")
-print(f"Expected range: ~{len(entrance):,} to ~{len(entrance) + len(clearance):,}")
-print(f"Output: {OUTPUT_FILE.name}")
+            print(f"    {score:.1f}: {count:,} ({pct:.1f}%)")
+
+    # Sample records
+    print(f"\n" + "="*80)
+    print("SAMPLE RECORDS (First 3 of each type)")
+    print("="*80)
+
+    for match_type in ['BOTH', 'ENTRANCE_ONLY', 'CLEARANCE_ONLY']:
+        sample = portcall_master[portcall_master['Match_Type'] == match_type].head(3)
+        if len(sample) > 0:
+            print(f"\n{match_type}:")
+            if match_type == 'BOTH':
+                cols = ['PORTCALL_ID', 'Entrance_Vessel', 'Entrance_PORT', 'Entrance_Arrival_Date',
+                        'Clearance_Clearance_Date', 'Port_Stay_Days_Decimal', 'Match_Score']
+            elif match_type == 'ENTRANCE_ONLY':
+                cols = ['PORTCALL_ID', 'Entrance_Vessel', 'Entrance_PORT', 'Entrance_Arrival_Date']
+            else:  # CLEARANCE_ONLY
+                cols = ['PORTCALL_ID', 'Clearance_Vessel', 'Clearance_PORT', 'Clearance_Clearance_Date']
+
+            # Filter to columns that exist
+            cols = [c for c in cols if c in sample.columns]
+            try:
+                print(sample[cols].to_string(index=False))
+            except UnicodeEncodeError:
+                print("   [Sample display skipped due to unicode characters]")
+
+def usace_sources(path, direction, columns=None, year=None):
+    """
+    (year, frame) per source: a CSV file (year from --year, else None) or
+    each Year partition of a Parquet dataset (only --year when given), read
+    for this direction only so a shared dataset root works.
+    """
+    path = Path(path)
+    if not path.is_dir():
+        return [(year, read_usace_table(path, columns=columns))]
+    years = [year] if year else sorted(int(p.name.split('=', 1)[1]) for p in path.glob('Year=*'))
+    return [(y, read_usace_table(path, columns=columns, years=[y], directions=[direction])) for y in years]
+
+def load_entrance(path, columns=None, year=None):
+    entrance = pd.concat([frame for _, frame in usace_sources(path, 'Inbound', columns, year)],
+                         ignore_index=True)
+    canonical_keys(entrance)
+    print(f"   Entrance records: {len(entrance):,}")
+
+    # Parse entrance dates (already in YYYY-MM-DD format from v1.3.1)
+    entrance['Arrival_Date_Parsed'] = pd.to_datetime(entrance['Arrival_Date'], errors='coerce')
+    print(f"   Dates parsed: {entrance['Arrival_Date_Parsed'].notna().sum():,}")
+    return entrance
+
+def load_clearance(path, columns=None, year=None):
+    # Parse clearance dates (mmydd, decade anchored on --year, the Year partition or the file name)
+    frames = []
+    invalid_dates = Counter()
+    for source_year, frame in usace_sources(path, 'Outbound', columns, year):
+        frame['Clearance_Date_Parsed'], invalid = decode_usace_dates(
+            frame['Clearance_Date'], source_year or source_year_from_filename(path))
+        invalid_dates.update(invalid)
+        frames.append(frame)
+    clearance = canonical_keys(pd.concat(frames, ignore_index=True))
+    print(f"   Clearance records: {len(clearance):,}")
+    print(f"   Dates parsed: {clearance['Clearance_Date_Parsed'].notna().sum():,}")
+    if invalid_dates:
+        print(f"   Invalid dates: {dict(invalid_dates)}")
+    return clearance
+
+def run_matching(entrance_sorted, clearance_sorted, workers, timestamp):
+    """Serial or port-partitioned matching; returns (clearance_pos, methods, matched, match_stats)"""
+    start = time.perf_counter()
+    partition_report = None
+    if workers > 1:
+        clearance_pos, methods, matched, partition_report = match_by_port_parallel(
+            entrance_sorted, clearance_sorted, workers)
+    else:
+        clearance_pos, methods, matched = match_sequential(entrance_sorted, clearance_sorted)
+    match_stats = {
+        'IMO': int((methods == 'IMO').sum()),
+        'Vessel_Name': int((methods == 'Vessel_Name').sum()),
+        'No_Match': int((clearance_pos < 0).sum()),
+    }
+    match_seconds = time.perf_counter() - start
+    print(f"   Matched {int(matched.sum()):,} clearances in {match_seconds:.1f}s")
+
+    if partition_report is not None:
+        report_file = OUTPUT_FILE.with_name(f"usace_2023_portcall_partition_report_{timestamp}.csv")
+        partition_report.to_csv(report_file, index=False)
+        busiest = partition_report['Seconds'].sum()
+        print(f"   Slowest partitions (sum of partition times {busiest:.1f}s, wall {match_seconds:.1f}s):")
+        print(partition_report.head(10).to_string(index=False))
+        if busiest > 0:
+            print(f"   Largest partition share: {partition_report['Seconds'].iloc[0] / busiest * 100:.1f}% of matching work")
+        print(f"   Partition report: {report_file.name}")
+    return clearance_pos, methods, matched, match_stats
+
+def reopen_candidates(master, new_clearance, reopen_days):
+    """
+    Boolean mask of ENTRANCE_ONLY rows worth re-marrying, plus the reason counts.
+
+    A row is re-opened when it arrived within reopen_days of the master's
+    cutoff date, or when a new clearance shares its (IMO, PORT) or
+    (Vessel, PORT) key and is dated after its arrival.
+    """
+    arrival = pd.to_datetime(master['Entrance_Arrival_Date_Parsed'], errors='coerce')
+    departure = pd.to_datetime(master.get('Clearance_Clearance_Date_Parsed'), errors='coerce')
+    cutoff = max(arrival.max(), departure.max() if departure is not None else arrival.max())
+    entrance_only = (master['Match_Type'] == 'ENTRANCE_ONLY') & arrival.notna()
+
+    near_cutoff = entrance_only & (arrival >= cutoff - pd.Timedelta(days=reopen_days))
+
+    shares_key = pd.Series(False, index=master.index)
+    master_keys = canonical_keys(master[['Entrance_IMO', 'Entrance_Vessel', 'Entrance_PORT']].copy(), 'Entrance_')
+    new_clearance = canonical_keys(new_clearance[['IMO', 'Vessel', 'PORT', 'Clearance_Date_Parsed']].copy())
+    for key_col in ['IMO', 'Vessel']:
+        latest = (new_clearance.dropna(subset=[key_col, 'PORT', 'Clearance_Date_Parsed'])
+                  .groupby([key_col, 'PORT'])['Clearance_Date_Parsed'].max()
+                  .rename('Latest_New_Clearance'))
+        keys = master_keys.loc[entrance_only, [f"Entrance_{key_col}", 'Entrance_PORT']]
+        keys.columns = [key_col, 'PORT']
+        joined = keys.join(latest, on=[key_col, 'PORT'])
+        absorbs = joined['Latest_New_Clearance'] > arrival[joined.index]
+        shares_key |= absorbs.reindex(master.index, fill_value=False)
+
+    reopen = near_cutoff | shares_key
+    reasons = {
+        'near_cutoff': int(near_cutoff.sum()),
+        'shares_key_with_new_clearance': int(shares_key.sum()),
+        'both_reasons': int((near_cutoff & shares_key).sum()),
+    }
+    return reopen, cutoff, reasons
+
+def marry_incremental(master_file, new_entrance_file, new_clearance_file, output_file,
+                      reopen_days=REOPEN_DAYS, workers=1, timestamp=None, keys_only=False, year=None):
+    """Marry new USACE rows into an existing port call master (see module docstring)"""
+    print(f"\n1. Loading existing port call master...")
+    master = pd.read_csv(master_file, low_memory=False)
+    id_numbers = master['PORTCALL_ID'].str[3:].astype(int)
+    print(f"   Port calls: {len(master):,} (last ID PC_{id_numbers.max():06d})")
+
+    print(f"\n2. Loading new entrance rows...")
+    new_entrance = load_entrance(new_entrance_file, ENTRANCE_READ_COLUMNS if keys_only else None, year)
+    print(f"\n3. Loading new clearance rows...")
+    new_clearance = load_clearance(new_clearance_file, CLEARANCE_READ_COLUMNS if keys_only else None, year)
+
+    print(f"\n4. Re-opening ENTRANCE_ONLY port calls...")
+    reopen, cutoff, reasons = reopen_candidates(master, new_clearance, reopen_days)
+    print(f"   Cutoff date: {cutoff.date()}  (re-open window {reopen_days} days)")
+    print(f"   Near cutoff:                    {reasons['near_cutoff']:,}")
+    print(f"   Share key with a new clearance: {reasons['shares_key_with_new_clearance']:,}")
+    print(f"   Re-opened port calls:           {int(reopen.sum()):,} of {len(master):,}")
+
+    # Entrance rows back from the Entrance_* block, carrying their PORTCALL_ID
+    entrance_cols = [c for c in master.columns if c.startswith('Entrance_')]
+    reopened = master.loc[reopen, entrance_cols + ['PORTCALL_ID']]
+    reopened = reopened.rename(columns={c: c[len('Entrance_'):] for c in entrance_cols})
+    reopened = reopened.rename(columns={'PORTCALL_ID': 'Reopened_PORTCALL_ID'})
+    reopened['Arrival_Date_Parsed'] = pd.to_datetime(reopened['Arrival_Date'], errors='coerce')
+    entrance = pd.concat([canonical_keys(reopened), canonical_keys(new_entrance)], ignore_index=True)
+
+    print(f"\n5. Sequential matching ({len(entrance):,} entrances, {len(new_clearance):,} clearances)...")
+    entrance_sorted = entrance.sort_values(['IMO', 'PORT', 'Arrival_Date_Parsed']).reset_index(drop=True)
+    clearance_sorted = new_clearance.sort_values(['IMO', 'PORT', 'Clearance_Date_Parsed']).reset_index(drop=True)
+    clearance_pos, methods, matched, _ = run_matching(entrance_sorted, clearance_sorted, workers, timestamp)
+
+    print(f"\n6. Assembling new port calls from index pairs...")
+    pairs = portcall_pairs(clearance_pos, methods, matched)
+    delta = build_portcall_master(entrance_sorted, clearance_sorted, pairs)
+
+    # Re-opened rows keep their ID; new port calls continue the sequence
+    kept_id = delta.pop('Entrance_Reopened_PORTCALL_ID')
+    is_new = kept_id.isna()
+    next_ids = np.arange(id_numbers.max() + 1, id_numbers.max() + 1 + int(is_new.sum()))
+    delta['PORTCALL_ID'] = kept_id
+    delta.loc[is_new, 'PORTCALL_ID'] = ['PC_' + str(n).zfill(6) for n in next_ids]
+
+    updated = pd.concat([master.loc[~reopen], delta], ignore_index=True)
+    updated = updated[list(master.columns) + [c for c in updated.columns if c not in master.columns]]
+    updated = updated.sort_values('PORTCALL_ID', key=lambda ids: ids.str[3:].astype(int)).reset_index(drop=True)
+
+    reopened_types = delta.loc[~is_new, 'Match_Type'].value_counts()
+    print(f"\n7. Reprocessing report:")
+    print(f"   Port calls re-processed:        {int((~is_new).sum()):,}")
+    print(f"     now BOTH (absorbed clearance): {int(reopened_types.get('BOTH', 0)):,}")
+    print(f"     still ENTRANCE_ONLY:           {int(reopened_types.get('ENTRANCE_ONLY', 0)):,}")
+    print(f"   Port calls untouched:           {int((~reopen).sum()):,}")
+    print(f"   New port calls appended:        {int(is_new.sum()):,}"
+          + (f" (PC_{next_ids[0]:06d} .. PC_{next_ids[-1]:06d})" if len(next_ids) else ""))
+
+    updated.to_csv(output_file, index=False)
+    print(f"\n8. Saved: {Path(output_file).name} ({len(updated):,} port calls)")
+
+    # Summary covers the whole updated master, not just this drop
+    match_stats = {
+        'IMO': int((updated['Match_Method'] == 'IMO').sum()),
+        'Vessel_Name': int((updated['Match_Method'] == 'Vessel_Name').sum()),
+        'No_Match': int((updated['Match_Type'] == 'ENTRANCE_ONLY').sum()),
+    }
+    return updated, match_stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Marry USACE entrance and clearance records into port calls")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Match PORT partitions on N worker processes (default 1: serial)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Marry only new rows into an existing port call master")
+    parser.add_argument('--master', type=Path, default=OUTPUT_FILE, help="Existing master (incremental mode)")
+    parser.add_argument('--new-entrance', type=Path, help="New entrance rows (incremental mode)")
+    parser.add_argument('--new-clearance', type=Path, help="New clearance rows (incremental mode)")
+    parser.add_argument('--output', type=Path, default=None,
+                        help="Incremental output (default: overwrite --master)")
+    parser.add_argument('--reopen-days', type=int, default=REOPEN_DAYS)
+    parser.add_argument('--entrance', type=Path, default=ENTRANCE_FILE,
+                        help="Entrance CSV or Parquet dataset root (Direction=Inbound is read)")
+    parser.add_argument('--clearance', type=Path, default=CLEARANCE_FILE,
+                        help="Clearance CSV or Parquet dataset root (Direction=Outbound is read)")
+    parser.add_argument('--year', type=int, default=None,
+                        help="Source year: clearance date anchor and Parquet Year partition "
+                             "(default: the file name's year, or every Year partition)")
+    parser.add_argument('--keys-only', action='store_true',
+                        help="Read only IMO, Vessel, PORT and the date from each input "
+                             "(slim master without the pass-through USACE columns)")
+    args = parser.parse_args()
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+
+    print("="*80)
+    print("MARRY ENTRANCE AND CLEARANCE v1.0.0" + (" (INCREMENTAL)" if args.incremental else ""))
+    print("="*80)
+    print("\nGenesis Event: Ship Arriving + Departing = Port Call")
+    print("Preserving ALL vessel movements (matched or unmatched)")
+
+    if args.incremental:
+        if not args.new_entrance or not args.new_clearance:
+            parser.error("--incremental needs --new-entrance and --new-clearance")
+        portcall_master, match_stats = marry_incremental(
+            args.master, args.new_entrance, args.new_clearance, args.output or args.master,
+            reopen_days=args.reopen_days, workers=args.workers, timestamp=timestamp, keys_only=args.keys_only, year=args.year)
+        print_summary(portcall_master, match_stats)
+        return
+
+    # Load entrance data
+    print(f"\n1. Loading entrance data...")
+    entrance = load_entrance(args.entrance, ENTRANCE_READ_COLUMNS if args.keys_only else None, args.year)
+
+    # Load clearance data
+    print(f"\n2. Loading clearance data...")
+    clearance = load_clearance(args.clearance, CLEARANCE_READ_COLUMNS if args.keys_only else None, args.year)
+
+    # Sort by vessel, port, date for sequential matching
+    print(f"\n3. Sorting data for sequential matching...")
+    entrance_sorted = entrance.sort_values(['IMO', 'PORT', 'Arrival_Date_Parsed']).reset_index(drop=True)
+    clearance_sorted = clearance.sort_values(['IMO', 'PORT', 'Clearance_Date_Parsed']).reset_index(drop=True)
+
+    # Sequential matching
+    print(f"\n4. Sequential matching: For each entrance, find NEXT clearance...")
+    clearance_pos, methods, matched, match_stats = run_matching(entrance_sorted, clearance_sorted,
+                                                                args.workers, timestamp)
+
+    print(f"\n5. Assembling port call master from index pairs...")
+    pairs = portcall_pairs(clearance_pos, methods, matched)
+    portcall_master = build_portcall_master(entrance_sorted, clearance_sorted, pairs)
+
+    # Save
+    portcall_master.to_csv(OUTPUT_FILE, index=False)
+    print(f"\n6. Saved: {OUTPUT_FILE.name}")
+    print(f"   Columns: {len(portcall_master.columns)}")
+
+    print_summary(portcall_master, match_stats)
+
+    print(f"\n" + "="*80)
+    print("COMPLETE!")
+    print("="*80)
+    print(f"\nGenesis Event Established: {len(portcall_master):,} port calls")
+    print(f"Expected range: ~{len(entrance):,} to ~{len(entrance) + len(clearance):,}")
+    print(f"Output: {OUTPUT_FILE.name}")
+
+if __name__ == "__main__":
+    main()
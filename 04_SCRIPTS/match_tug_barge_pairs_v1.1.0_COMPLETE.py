@@ -7,325 +7,842 @@ Purpose:
 - Match unmatched tugs with barges for BOTH entrance and clearance
 - Use historical pairing patterns for disambiguation
 - Fast vectorized operations
+- Historical pairing counts come from one grouped self-join of tugs and barges
+  on (PORT, date): cost scales with actual co-occurrences, not ports x dates x rows.
+  The counts are saved as a keyed table (Side, Tug_Vessel, Barge_Vessel, Co_Occurrences)
+- Each run folds its co-occurrences into the persistent multi-year pairing
+  store (tug_barge_pairing_store.py) and scores candidates from the
+  accumulated history, optionally windowed (--window-months) or decayed
+  (--half-life-months); --no-store scores from this run only
+- One engine for both sides (TUG_BARGE_SIDES: column prefix, date column,
+  Pair_ID prefix); with --workers > 1 entrance and clearance run concurrently
+  on a process pool, and their pair tables are applied to the master in a
+  single vectorized update
+- Barges are sorted once per port by date; each tug's +/-1 day candidates come
+  from a binary-searched window and matched barges are tracked in a boolean
+  array (same greedy result as filtering every barge per tug)
+
+Optimal assignment (--assignment optimal): greedy first-tug-wins depends on
+row order - an early tug can take a barge a later tug needed. Optimal mode
+splits tugs and barges into connected blocks (same PORT, chained +/-1 day
+windows), solves each block as a maximum-weight bipartite matching over every
+window edge - most pairs first, so never fewer than greedy, then historical
+co-occurrences (scipy) - and reports pairs gained over greedy plus solve time
+per block size. History-less pairs in shared windows are labelled WINDOW.
+--workers N solves blocks on a process pool.
+
+Convoys (--convoys): a tug on the rivers often pushes several barges, but
+one-to-one pairing leaves all but one of them unmatched. After pairing, every
+still-unmatched barge in a tug's window whose vessel has history with the
+tug's vessel (>= --convoy-min-support co-occurrences) joins that tug's tow;
+a barge supported by several tugs goes to the strongest history. Tow members
+get Tow_ID and Tow_Barges, and history-joined barges (and an unpaired tug
+heading a tow) become TUG_BARGE_CONVOY.
+
+Output:
+- 02_STAGE02_CLASSIFICATION/usace_2023_portcall_master_v1.1.0.csv
+- 02_STAGE02_CLASSIFICATION/usace_2023_tug_barge_pairing_history_v1.1.0.csv
+- 02_STAGE02_CLASSIFICATION/usace_tug_barge_pairing_store_v1.0.0.npz (updated in place)
+- Optimal mode: usace_2023_tug_barge_block_report_{timestamp}.csv (per-block timing)
+
+Usage:
+    python match_tug_barge_pairs_v1.1.0_COMPLETE.py
+    python match_tug_barge_pairs_v1.1.0_COMPLETE.py --assignment optimal --workers 8
+    python match_tug_barge_pairs_v1.1.0_COMPLETE.py --convoys --convoy-min-support 2
 """
 
+import argparse
+import os
+import time
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from datetime import datetime
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-print("="*80)
-print("TUG-BARGE PAIR MATCHING v1.1.0 COMPLETE")
-print("="*80)
-print("Processing BOTH entrance and clearance records")
-
-timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+from pipeline_common import decode_usace_dates, source_year_from_filename
+from tug_barge_pairing_store import PairingStore, PAIRING_STORE_FILE
 
 # File paths
 INPUT_FILE = Path(r"G:\My Drive\LLM\project_manifest\02_STAGE02_CLASSIFICATION\usace_2023_portcall_master_v1.0.0.csv")
 OUTPUT_FILE = Path(r"G:\My Drive\LLM\project_manifest\02_STAGE02_CLASSIFICATION\usace_2023_portcall_master_v1.1.0.csv")
+PAIRING_FILE = Path(r"G:\My Drive\LLM\project_manifest\02_STAGE02_CLASSIFICATION\usace_2023_tug_barge_pairing_history_v1.1.0.csv")
 
 # Vessel types
 TUG_TYPES = ['TUG', 'PUSH BOAT', 'TUG/SUPPLY OFFSHORE SUPPORT']
 BARGE_TYPES = ['DECK BARGE', 'OTHER TANK BARGE', 'DRY CARGO BARGE',
                'OTHER DRY CARGO BARGE NEI', 'COVERED DRY CARGO BARGE']
 
-# Load
-print("\n1. Loading data...")
-df = pd.read_csv(INPUT_FILE, low_memory=False)
-print(f"   Records: {len(df):,}")
-
-# Parse dates
-print("\n2. Parsing dates...")
-df['Entrance_Date_Parsed'] = pd.to_datetime(df['Entrance_Arrival_Date'], errors='coerce')
-df['Clearance_Date_Parsed'] = pd.to_datetime(df['Clearance_Clearance_Date'], errors='coerce')
-
-# ============================================================================
-# ENTRANCE TUG-BARGE MATCHING
-# ============================================================================
-
-print("\n" + "="*80)
-print("ENTRANCE TUG-BARGE MATCHING")
-print("="*80)
-
-entrance_only = df[df['Match_Type'] == 'ENTRANCE_ONLY'].copy()
-entrance_tugs = entrance_only[entrance_only['Entrance_ICST_DESC'].isin(TUG_TYPES)].copy()
-entrance_barges = entrance_only[entrance_only['Entrance_ICST_DESC'].isin(BARGE_TYPES)].copy()
-
-print(f"\n3. Unmatched entrance tugs: {len(entrance_tugs):,}")
-print(f"   Unmatched entrance barges: {len(entrance_barges):,}")
-
-# Build historical pairing for entrance
-print("\n4. Building entrance historical pairing patterns...")
-entrance_tugs['Date_Simple'] = entrance_tugs['Entrance_Date_Parsed'].dt.date
-entrance_barges['Date_Simple'] = entrance_barges['Entrance_Date_Parsed'].dt.date
-
-pairing_ent = defaultdict(int)
-
-tug_port_dates = set(zip(entrance_tugs['Entrance_PORT'], entrance_tugs['Date_Simple']))
-barge_port_dates = set(zip(entrance_barges['Entrance_PORT'], entrance_barges['Date_Simple']))
-common_port_dates = tug_port_dates & barge_port_dates
-
-for port, date in common_port_dates:
-    tugs_here = entrance_tugs[
-        (entrance_tugs['Entrance_PORT'] == port) &
-        (entrance_tugs['Date_Simple'] == date)
-    ]['Entrance_Vessel'].tolist()
-
-    barges_here = entrance_barges[
-        (entrance_barges['Entrance_PORT'] == port) &
-        (entrance_barges['Date_Simple'] == date)
-    ]['Entrance_Vessel'].tolist()
-
-    for tug in tugs_here:
-        for barge in barges_here:
-            pairing_ent[(tug, barge)] += 1
-
-print(f"   Entrance historical patterns: {len(pairing_ent):,} unique combinations")
-
-# Match entrance tugs with barges
-print("\n5. Matching entrance tugs with barges...")
-entrance_pairs = []
-matched_tug_ent = set()
-matched_barge_ent = set()
-
-for tug_idx, tug_row in entrance_tugs.iterrows():
-    if tug_idx in matched_tug_ent:
-        continue
-
-    tug_vessel = tug_row['Entrance_Vessel']
-    tug_port = tug_row['Entrance_PORT']
-    tug_date = tug_row['Date_Simple']
-
-    if pd.isna(tug_date):
-        continue
-
-    barge_candidates = entrance_barges[
-        (entrance_barges['Entrance_PORT'] == tug_port) &
-        (entrance_barges['Date_Simple'] >= tug_date - pd.Timedelta(days=1)) &
-        (entrance_barges['Date_Simple'] <= tug_date + pd.Timedelta(days=1)) &
-        (~entrance_barges.index.isin(matched_barge_ent))
-    ]
-
-    if len(barge_candidates) == 0:
-        continue
-
-    if len(barge_candidates) == 1:
-        barge_row = barge_candidates.iloc[0]
-        entrance_pairs.append({
-            'Pair_ID': f"TB_ENT_{len(entrance_pairs)+1}",
+# Per-side configuration: column prefix, parsed date column, unmatched Match_Type, Pair_ID / Tow_ID prefixes
+TUG_BARGE_SIDES = {
+    'ENTRANCE': {'prefix': 'Entrance', 'date_col': 'Entrance_Date_Parsed',
+                 'match_type': 'ENTRANCE_ONLY', 'pair_prefix': 'TB_ENT', 'tow_prefix': 'TOW_ENT'},
+    'CLEARANCE': {'prefix': 'Clearance', 'date_col': 'Clearance_Date_Parsed',
+                  'match_type': 'CLEARANCE_ONLY', 'pair_prefix': 'TB_CLR', 'tow_prefix': 'TOW_CLR'},
+}
+PAIR_COLUMNS = ['Pair_ID', 'Tug_Index', 'Barge_Index', 'Confidence']
+
+# BargeWindows composite sort key: key code * span + day (days since 1970 stay far below)
+WINDOW_DAY_SPAN = 1 << 20
+
+# Convoy detection: tug rows are processed in chunks of about this many candidate barges
+CONVOY_CHUNK_EDGES = 2_000_000
+
+# Optimal assignment: blocks are batched per worker task up to this many edges
+BLOCK_BATCH_EDGES = 5000
+BLOCK_SIZE_BINS = [2, 3, 6, 21, 101, 1001, np.inf]
+BLOCK_SIZE_LABELS = ['2', '3-5', '6-20', '21-100', '101-1000', '1001+']
+
+
+def co_occurrence_rows(tugs, barges, port_col, vessel_col):
+    """
+    One row per tug and barge at the same PORT on the same date
+    (Tug_Vessel, Barge_Vessel, PORT, Date).
+
+    A single inner join of tugs to barges on (PORT, Date_Simple), so the cost
+    follows the number of co-occurrences. Rows without a port, date or vessel
+    name never pair.
+    """
+    keys = [port_col, 'Date_Simple']
+    tug_rows = tugs[keys + [vessel_col]].dropna()
+    barge_rows = barges[keys + [vessel_col]].dropna()
+    co_occurrences = tug_rows.merge(barge_rows, on=keys, suffixes=('_Tug', '_Barge'))
+    return pd.DataFrame({
+        'Tug_Vessel': co_occurrences[f'{vessel_col}_Tug'],
+        'Barge_Vessel': co_occurrences[f'{vessel_col}_Barge'],
+        'PORT': co_occurrences[port_col],
+        'Date': pd.to_datetime(co_occurrences['Date_Simple']),
+    })
+
+
+def historical_pairing_counts(co_occurrences):
+    """(Tug_Vessel, Barge_Vessel) -> number of (PORT, date) co-occurrences"""
+    counts = co_occurrences.groupby(['Tug_Vessel', 'Barge_Vessel']).size()
+    return counts.rename('Co_Occurrences')
+
+
+def day_numbers(dates):
+    """Days since epoch as int64 (NaT -> -1, flagged by the returned mask)"""
+    dates = pd.to_datetime(dates)
+    valid = dates.notna().to_numpy()
+    days = dates.to_numpy(dtype='datetime64[D]').astype(np.int64)
+    return np.where(valid, days, -1), valid
+
+
+class BargeWindows:
+    """
+    Barges sorted by (key, day, row order); the key is PORT by default, or
+    several columns such as PORT + Vessel.
+
+    The barges for a key within a day range are one window [lo, hi) of the
+    sorted order, found by binary search on a composite key * WINDOW_DAY_SPAN
+    + day value - per tug (window) or for a whole array of lookups at once
+    (windows). rows maps sorted positions back to barge row positions.
+    Barges without a date or key are left out.
+    """
+
+    def __init__(self, barges, key_cols='PORT'):
+        self.key_cols = [key_cols] if isinstance(key_cols, str) else list(key_cols)
+        barge_days, barge_valid = day_numbers(barges['Date_Simple'])
+        keys = barges[self.key_cols]
+        order = np.flatnonzero(barge_valid & keys.notna().all(axis=1).to_numpy())
+        codes, self.key_index = pd.factorize(self._key_index(keys.iloc[order]))
+        self.key_codes_by_value = {key: code for code, key in enumerate(self.key_index)}
+
+        composite = codes.astype(np.int64) * WINDOW_DAY_SPAN + barge_days[order]
+        sort = np.argsort(composite, kind='stable')
+        self.sorted_keys = composite[sort]
+        self.rows = order[sort]
+
+    def _key_index(self, frame):
+        if len(self.key_cols) == 1:
+            return pd.Index(frame[self.key_cols[0]].to_numpy(dtype=object))
+        return pd.MultiIndex.from_frame(frame[self.key_cols])
+
+    def __len__(self):
+        return len(self.rows)
+
+    def key_codes(self, frame):
+        """Key code of every row of frame (key_cols columns); -1 where no barge has that key"""
+        return self.key_index.get_indexer(self._key_index(frame))
+
+    def window(self, key, day, days_before=1, days_after=1):
+        """[lo, hi) sorted positions of the barges with key from day - days_before to day + days_after"""
+        code = self.key_codes_by_value.get(key)
+        if code is None:
+            return 0, 0
+        base = code * WINDOW_DAY_SPAN
+        return (int(np.searchsorted(self.sorted_keys, base + day - days_before, side='left')),
+                int(np.searchsorted(self.sorted_keys, base + day + days_after, side='right')))
+
+    def windows(self, codes, days, days_before=1, days_after=1):
+        """Vectorized window(): lo, hi arrays for key codes (from key_codes) and days"""
+        base = np.asarray(codes, dtype=np.int64) * WINDOW_DAY_SPAN
+        lo = np.searchsorted(self.sorted_keys, base + days - days_before, side='left')
+        hi = np.searchsorted(self.sorted_keys, base + days + days_after, side='right')
+        missing = np.asarray(codes) < 0
+        return np.where(missing, 0, lo), np.where(missing, 0, hi)
+
+
+def match_tugs_to_barges(tugs, barges, port_col, vessel_col, pairing, pair_prefix):
+    """
+    Greedy tug -> barge pairing in tug row order.
+
+    A tug's candidates are the still-unmatched barges at the same PORT within
+    +/-1 day. One candidate pairs as SINGLE; several pair with the one having
+    the most historical co-occurrences (HIST_nX, first in row order on ties),
+    and none with history leaves the tug unmatched.
+
+    Candidates come from a BargeWindows window instead of a scan of all
+    barges per tug; matched barges are a boolean array over the sorted order.
+    """
+    windows = BargeWindows(barges, port_col)
+    rows = windows.rows
+    barge_index = barges.index.to_numpy()
+    barge_vessels = barges[vessel_col].to_numpy(dtype=object)
+    matched = np.zeros(len(windows), dtype=bool)
+
+    tug_days, tug_valid = day_numbers(tugs['Date_Simple'])
+    tug_ports = tugs[port_col].to_numpy(dtype=object)
+    tug_vessels = tugs[vessel_col].to_numpy(dtype=object)
+
+    pairs = []
+    for i, tug_idx in enumerate(tugs.index):
+        if not tug_valid[i]:
+            continue
+        lo, hi = windows.window(tug_ports[i], tug_days[i])
+        candidates = lo + np.flatnonzero(~matched[lo:hi])
+
+        if len(candidates) == 0:
+            continue
+
+        if len(candidates) == 1:
+            best_pos, confidence = candidates[0], 'SINGLE'
+        else:
+            best_pos, best_score = -1, 0
+            tug_vessel = tug_vessels[i]
+            for pos in candidates:
+                score = pairing.get((tug_vessel, barge_vessels[rows[pos]]), 0)
+                if score > best_score or (score == best_score and best_pos >= 0 and rows[pos] < rows[best_pos]):
+                    best_pos, best_score = pos, score
+            if best_pos < 0:
+                continue
+            confidence = f'HIST_{best_score:g}X'
+
+        matched[best_pos] = True
+        pairs.append({
+            'Pair_ID': f"{pair_prefix}_{len(pairs)+1}",
             'Tug_Index': tug_idx,
-            'Barge_Index': barge_row.name,
-            'Confidence': 'SINGLE'
+            'Barge_Index': barge_index[rows[best_pos]],
+            'Confidence': confidence
         })
-        matched_tug_ent.add(tug_idx)
-        matched_barge_ent.add(barge_row.name)
+    return pairs
+
+
+def candidate_edges(tugs, barges, port_col, vessel_col, pairing):
+    """
+    Admissible tug/barge edges as arrays (tug row, barge row, co-occurrences, single).
+
+    Every barge in the tug's +/-1 day window is an edge, with or without
+    history: greedy pairs a tug with a history-less barge once it is the only
+    unmatched one left, and which one that is depends on row order. Keeping
+    those edges makes the edge set a superset of every pair greedy can make,
+    so optimal never makes fewer pairs. single marks a window of one barge;
+    history-less pairs in shared windows are labelled WINDOW.
+    """
+    windows = BargeWindows(barges, port_col)
+    barge_vessels = barges[vessel_col].to_numpy(dtype=object)
+    tug_days, tug_valid = day_numbers(tugs['Date_Simple'])
+    tug_ports = tugs[port_col].to_numpy(dtype=object)
+    tug_vessels = tugs[vessel_col].to_numpy(dtype=object)
+
+    edge_tugs, edge_barges, edge_counts, edge_single = [], [], [], []
+    for i in np.flatnonzero(tug_valid):
+        lo, hi = windows.window(tug_ports[i], tug_days[i])
+        single = hi - lo == 1
+        tug_vessel = tug_vessels[i]
+        for row in windows.rows[lo:hi]:
+            edge_tugs.append(i)
+            edge_barges.append(row)
+            edge_counts.append(pairing.get((tug_vessel, barge_vessels[row]), 0))
+            edge_single.append(single)
+    return (np.array(edge_tugs, dtype=np.int64), np.array(edge_barges, dtype=np.int64),
+            np.array(edge_counts, dtype=float), np.array(edge_single, dtype=bool))
+
+
+def edge_confidence(count, single):
+    """SINGLE (only barge in the window), HIST_nX, or WINDOW (no history, window shared)"""
+    if single:
+        return 'SINGLE'
+    return f'HIST_{count:g}X' if count else 'WINDOW'
+
+
+def assignment_blocks(edge_tugs, edge_barges, n_tugs, n_barges):
+    """Edge positions of each connected block of tugs and barges, largest first"""
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    if len(edge_tugs) == 0:
+        return []
+    n_nodes = n_tugs + n_barges
+    graph = coo_matrix((np.ones(len(edge_tugs)), (edge_tugs, n_tugs + edge_barges)), shape=(n_nodes, n_nodes))
+    _, labels = connected_components(graph, directed=False)
+    edge_labels = labels[edge_tugs]
+    order = np.argsort(edge_labels, kind='stable')
+    blocks = np.split(order, np.flatnonzero(np.diff(edge_labels[order])) + 1)
+    return sorted(blocks, key=len, reverse=True)
+
+
+def solve_block(tug_rows, barge_rows, counts):
+    """
+    Maximum-weight matching of one block; returns the positions of the chosen edges.
+
+    Weight = co-occurrences + (block total + 1), so the most pairs always wins
+    and history breaks ties between equally large matchings (history-less
+    edges weigh block total + 1 and only win where they add a pair). Every tug also
+    gets a private dummy barge costing more than any real edge, so a full
+    matching exists and a tug may stay unpaired.
+    """
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+    if len(counts) == 1:
+        return np.array([0])
+    _, tug_local = np.unique(tug_rows, return_inverse=True)
+    _, barge_local = np.unique(barge_rows, return_inverse=True)
+    n_tugs, n_barges = tug_local.max() + 1, barge_local.max() + 1
+
+    weights = counts + counts.sum() + 1
+    top = weights.max() + 1
+    dummies = np.arange(n_tugs)
+    cost = csr_matrix((np.r_[top - weights, np.full(n_tugs, top)].astype(float),
+                       (np.r_[tug_local, dummies], np.r_[barge_local, n_barges + dummies])),
+                      shape=(n_tugs, n_barges + n_tugs))
+    row_ind, col_ind = min_weight_full_bipartite_matching(cost)
+
+    real = col_ind < n_barges
+    keys = tug_local.astype(np.int64) * n_barges + barge_local
+    order = np.argsort(keys)
+    chosen_keys = row_ind[real].astype(np.int64) * n_barges + col_ind[real]
+    return order[np.searchsorted(keys[order], chosen_keys)]
+
+
+def _solve_block_batch(batch):
+    """Worker: solve a list of (block_id, tug_rows, barge_rows, counts) blocks"""
+    results = []
+    for block_id, tug_rows, barge_rows, counts in batch:
+        start = time.perf_counter()
+        chosen = solve_block(tug_rows, barge_rows, counts)
+        results.append((block_id, chosen, time.perf_counter() - start, os.getpid()))
+    return results
+
+
+def match_tugs_to_barges_optimal(tugs, barges, port_col, vessel_col, pairing, pair_prefix, workers=1):
+    """
+    Order-independent tug -> barge assignment.
+
+    The admissible edges (candidate_edges) fall apart into connected blocks of
+    tugs and barges at one PORT within chained +/-1 day windows. No edge
+    crosses blocks, so each block is solved alone as a maximum-weight
+    bipartite matching (solve_block). With workers > 1 blocks run on a process
+    pool, largest first, small blocks batched to keep task overhead down.
+
+    Returns the pairs (same shape as match_tugs_to_barges, numbered in tug row
+    order) and a per-block report.
+    """
+    try:
+        import scipy.sparse.csgraph  # noqa: F401
+    except ImportError:
+        raise ImportError("Optimal assignment needs scipy: pip install scipy") from None
+
+    edge_tugs, edge_barges, edge_counts, edge_single = candidate_edges(tugs, barges, port_col, vessel_col, pairing)
+    blocks = assignment_blocks(edge_tugs, edge_barges, len(tugs), len(barges))
+    print(f"   Candidate edges: {len(edge_tugs):,} in {len(blocks):,} blocks")
+
+    batches, batch, batch_edges = [], [], 0
+    for block_id, edges in enumerate(blocks):
+        batch.append((block_id, edge_tugs[edges], edge_barges[edges], edge_counts[edges]))
+        batch_edges += len(edges)
+        if batch_edges >= BLOCK_BATCH_EDGES or workers <= 1:
+            batches.append(batch)
+            batch, batch_edges = [], 0
+    if batch:
+        batches.append(batch)
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_solve_block_batch, batch) for batch in batches]
+            results = [result for future in as_completed(futures) for result in future.result()]
     else:
-        best_barge = None
-        best_score = 0
-
-        for barge_idx, barge_row in barge_candidates.iterrows():
-            barge_vessel = barge_row['Entrance_Vessel']
-            score = pairing_ent.get((tug_vessel, barge_vessel), 0)
-
-            if score > best_score:
-                best_score = score
-                best_barge = (barge_idx, barge_row, barge_vessel)
-
-        if best_barge and best_score > 0:
-            barge_idx, barge_row, barge_vessel = best_barge
-            entrance_pairs.append({
-                'Pair_ID': f"TB_ENT_{len(entrance_pairs)+1}",
-                'Tug_Index': tug_idx,
-                'Barge_Index': barge_idx,
-                'Confidence': f'HIST_{best_score}X'
-            })
-            matched_tug_ent.add(tug_idx)
-            matched_barge_ent.add(barge_idx)
-
-print(f"   Entrance pairs created: {len(entrance_pairs):,}")
-
-# ============================================================================
-# CLEARANCE TUG-BARGE MATCHING
-# ============================================================================
-
-print("\n" + "="*80)
-print("CLEARANCE TUG-BARGE MATCHING")
-print("="*80)
-
-clearance_only = df[df['Match_Type'] == 'CLEARANCE_ONLY'].copy()
-clearance_tugs = clearance_only[clearance_only['Clearance_ICST_DESC'].isin(TUG_TYPES)].copy()
-clearance_barges = clearance_only[clearance_only['Clearance_ICST_DESC'].isin(BARGE_TYPES)].copy()
-
-print(f"\n6. Unmatched clearance tugs: {len(clearance_tugs):,}")
-print(f"   Unmatched clearance barges: {len(clearance_barges):,}")
-
-# Build historical pairing for clearance
-print("\n7. Building clearance historical pairing patterns...")
-clearance_tugs['Date_Simple'] = clearance_tugs['Clearance_Date_Parsed'].dt.date
-clearance_barges['Date_Simple'] = clearance_barges['Clearance_Date_Parsed'].dt.date
-
-pairing_clr = defaultdict(int)
-
-tug_port_dates_clr = set(zip(clearance_tugs['Clearance_PORT'], clearance_tugs['Date_Simple']))
-barge_port_dates_clr = set(zip(clearance_barges['Clearance_PORT'], clearance_barges['Date_Simple']))
-common_port_dates_clr = tug_port_dates_clr & barge_port_dates_clr
-
-for port, date in common_port_dates_clr:
-    tugs_here = clearance_tugs[
-        (clearance_tugs['Clearance_PORT'] == port) &
-        (clearance_tugs['Date_Simple'] == date)
-    ]['Clearance_Vessel'].tolist()
-
-    barges_here = clearance_barges[
-        (clearance_barges['Clearance_PORT'] == port) &
-        (clearance_barges['Date_Simple'] == date)
-    ]['Clearance_Vessel'].tolist()
-
-    for tug in tugs_here:
-        for barge in barges_here:
-            pairing_clr[(tug, barge)] += 1
-
-print(f"   Clearance historical patterns: {len(pairing_clr):,} unique combinations")
-
-# Match clearance tugs with barges
-print("\n8. Matching clearance tugs with barges...")
-clearance_pairs = []
-matched_tug_clr = set()
-matched_barge_clr = set()
-
-for tug_idx, tug_row in clearance_tugs.iterrows():
-    if tug_idx in matched_tug_clr:
-        continue
-
-    tug_vessel = tug_row['Clearance_Vessel']
-    tug_port = tug_row['Clearance_PORT']
-    tug_date = tug_row['Date_Simple']
-
-    if pd.isna(tug_date):
-        continue
-
-    barge_candidates = clearance_barges[
-        (clearance_barges['Clearance_PORT'] == tug_port) &
-        (clearance_barges['Date_Simple'] >= tug_date - pd.Timedelta(days=1)) &
-        (clearance_barges['Date_Simple'] <= tug_date + pd.Timedelta(days=1)) &
-        (~clearance_barges.index.isin(matched_barge_clr))
-    ]
-
-    if len(barge_candidates) == 0:
-        continue
-
-    if len(barge_candidates) == 1:
-        barge_row = barge_candidates.iloc[0]
-        clearance_pairs.append({
-            'Pair_ID': f"TB_CLR_{len(clearance_pairs)+1}",
-            'Tug_Index': tug_idx,
-            'Barge_Index': barge_row.name,
-            'Confidence': 'SINGLE'
+        results = [result for batch in batches for result in _solve_block_batch(batch)]
+
+    chosen = np.zeros(len(edge_tugs), dtype=bool)
+    report = []
+    for block_id, block_chosen, seconds, pid in results:
+        edges = blocks[block_id]
+        chosen[edges[block_chosen]] = True
+        report.append({
+            'Block': block_id,
+            'Tugs': len(np.unique(edge_tugs[edges])),
+            'Barges': len(np.unique(edge_barges[edges])),
+            'Edges': len(edges),
+            'Pairs': len(block_chosen),
+            'Seconds': seconds,
+            'Worker_PID': pid,
+        })
+
+    tug_index = tugs.index.to_numpy()
+    barge_index = barges.index.to_numpy()
+    pairs = []
+    for edge in sorted(np.flatnonzero(chosen), key=lambda e: edge_tugs[e]):
+        pairs.append({
+            'Pair_ID': f"{pair_prefix}_{len(pairs)+1}",
+            'Tug_Index': tug_index[edge_tugs[edge]],
+            'Barge_Index': barge_index[edge_barges[edge]],
+            'Confidence': edge_confidence(edge_counts[edge], edge_single[edge])
         })
-        matched_tug_clr.add(tug_idx)
-        matched_barge_clr.add(barge_row.name)
+    report = pd.DataFrame(report, columns=['Block', 'Tugs', 'Barges', 'Edges', 'Pairs', 'Seconds', 'Worker_PID'])
+    return pairs, report
+
+
+def block_size_summary(block_report):
+    """Blocks, pairs and solve time grouped by block size (tugs + barges)"""
+    vessels = block_report['Tugs'] + block_report['Barges']
+    size = pd.cut(vessels, BLOCK_SIZE_BINS, labels=BLOCK_SIZE_LABELS, right=False)
+    summary = block_report.groupby(size, observed=True).agg(
+        Blocks=('Block', 'size'),
+        Pairs=('Pairs', 'sum'),
+        Seconds=('Seconds', 'sum'),
+        Max_Seconds=('Seconds', 'max'),
+    )
+    summary.index.name = 'Block_Size'
+    return summary.round({'Seconds': 3, 'Max_Seconds': 4}).reset_index()
+
+
+def expand_ranges(lo, hi):
+    """Flatten [lo, hi) ranges into (range number, value) arrays"""
+    sizes = hi - lo
+    owners = np.repeat(np.arange(len(lo)), sizes)
+    values = np.repeat(lo - np.r_[0, np.cumsum(sizes)[:-1]], sizes) + np.arange(sizes.sum())
+    return owners, values
+
+
+def detect_convoys(tugs, barges, pair_table, pairing, tow_prefix, min_support=1):
+    """
+    Group each tug with every barge it has history with (multi-barge tows).
+
+    A tow starts from the tug's pair, if any. Every barge that is still
+    unpaired, at the same PORT within +/-1 day, and whose vessel has at least
+    min_support co-occurrences with the tug's vessel joins the tow. A barge
+    supported by several tugs joins the one with the most history (earliest
+    tug row on ties).
+
+    Candidates come from BargeWindows. Per tug row the smaller of two
+    enumerations is used: scan the PORT +/-1 day window and test each barge
+    against the history keys, or look up each historical partner vessel's own
+    (PORT, vessel) window. Work follows min(window, partners) per tug, and tug
+    rows go in chunks of about CONVOY_CHUNK_EDGES candidates, reduced to a
+    running best claim per barge, so a river port with thousands of barge
+    movements a day stays bounded in memory.
+
+    pairing is the keyed (Tug_Vessel, Barge_Vessel) -> co-occurrences Series.
+    Returns one row per tow member: Tow_ID, Master_Index, Tow_Role
+    (TUG / BARGE), Tow_Join (PAIR / HISTORY), Confidence, Tow_Barges. A tug
+    row has no Tow_Join when the tug is paired; an unpaired tug heading a tow
+    (possible in optimal mode) is HISTORY with its strongest barge's confidence.
+    """
+    member_columns = ['Tow_ID', 'Master_Index', 'Tow_Role', 'Tow_Join', 'Confidence', 'Tow_Barges']
+    tug_positions = tugs.index.get_indexer(pair_table['Tug_Index'])
+    barge_positions = barges.index.get_indexer(pair_table['Barge_Index'])
+    paired_barge = np.zeros(len(barges), dtype=bool)
+    paired_barge[barge_positions] = True
+
+    # Vessel codes; supported history as sorted tug code * n + barge code keys
+    tug_names = pd.Index(pd.unique(tugs['Vessel'].dropna().to_numpy(dtype=object)))
+    barge_names = pd.Index(pd.unique(barges['Vessel'].dropna().to_numpy(dtype=object)))
+    n_barge_names = max(len(barge_names), 1)
+    supported = pairing[(pairing > 0) & (pairing >= min_support)]
+    hist_tug = tug_names.get_indexer(supported.index.get_level_values(0))
+    hist_barge = barge_names.get_indexer(supported.index.get_level_values(1))
+    known = (hist_tug >= 0) & (hist_barge >= 0)
+    hist_keys = hist_tug[known].astype(np.int64) * n_barge_names + hist_barge[known]
+    order = np.argsort(hist_keys)
+    hist_keys = hist_keys[order]
+    hist_counts = supported.to_numpy(dtype=float)[known][order]
+    tug_key_base = np.arange(len(tug_names) + 1, dtype=np.int64) * n_barge_names
+    partner_bounds = np.searchsorted(hist_keys, tug_key_base)
+
+    tug_code = tug_names.get_indexer(tugs['Vessel'].to_numpy(dtype=object))
+    barge_code = barge_names.get_indexer(barges['Vessel'].to_numpy(dtype=object))
+    tug_days, tug_valid = day_numbers(tugs['Date_Simple'])
+
+    port_windows = BargeWindows(barges, 'PORT')
+    tug_port = port_windows.key_codes(tugs)
+    barge_port = port_windows.key_codes(barges)
+    barge_port_vessel = np.where((barge_port >= 0) & (barge_code >= 0),
+                                 barge_port.astype(np.int64) * n_barge_names + barge_code, -1)
+    partner_windows = BargeWindows(barges.assign(Port_Vessel=pd.Series(barge_port_vessel, index=barges.index)
+                                                 .where(barge_port_vessel >= 0)), 'Port_Vessel')
+
+    active = np.flatnonzero(tug_valid & (tug_port >= 0) & (tug_code >= 0) & (len(hist_keys) > 0))
+    window_lo, window_hi = port_windows.windows(tug_port[active], tug_days[active])
+    partner_lo, partner_hi = partner_bounds[tug_code[active]], partner_bounds[tug_code[active] + 1]
+    scan = (window_hi - window_lo) <= (partner_hi - partner_lo)
+    cost = np.where(scan, window_hi - window_lo, partner_hi - partner_lo)
+    chunk_of = np.cumsum(cost) // CONVOY_CHUNK_EDGES
+
+    best_count = np.zeros(len(barges))
+    best_tug = np.full(len(barges), -1, dtype=np.int64)
+    for chunk in np.unique(chunk_of):
+        in_chunk = chunk_of == chunk
+        parts = []
+
+        rows = np.flatnonzero(in_chunk & scan)
+        owners, positions = expand_ranges(window_lo[rows], window_hi[rows])
+        tug = active[rows][owners]
+        barge = port_windows.rows[positions]
+        keys = tug_code[tug].astype(np.int64) * n_barge_names + barge_code[barge]
+        found = np.minimum(np.searchsorted(hist_keys, keys), len(hist_keys) - 1)
+        hit = (barge_code[barge] >= 0) & (hist_keys[found] == keys)
+        parts.append((tug[hit], barge[hit], hist_counts[found[hit]]))
+
+        rows = np.flatnonzero(in_chunk & ~scan)
+        owners, partners = expand_ranges(partner_lo[rows], partner_hi[rows])
+        tug = active[rows][owners]
+        port_vessel = tug_port[tug].astype(np.int64) * n_barge_names + hist_keys[partners] % n_barge_names
+        codes = partner_windows.key_index.get_indexer(port_vessel.astype(float))
+        lo, hi = partner_windows.windows(codes, tug_days[tug])
+        owners, positions = expand_ranges(lo, hi)
+        parts.append((tug[owners], partner_windows.rows[positions], hist_counts[partners[owners]]))
+
+        tug, barge, count = (np.concatenate(column) for column in zip(*parts))
+        free = ~paired_barge[barge]
+        tug, barge, count = tug[free], barge[free], count[free]
+        if len(barge) == 0:
+            continue
+
+        # Best claim per barge in this chunk, then against earlier (lower tug row) chunks
+        order = np.lexsort((tug, -count, barge))
+        first = order[np.r_[True, barge[order][1:] != barge[order][:-1]]]
+        better = count[first] > best_count[barge[first]]
+        best_count[barge[first][better]] = count[first][better]
+        best_tug[barge[first][better]] = tug[first][better]
+
+    joined = np.flatnonzero(best_tug >= 0)
+    members = pd.concat([
+        pd.DataFrame({'tug': tug_positions, 'barge': barge_positions, 'Tow_Join': 'PAIR',
+                      'Confidence': pair_table['Confidence'].to_numpy()}),
+        pd.DataFrame({'tug': best_tug[joined], 'barge': joined, 'Tow_Join': 'HISTORY',
+                      'Confidence': [f'HIST_{count:g}X' for count in best_count[joined]]}),
+    ], ignore_index=True).sort_values(['tug', 'Tow_Join', 'barge'], ascending=[True, False, True], kind='stable')
+    if len(members) == 0:
+        return pd.DataFrame(columns=member_columns)
+
+    tow_number = members['tug'].rank(method='dense').astype(int)
+    members['Tow_ID'] = [f"{tow_prefix}_{n}" for n in tow_number]
+    members['Tow_Barges'] = members.groupby('tug')['barge'].transform('size')
+
+    tug_members = members.drop_duplicates('tug')
+    head_count = pd.Series(best_count[joined]).groupby(best_tug[joined]).max()
+    head_paired = np.isin(tug_members['tug'].to_numpy(), tug_positions)
+    head_join = np.where(head_paired, None, 'HISTORY')
+    head_confidence = [None if paired else f'HIST_{head_count[tug]:g}X'
+                       for tug, paired in zip(tug_members['tug'], head_paired)]
+    tows = pd.concat([
+        pd.DataFrame({'Tow_ID': tug_members['Tow_ID'].to_numpy(),
+                      'Master_Index': tugs.index.to_numpy()[tug_members['tug'].to_numpy()],
+                      'Tow_Role': 'TUG', 'Tow_Join': head_join, 'Confidence': head_confidence,
+                      'Tow_Barges': tug_members['Tow_Barges'].to_numpy()}),
+        pd.DataFrame({'Tow_ID': members['Tow_ID'].to_numpy(),
+                      'Master_Index': barges.index.to_numpy()[members['barge'].to_numpy()],
+                      'Tow_Role': 'BARGE', 'Tow_Join': members['Tow_Join'].to_numpy(),
+                      'Confidence': members['Confidence'].to_numpy(),
+                      'Tow_Barges': members['Tow_Barges'].to_numpy()}),
+    ], ignore_index=True)
+    return tows[member_columns]
+
+
+def apply_tows(df, tow_tables):
+    """
+    Tow_ID / Tow_Barges on every tow member; barges joined by history, and
+    unpaired tugs heading a tow, become TUG_BARGE_CONVOY
+    """
+    tows = pd.concat(tow_tables, ignore_index=True)
+    rows = tows['Master_Index'].to_numpy()
+    df['Tow_ID'] = None
+    df.loc[rows, 'Tow_ID'] = tows['Tow_ID'].to_numpy(dtype=object)
+    tow_barges = pd.Series(pd.NA, index=df.index, dtype='Int64')
+    tow_barges.loc[rows] = tows['Tow_Barges'].to_numpy(dtype=np.int64)
+    df['Tow_Barges'] = tow_barges
+
+    joined = tows[tows['Tow_Join'] == 'HISTORY']
+    df.loc[joined['Master_Index'].to_numpy(), ['Match_Type', 'Pairing_Confidence']] = np.column_stack(
+        [np.full(len(joined), 'TUG_BARGE_CONVOY', dtype=object), joined['Confidence'].to_numpy(dtype=object)])
+    return int((joined['Tow_Role'] == 'BARGE').sum())
+
+
+def side_vessels(df, side):
+    """Unmatched (tugs, barges) of one side as PORT / Vessel / Date_Simple frames (master index kept)"""
+    config = TUG_BARGE_SIDES[side]
+    prefix = config['prefix']
+    unmatched = df[df['Match_Type'] == config['match_type']]
+    vessels = pd.DataFrame({
+        'PORT': unmatched[f'{prefix}_PORT'],
+        'Vessel': unmatched[f'{prefix}_Vessel'],
+        'Date_Simple': unmatched[config['date_col']].dt.normalize(),
+    })
+    vessel_type = unmatched[f'{prefix}_ICST_DESC']
+    return vessels[vessel_type.isin(TUG_TYPES)], vessels[vessel_type.isin(BARGE_TYPES)]
+
+
+def match_side(side, tugs, barges, pairing, assignment='greedy', workers=1, convoys=False, convoy_min_support=1):
+    """
+    Pair one side's tugs and barges; returns (pair table, stats, block report
+    or None, tow members or None).
+
+    pairing is the keyed (Tug_Vessel, Barge_Vessel) -> co-occurrences Series.
+
+    Module-level so it can run in a worker process when sides run concurrently.
+    """
+    start = time.perf_counter()
+    pair_prefix = TUG_BARGE_SIDES[side]['pair_prefix']
+    pairing_lookup = pairing.to_dict()
+    pairs = match_tugs_to_barges(tugs, barges, 'PORT', 'Vessel', pairing_lookup, pair_prefix)
+    stats = {'Side': side, 'Tugs': len(tugs), 'Barges': len(barges), 'Greedy_Pairs': len(pairs)}
+
+    block_report = None
+    if assignment == 'optimal':
+        pairs, block_report = match_tugs_to_barges_optimal(tugs, barges, 'PORT', 'Vessel', pairing_lookup,
+                                                           pair_prefix, workers)
+        block_report = block_report.assign(Side=side)
+        if len(pairs) < stats['Greedy_Pairs']:
+            raise RuntimeError(f"{side}: optimal assignment made {len(pairs):,} pairs, "
+                               f"fewer than greedy's {stats['Greedy_Pairs']:,}")
+    pair_table = pd.DataFrame(pairs, columns=PAIR_COLUMNS)
+    stats['Pairs'] = len(pairs)
+
+    tows = None
+    if convoys:
+        tows = detect_convoys(tugs, barges, pair_table, pairing, TUG_BARGE_SIDES[side]['tow_prefix'],
+                              convoy_min_support)
+        barge_members = tows[tows['Tow_Role'] == 'BARGE']
+        stats['Tows'] = int((tows['Tow_Role'] == 'TUG').sum())
+        stats['Convoy_Barges'] = int((barge_members['Tow_Join'] == 'HISTORY').sum())
+        stats['Tow_Size_Counts'] = barge_members.groupby('Tow_ID').size().value_counts().sort_index().to_dict()
+    stats['Seconds'] = time.perf_counter() - start
+    stats['Worker_PID'] = os.getpid()
+    return pair_table, stats, block_report, tows
+
+
+def match_sides(side_inputs, assignment='greedy', workers=1, convoys=False, convoy_min_support=1):
+    """
+    {side: (tugs, barges, pairing)} -> {side: match_side result}.
+
+    With workers > 1 the sides run concurrently on a process pool and the
+    remaining workers are shared out to each side's optimal block solver.
+    """
+    if workers <= 1:
+        return {side: match_side(side, *inputs, assignment=assignment, convoys=convoys,
+                                 convoy_min_support=convoy_min_support)
+                for side, inputs in side_inputs.items()}
+
+    block_workers = max(1, workers // len(side_inputs))
+    with ProcessPoolExecutor(max_workers=min(workers, len(side_inputs))) as pool:
+        futures = {side: pool.submit(match_side, side, *inputs, assignment=assignment,
+                                     workers=block_workers, convoys=convoys,
+                                     convoy_min_support=convoy_min_support)
+                   for side, inputs in side_inputs.items()}
+        return {side: future.result() for side, future in futures.items()}
+
+
+def apply_pairs(df, pair_tables):
+    """Mark every paired tug and barge row of the master in one vectorized update"""
+    pairs = pd.concat(pair_tables, ignore_index=True)
+    rows = np.r_[pairs['Tug_Index'].to_numpy(), pairs['Barge_Index'].to_numpy()]
+    updates = pd.DataFrame({
+        'Match_Type': 'TUG_BARGE_PAIR',
+        'Tug_Barge_Pair_ID': np.r_[pairs['Pair_ID'].to_numpy(), pairs['Pair_ID'].to_numpy()],
+        'Pairing_Confidence': np.r_[pairs['Confidence'].to_numpy(), pairs['Confidence'].to_numpy()],
+    }, index=rows)
+
+    df['Tug_Barge_Pair_ID'] = None
+    df['Pairing_Confidence'] = None
+    df.loc[rows, updates.columns] = updates.to_numpy(dtype=object)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pair unmatched tugs and barges in the port call master")
+    parser.add_argument('--assignment', choices=['greedy', 'optimal'], default='greedy')
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes: entrance and clearance run concurrently, "
+                             "the rest go to optimal assignment blocks (default 1 = in-process)")
+    parser.add_argument('--convoys', action='store_true',
+                        help="Also group each tug with every history-supported barge in its window (Tow_ID)")
+    parser.add_argument('--convoy-min-support', type=int, default=1,
+                        help="Co-occurrences a tug/barge pair needs to join a tow (default 1)")
+    parser.add_argument('--store', type=Path, default=PAIRING_STORE_FILE,
+                        help="Multi-year pairing store this run folds into and scores from")
+    parser.add_argument('--no-store', action='store_true',
+                        help="Score from this run's co-occurrences only (store untouched)")
+    parser.add_argument('--window-months', type=int, default=None,
+                        help="Only count store history from the trailing N months")
+    parser.add_argument('--half-life-months', type=float, default=None,
+                        help="Decay store history by 0.5 per N months of age")
+    args = parser.parse_args()
+
+    print("="*80)
+    print("TUG-BARGE PAIR MATCHING v1.1.0 COMPLETE")
+    print("="*80)
+    print("Processing BOTH entrance and clearance records")
+    print(f"Assignment: {args.assignment}")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+
+    # Load
+    print("\n1. Loading data...")
+    df = pd.read_csv(INPUT_FILE, low_memory=False)
+    print(f"   Records: {len(df):,}")
+
+    store = None
+    if not args.no_store:
+        start = time.perf_counter()
+        store = PairingStore.load(args.store)
+        summary = store.summary()
+        print(f"   Pairing store: {summary['records']:,} records from {summary['sources']} sources "
+              f"({summary['first_month']} to {summary['last_month']}), loaded in {(time.perf_counter() - start)*1000:.0f} ms")
+
+    # Parse dates
+    print("\n2. Parsing dates...")
+    df['Entrance_Date_Parsed'] = pd.to_datetime(df['Entrance_Arrival_Date'], errors='coerce')
+    # Clearance_Date is a mmydd code (8329 = 2023-08-29): take the marriage stage's parsed
+    # column, or decode it with the shared decoder anchored on the master's year
+    if 'Clearance_Clearance_Date_Parsed' in df.columns:
+        df['Clearance_Date_Parsed'] = pd.to_datetime(df['Clearance_Clearance_Date_Parsed'], errors='coerce')
     else:
-        best_barge = None
-        best_score = 0
-
-        for barge_idx, barge_row in barge_candidates.iterrows():
-            barge_vessel = barge_row['Clearance_Vessel']
-            score = pairing_clr.get((tug_vessel, barge_vessel), 0)
-
-            if score > best_score:
-                best_score = score
-                best_barge = (barge_idx, barge_row, barge_vessel)
-
-        if best_barge and best_score > 0:
-            barge_idx, barge_row, barge_vessel = best_barge
-            clearance_pairs.append({
-                'Pair_ID': f"TB_CLR_{len(clearance_pairs)+1}",
-                'Tug_Index': tug_idx,
-                'Barge_Index': barge_idx,
-                'Confidence': f'HIST_{best_score}X'
-            })
-            matched_tug_clr.add(tug_idx)
-            matched_barge_clr.add(barge_idx)
-
-print(f"   Clearance pairs created: {len(clearance_pairs):,}")
-
-# ============================================================================
-# UPDATE DATAFRAME
-# ============================================================================
-
-print("\n" + "="*80)
-print("UPDATING PORT CALL MASTER")
-print("="*80)
-
-# Initialize columns
-df['Tug_Barge_Pair_ID'] = None
-df['Pairing_Confidence'] = None
-
-# Update entrance pairs
-for pair in entrance_pairs:
-    df.loc[pair['Tug_Index'], 'Match_Type'] = 'TUG_BARGE_PAIR'
-    df.loc[pair['Barge_Index'], 'Match_Type'] = 'TUG_BARGE_PAIR'
-    df.loc[pair['Tug_Index'], 'Tug_Barge_Pair_ID'] = pair['Pair_ID']
-    df.loc[pair['Barge_Index'], 'Tug_Barge_Pair_ID'] = pair['Pair_ID']
-    df.loc[pair['Tug_Index'], 'Pairing_Confidence'] = pair['Confidence']
-    df.loc[pair['Barge_Index'], 'Pairing_Confidence'] = pair['Confidence']
-
-# Update clearance pairs
-for pair in clearance_pairs:
-    df.loc[pair['Tug_Index'], 'Match_Type'] = 'TUG_BARGE_PAIR'
-    df.loc[pair['Barge_Index'], 'Match_Type'] = 'TUG_BARGE_PAIR'
-    df.loc[pair['Tug_Index'], 'Tug_Barge_Pair_ID'] = pair['Pair_ID']
-    df.loc[pair['Barge_Index'], 'Tug_Barge_Pair_ID'] = pair['Pair_ID']
-    df.loc[pair['Tug_Index'], 'Pairing_Confidence'] = pair['Confidence']
-    df.loc[pair['Barge_Index'], 'Pairing_Confidence'] = pair['Confidence']
-
-# Save
-print("\n9. Saving updated file...")
-df.to_csv(OUTPUT_FILE, index=False)
-print(f"   Saved: {OUTPUT_FILE.name}")
-file_size = OUTPUT_FILE.stat().st_size / (1024 * 1024)
-print(f"   Size: {file_size:.1f} MB")
-
-# ============================================================================
-# SUMMARY
-# ============================================================================
-
-print("\n" + "="*80)
-print("FINAL SUMMARY")
-print("="*80)
-
-print(f"\nENTRANCE Results:")
-print(f"  Original unmatched tugs: {len(entrance_tugs):,}")
-print(f"  Original unmatched barges: {len(entrance_barges):,}")
-print(f"  Pairs created: {len(entrance_pairs):,}")
-print(f"  Records paired: {len(entrance_pairs)*2:,} ({len(entrance_pairs)*2/(len(entrance_tugs)+len(entrance_barges))*100:.1f}%)")
-
-print(f"\nCLEARANCE Results:")
-print(f"  Original unmatched tugs: {len(clearance_tugs):,}")
-print(f"  Original unmatched barges: {len(clearance_barges):,}")
-print(f"  Pairs created: {len(clearance_pairs):,}")
-print(f"  Records paired: {len(clearance_pairs)*2:,} ({len(clearance_pairs)*2/(len(clearance_tugs)+len(clearance_barges))*100:.1f}%)")
-
-print(f"\nTOTAL Tug-Barge Operations:")
-print(f"  Total pairs: {len(entrance_pairs) + len(clearance_pairs):,}")
-print(f"  Total records: {(len(entrance_pairs) + len(clearance_pairs))*2:,}")
-
-print(f"\nUpdated Match Type Distribution:")
-match_counts = df['Match_Type'].value_counts()
-for match_type, count in match_counts.items():
-    pct = count / len(df) * 100
-    print(f"  {match_type:<25} {count:>7,} ({pct:>5.1f}%)")
-
-print(f"\nCargo Vessel Port Calls (BOTH): {match_counts.get('BOTH', 0):,}")
-print(f"Tug-Barge Operations: {match_counts.get('TUG_BARGE_PAIR', 0)//2:,} operations ({match_counts.get('TUG_BARGE_PAIR', 0):,} records)")
-
-remaining_ent = match_counts.get('ENTRANCE_ONLY', 0)
-remaining_clr = match_counts.get('CLEARANCE_ONLY', 0)
-print(f"Remaining unmatched: {remaining_ent + remaining_clr:,}")
-
-print("\n" + "="*80)
-print("COMPLETE!")
-print("="*80)
-print(f"\nOutput: {OUTPUT_FILE}")
+        df['Clearance_Date_Parsed'], _ = decode_usace_dates(df['Clearance_Clearance_Date'],
+                                                            source_year_from_filename(INPUT_FILE))
+    print(f"   Entrance dates: {df['Entrance_Date_Parsed'].notna().sum():,}  "
+          f"Clearance dates: {df['Clearance_Date_Parsed'].notna().sum():,}")
+
+    print("\n3. Building historical pairing patterns...")
+    side_inputs = {}
+    pairing_tables = []
+    for side in TUG_BARGE_SIDES:
+        tugs, barges = side_vessels(df, side)
+        co_occurrences = co_occurrence_rows(tugs, barges, 'PORT', 'Vessel')
+        pairing_table = historical_pairing_counts(co_occurrences)
+        pairing_tables.append(pairing_table.reset_index().assign(Side=side))
+        print(f"   {side}: {len(tugs):,} unmatched tugs, {len(barges):,} unmatched barges")
+        print(f"   {side} historical patterns: {len(pairing_table):,} unique combinations "
+              f"({len(co_occurrences):,} co-occurrences)")
+
+        if store is not None:
+            store.fold(INPUT_FILE.name, side, co_occurrences)
+            pairing = store.counts(side, window_months=args.window_months,
+                                   half_life_months=args.half_life_months)
+            print(f"   {side} multi-year patterns (store): {len(pairing):,} unique combinations")
+        else:
+            pairing = pairing_table
+        side_inputs[side] = (tugs, barges, pairing)
+
+    print(f"\n4. Matching tugs with barges ({len(side_inputs)} sides, "
+          f"{'concurrent' if args.workers > 1 else 'in-process'})...")
+    results = match_sides(side_inputs, args.assignment, args.workers, args.convoys,
+                          args.convoy_min_support)
+    for side, (pairs, stats, _, _) in results.items():
+        print(f"   {side} pairs created: {stats['Greedy_Pairs']:,} greedy", end='')
+        if args.assignment == 'optimal':
+            print(f", {stats['Pairs']:,} optimal ({stats['Pairs'] - stats['Greedy_Pairs']:+,} vs greedy)", end='')
+        print(f" in {stats['Seconds']:.1f}s")
+
+    # ============================================================================
+    # UPDATE DATAFRAME
+    # ============================================================================
+
+    print("\n" + "="*80)
+    print("UPDATING PORT CALL MASTER")
+    print("="*80)
+
+    updated = apply_pairs(df, [pairs for pairs, _, _, _ in results.values()])
+    print(f"\n5. Updated {updated:,} tug/barge records")
+    if args.convoys:
+        joined = apply_tows(df, [tows for _, _, _, tows in results.values()])
+        print(f"   Tows marked: {int(df['Tow_ID'].nunique()):,} ({joined:,} extra barges -> TUG_BARGE_CONVOY)")
+
+    # Save
+    print("\n6. Saving updated file...")
+    df.to_csv(OUTPUT_FILE, index=False)
+    print(f"   Saved: {OUTPUT_FILE.name}")
+    file_size = OUTPUT_FILE.stat().st_size / (1024 * 1024)
+    print(f"   Size: {file_size:.1f} MB")
+
+    pairing_history = pd.concat(pairing_tables, ignore_index=True)[
+        ['Side', 'Tug_Vessel', 'Barge_Vessel', 'Co_Occurrences']]
+    pairing_history.to_csv(PAIRING_FILE, index=False)
+    print(f"   Saved: {PAIRING_FILE.name} ({len(pairing_history):,} tug/barge pairs)")
+
+    if store is not None:
+        store.save(args.store)
+        print(f"   Saved: {args.store.name} ({len(store):,} records)")
+
+    block_reports = [block_report for _, _, block_report, _ in results.values() if block_report is not None]
+    if block_reports:
+        block_report = pd.concat(block_reports, ignore_index=True)
+        block_report_file = OUTPUT_FILE.with_name(f"usace_2023_tug_barge_block_report_{timestamp}.csv")
+        block_report.to_csv(block_report_file, index=False)
+        print(f"   Saved: {block_report_file.name}")
+
+    # ============================================================================
+    # SUMMARY
+    # ============================================================================
+
+    print("\n" + "="*80)
+    print("FINAL SUMMARY")
+    print("="*80)
+
+    total_pairs = 0
+    for side, (pairs, stats, _, _) in results.items():
+        vessels = stats['Tugs'] + stats['Barges']
+        print(f"\n{side} Results:")
+        print(f"  Original unmatched tugs: {stats['Tugs']:,}")
+        print(f"  Original unmatched barges: {stats['Barges']:,}")
+        print(f"  Pairs created: {len(pairs):,}")
+        print(f"  Records paired: {len(pairs)*2:,} ({len(pairs)*2/vessels*100 if vessels else 0:.1f}%)")
+        if args.convoys:
+            print(f"  Tows: {stats['Tows']:,} ({stats['Convoy_Barges']:,} barges joined by history)")
+            print(f"  Barges per tow: " + ", ".join(f"{size}: {count:,}" for size, count in stats['Tow_Size_Counts'].items()))
+        total_pairs += len(pairs)
+
+    print(f"\nTOTAL Tug-Barge Operations:")
+    print(f"  Total pairs: {total_pairs:,}")
+    print(f"  Total records: {total_pairs*2:,}")
+
+    if block_reports:
+        print(f"\nOptimal Assignment:")
+        for side, (_, stats, _, _) in results.items():
+            print(f"  {side} pairs gained over greedy: {stats['Pairs'] - stats['Greedy_Pairs']:+,}")
+        print(f"\n  Solve time by block size (tugs + barges):")
+        print(block_size_summary(block_report).to_string(index=False))
+
+    print(f"\nUpdated Match Type Distribution:")
+    match_counts = df['Match_Type'].value_counts()
+    for match_type, count in match_counts.items():
+        pct = count / len(df) * 100
+        print(f"  {match_type:<25} {count:>7,} ({pct:>5.1f}%)")
+
+    print(f"\nCargo Vessel Port Calls (BOTH): {match_counts.get('BOTH', 0):,}")
+    print(f"Tug-Barge Operations: {match_counts.get('TUG_BARGE_PAIR', 0)//2:,} operations ({match_counts.get('TUG_BARGE_PAIR', 0):,} records)")
+
+    remaining_ent = match_counts.get('ENTRANCE_ONLY', 0)
+    remaining_clr = match_counts.get('CLEARANCE_ONLY', 0)
+    print(f"Remaining unmatched: {remaining_ent + remaining_clr:,}")
+
+    print("\n" + "="*80)
+    print("COMPLETE!")
+    print("="*80)
+    print(f"\nOutput: {OUTPUT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
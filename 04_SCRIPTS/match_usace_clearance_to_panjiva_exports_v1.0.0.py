@@ -15,50 +15,90 @@ Strategy:
 
 Note: Export data lacks IMO, so matching by vessel name only
 
+Ports join on the canonical integer Port_Key (port_keys.py), resolved once per
+distinct port string from the port dictionaries. The matching itself is the
+shared engine in usace_panjiva_matching.py (the clearance configuration of
+match_usace_to_panjiva_v1.0.0.py, single year, exports file layout).
+
+Each USACE record takes the Panjiva port call with the nearest Shipment_Date
+(same vessel and Port_Key, within 7 days) through a merge_asof on the distinct
+(vessel, port, date) keys - the Panjiva table is never copied per day offset.
+Match_Pass follows from the offset (<=2 days pass 1, <=4 pass 2, <=7 pass 3).
+
+One-to-one mode (--assignment one-to-one): nearest matching lets several
+USACE records claim the same VOY_RECID, double counting Panjiva_Tons. This
+mode enumerates every candidate pair within the tolerance (binary-searched
+date windows, O(n log n) plus candidates), then claims pairs globally by
+smallest offset - ties to the earlier Shipment_Date, lowest VOY_RECID, then
+USACE row order - so each port call is assigned at most once. Records whose
+nearest call was contested or whose assignment changed go to a conflict report.
+
+Fuzzy pass: records the exact pass leaves unmatched are retried against the
+Panjiva calls nobody claimed, blocked on (Port_Key, +/-7 day window) and
+scored with fuzzy_match.py (canonical vessel keys, trigram candidates, banded
+edit distance, hull numbers must agree). Pairs at or above --fuzzy-threshold
+are claimed one-to-one by score and tagged Match_Method='Vessel_Fuzzy';
+Match_Name_Score is 1.0 for exact matches.
+
 Input:
 - USACE: 02_STAGE02_CLASSIFICATION/usace_2023_outbound_clearance_transformed_v2.2.0.csv
+  (or the Year=2023/Direction=Outbound partition of usace_transformed_parquet/ when present)
 - Panjiva: 01_STAGE01_PREPROCESSING/01.01_annual_files/panjiva_exports_2023_PORTCALL_*.csv
 
 Output: 02_STAGE02_CLASSIFICATION/usace_2023_clearance_with_panjiva_match_v1.0.0.csv
+  (keeps Port_Key so the rollup stage joins on it)
+One-to-one mode: usace_2023_clearance_panjiva_conflict_report_{timestamp}.csv
+
+Usage:
+    python match_usace_clearance_to_panjiva_exports_v1.0.0.py
+    python match_usace_clearance_to_panjiva_exports_v1.0.0.py --assignment one-to-one
+    python match_usace_clearance_to_panjiva_exports_v1.0.0.py --fuzzy-threshold 0.9
 """
 
+import argparse
 import pandas as pd
 import numpy as np
-import re
 from pathlib import Path
-from datetime import timedelta
+from datetime import datetime
+
+from fuzzy_match import DEFAULT_THRESHOLD
+from port_keys import PortKeyResolver, UNRESOLVED_KEY_BASE
+from pipeline_common import USACE_PARQUET_ROOT, decode_usace_dates, read_usace_table, source_year_from_filename
+from usace_panjiva_matching import DIRECTIONS, MATCH_TOLERANCE_DAYS, match_port_calls, panjiva_call_frame
 
 # File paths
 USACE_FILE = Path(r"G:\My Drive\LLM\project_manifest\02_STAGE02_CLASSIFICATION\usace_2023_outbound_clearance_transformed_v2.2.0.csv")
 PANJIVA_DIR = Path(r"G:\My Drive\LLM\project_manifest\01_STAGE01_PREPROCESSING\01.01_annual_files")
 OUTPUT_FILE = Path(r"G:\My Drive\LLM\project_manifest\02_STAGE02_CLASSIFICATION\usace_2023_clearance_with_panjiva_match_v1.0.0.csv")
 
+parser = argparse.ArgumentParser(description="Match USACE clearances to Panjiva export port calls")
+parser.add_argument('--assignment', choices=['nearest', 'one-to-one'], default='nearest',
+                    help="nearest: best call per USACE record; one-to-one: each VOY_RECID assigned at most once")
+parser.add_argument('--fuzzy-threshold', type=float, default=DEFAULT_THRESHOLD,
+                    help="Minimum vessel name similarity for the fuzzy pass (default %(default)s)")
+parser.add_argument('--no-fuzzy', action='store_true', help="Exact vessel name pass only")
+args = parser.parse_args()
+
 print("="*80)
 print("USACE-PANJIVA CLEARANCE MATCHING v1.0.0 (FAST VECTORIZED)")
 print("="*80)
 
 # Load USACE clearance data
 print(f"\n1. Loading USACE clearance data...")
-usace = pd.read_csv(USACE_FILE, low_memory=False)
+if USACE_PARQUET_ROOT.exists():
+    print(f"   Source: {USACE_PARQUET_ROOT.name} (Year=2023, Direction=Outbound)")
+    usace = read_usace_table(USACE_PARQUET_ROOT, years=[2023], directions=['Outbound'])
+else:
+    usace = read_usace_table(USACE_FILE)
 print(f"   Records: {len(usace):,}")
 
 # Parse USACE dates (mmydd format)
 print(f"\n2. Parsing USACE dates (mmydd format)...")
-def parse_usace_date(date_val):
-    """Convert mmydd integer to proper date (e.g., 8329 -> 2023-08-29)"""
-    if pd.isna(date_val):
-        return None
-    try:
-        date_str = str(int(date_val)).zfill(5)
-        month = int(date_str[:2])
-        year_digit = int(date_str[2])
-        day = int(date_str[3:])
-        year = 2020 + year_digit
-        return pd.Timestamp(year=year, month=month, day=day)
-    except:
-        return None
-
-usace['Clearance_Date_Parsed'] = usace['Clearance_Date'].apply(parse_usace_date)
+usace['Clearance_Date_Parsed'], invalid_dates = decode_usace_dates(
+    usace['Clearance_Date'], source_year_from_filename(USACE_FILE))
+print(f"   Dates parsed: {usace['Clearance_Date_Parsed'].notna().sum():,}")
+if invalid_dates:
+    print(f"   Invalid dates: {dict(invalid_dates)}")
 print(f"   Sample dates: {usace['Clearance_Date_Parsed'].dropna().head(3).tolist()}")
 
 # Load Panjiva export port call data
@@ -72,78 +112,37 @@ export_files.sort()
 panjiva_file = export_files[-1]
 print(f"   Loading: {panjiva_file.name}")
 
-panjiva = pd.read_csv(panjiva_file, low_memory=False)
-panjiva['Shipment_Date'] = pd.to_datetime(panjiva['Shipment_Date'], errors='coerce')
+panjiva = panjiva_call_frame(pd.read_csv(panjiva_file, low_memory=False), DIRECTIONS['clearance'])
 print(f"   Port calls: {len(panjiva):,}")
 
-# Normalize functions
-def normalize_vessel_name(name):
-    if pd.isna(name) or name == '':
-        return ''
-    normalized = re.sub(r'[^a-zA-Z0-9\s]', '', str(name))
-    return ' '.join(normalized.lower().split())
-
-def normalize_port_name(name):
-    """Extract city name only for matching (state codes don't match between datasets)"""
-    if pd.isna(name) or name == '':
-        return ''
-    name = str(name).upper()
-    parts = name.split(',')
-    if len(parts) > 0:
-        city = parts[0].strip()
-        # Remove common prefixes
-        city = city.replace('PORT OF ', '').replace('PORT ', '').replace('THE ', '')
-        # Remove suffixes that vary
-        city = city.replace(' UNIFIED PORT DISTRICT', '').replace(' PORT DISTRICT', '')
-        city = city.replace(' PORT AUTHORITY', '').replace(' AUTHORITY OF HARRIS COUNTY', '')
-        city = city.replace(' STATE PORT AUTHORITY', '').replace(' STATE AUTHORITY', '')
-        return city.strip()
-    return name.upper()
-
 print(f"\n4. Normalizing matching keys...")
-usace['Vessel_Norm'] = usace['Vessel'].apply(normalize_vessel_name)
-usace['Port_Norm'] = usace['Clearance_Port_Name'].apply(normalize_port_name)
-
-panjiva['Vessel_Norm'] = panjiva['Vessel'].apply(normalize_vessel_name)
-panjiva['Port_Norm'] = panjiva['Port_of_Lading'].apply(normalize_port_name)
-
-# Create expanded Panjiva with date offsets
-print(f"\n5. Creating date-expanded Panjiva dataset...")
-panjiva_expanded = []
-for offset in range(-7, 8):  # -7 to +7 days
-    temp = panjiva.copy()
-    temp['Match_Date'] = temp['Shipment_Date'] + pd.Timedelta(days=offset)
-    temp['Days_Offset'] = abs(offset)
-    # Assign Pass based on tolerance
-    if abs(offset) <= 2:
-        temp['Pass'] = 1
-    elif abs(offset) <= 4:
-        temp['Pass'] = 2
-    else:
-        temp['Pass'] = 3
-    panjiva_expanded.append(temp)
-
-panjiva_expanded = pd.concat(panjiva_expanded, ignore_index=True)
-print(f"   Expanded to {len(panjiva_expanded):,} date-offset combinations")
-
-# Match by Vessel Name + Port + Date
-print(f"\n6. MATCHING BY VESSEL NAME + PORT + DATE...")
+# Canonical integer port keys (each distinct port string resolved once)
+port_resolver = PortKeyResolver.load()
+usace['Port_Key'] = port_resolver.keys(usace['Clearance_Port_Name'])
+panjiva['Port_Key'] = port_resolver.keys(panjiva['Port_Name'])
+for label, frame in (('USACE', usace), ('Panjiva', panjiva)):
+    known = (frame['Port_Key'] >= 0) & (frame['Port_Key'] < UNRESOLVED_KEY_BASE)
+    print(f"   {label} port keys: {frame['Port_Key'].nunique():,} distinct, "
+          f"{int(known.sum()):,} rows on dictionary ports ({known.mean()*100:.1f}%)")
+
+# Nearest-date join (no date-offset expansion)
+print(f"\n5. Indexing Panjiva port call dates...")
+print(f"   Port calls with a shipment date: {int(panjiva['Call_Date'].notna().sum()):,} (no date-offset expansion)")
+
+# Match by Vessel Name + Port + Date, then fuzzy names for what is left
+print(f"\n6. MATCHING BY VESSEL NAME + PORT + DATE (nearest within +/-{MATCH_TOLERANCE_DAYS} days)...")
 usace['Match_Date'] = usace['Clearance_Date_Parsed']
+strategies = ['Vessel_Name'] if args.no_fuzzy else ['Vessel_Name', 'Vessel_Fuzzy']
+matched_best, match_stats, report = match_port_calls(
+    usace, panjiva, strategies, assignment=args.assignment, fuzzy_threshold=args.fuzzy_threshold,
+    port_col='Clearance_Port_Name', date_label='Clearance_Date_Parsed')
 
-# Merge on Vessel + Port + Date
-matched = usace.merge(
-    panjiva_expanded[['VOY_RECID', 'Vessel_Norm', 'Port_Norm', 'Match_Date', 'Carrier',
-                      'Shipper', 'Total_Tons', 'Days_Offset', 'Pass']],
-    on=['Vessel_Norm', 'Port_Norm', 'Match_Date'],
-    how='left',
-    suffixes=('', '_panjiva')
-)
-
-# Keep best match per USACE record (lowest date offset)
-matched = matched.sort_values('Days_Offset')
-matched_best = matched.groupby(matched.index).first()
+if report is not None:
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+    report_file = OUTPUT_FILE.with_name(f"usace_2023_clearance_panjiva_conflict_report_{timestamp}.csv")
+    report.to_csv(report_file, index=False)
+    print(f"   Conflict report: {report_file.name}")
 
-# Count matches
 total_matched = matched_best['VOY_RECID'].notna().sum()
 print(f"   [OK] Total matches found: {total_matched:,}")
 
@@ -152,15 +151,15 @@ print(f"\n7. Preparing final output...")
 usace_final = usace.copy()
 usace_final['VOY_RECID'] = matched_best['VOY_RECID']
 usace_final['Panjiva_Carrier'] = matched_best['Carrier']
-usace_final['Panjiva_Shipper'] = matched_best['Shipper']
+usace_final['Panjiva_Shipper'] = matched_best['Party']
 usace_final['Panjiva_Tons'] = matched_best['Total_Tons']
 usace_final['Match_Days_Offset'] = matched_best['Days_Offset']
 usace_final['Match_Pass'] = matched_best['Pass']
-usace_final['Match_Method'] = 'Vessel_Name'
-usace_final.loc[usace_final['VOY_RECID'].isna(), 'Match_Method'] = None
+usace_final['Match_Method'] = matched_best['Method']
+usace_final['Match_Name_Score'] = matched_best['Name_Score']
 
 # Drop temporary columns
-usace_final.drop(['Vessel_Norm', 'Port_Norm', 'Match_Date', 'Clearance_Date_Parsed'],
+usace_final.drop(['Match_Date', 'Clearance_Date_Parsed'],
                  axis=1, inplace=True, errors='ignore')
 
 # Save
@@ -184,6 +183,9 @@ print(f"  [OK] Pass 1 (+/-2 days): {pass1_matches:,} ({pass1_matches/len(usace_f
 print(f"  [OK] Pass 2 (+/-4 days): {pass2_matches:,} ({pass2_matches/len(usace_final)*100:.1f}%)")
 print(f"  [OK] Pass 3 (+/-7 days): {pass3_matches:,} ({pass3_matches/len(usace_final)*100:.1f}%)")
 print(f"  [OK] Total matched:      {total_matched:,} ({total_matched/len(usace_final)*100:.1f}%)")
+fuzzy_total = int((usace_final['Match_Method'] == 'Vessel_Fuzzy').sum())
+if fuzzy_total:
+    print(f"       of which fuzzy:     {fuzzy_total:,} ({fuzzy_total/len(usace_final)*100:.1f}%)")
 print(f"  [--] Unmatched:          {total_unmatched:,} ({total_unmatched/len(usace_final)*100:.1f}%)")
 
 if total_matched > 0:
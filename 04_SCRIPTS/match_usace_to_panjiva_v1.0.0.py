@@ -0,0 +1,212 @@
+"""
+Match USACE Entrances/Clearances to Panjiva Import/Export Port Calls
+Version: 1.0.0
+Date: 2026-10-19
+
+Purpose:
+- One script for both directions on the shared engine (usace_panjiva_matching.py):
+    --direction entrance   USACE inbound entrances  <-> Panjiva imports (IMO, then vessel name)
+    --direction clearance  USACE outbound clearances <-> Panjiva exports (vessel name only)
+- Key strategies run in order on what earlier ones left unmatched
+  (default per direction; --strategies overrides)
+- Tolerance schedule --passes (default 2,4,7 days) and --assignment
+  nearest / one-to-one
+- Multi-year: every year's USACE records and Panjiva port calls are stacked
+  and joined on the calendar date, so year-end calls match across files
+- Per strategy and pass match rates and timings, printed and saved
+
+Input:
+- USACE: usace_transformed_parquet/ (Year/Direction partitions) when present,
+  else 02_STAGE02_CLASSIFICATION/usace_{YEAR}_{inbound_entrance|outbound_clearance}_transformed_v2.2.0.csv
+- Panjiva: 01_STAGE01_PREPROCESSING/01.01_annual_files/panjiva_{imports|exports}_{YEAR}_PORTCALL_*.csv
+  (latest file per year)
+
+Output (YEARS = 2023 or 2022_2023):
+- 02_STAGE02_CLASSIFICATION/usace_{YEARS}_{direction}_with_panjiva_match_v2.0.0.csv
+- 02_STAGE02_CLASSIFICATION/usace_{YEARS}_{direction}_panjiva_match_stats_{timestamp}.csv
+- One-to-one mode: usace_{YEARS}_{direction}_panjiva_conflict_report_{timestamp}.csv
+
+Usage:
+    python match_usace_to_panjiva_v1.0.0.py --direction entrance
+    python match_usace_to_panjiva_v1.0.0.py --direction clearance --years 2022 2023 --assignment one-to-one
+    python match_usace_to_panjiva_v1.0.0.py --direction entrance --strategies IMO Vessel_Name --passes 1,3,7
+    python match_usace_to_panjiva_v1.0.0.py --direction clearance --keys-only   (read only the matching columns)
+"""
+
+import argparse
+import time
+import pandas as pd
+from datetime import datetime
+from pathlib import Path
+
+from fuzzy_match import DEFAULT_THRESHOLD
+from port_keys import PortKeyResolver, UNRESOLVED_KEY_BASE
+from pipeline_common import PROJECT_ROOT, STAGE02_DIR, USACE_PARQUET_ROOT, decode_usace_dates, read_usace_table
+from usace_panjiva_matching import DIRECTIONS, STRATEGIES, match_port_calls, panjiva_call_frame, parse_passes
+
+PANJIVA_DIR = PROJECT_ROOT / "01_STAGE01_PREPROCESSING" / "01.01_annual_files"
+
+
+def usace_match_columns(config):
+    """USACE columns matching needs (record ID, vessel keys, date, port)"""
+    return ['RECID', 'Vessel', 'IMO', config['usace_date'], config['usace_port']]
+
+
+def load_usace(config, years, usace_dir, parquet_root, columns=None):
+    """USACE records for every year with Match_Date decoded on that year's anchor and Source_Year"""
+    frames = []
+    for year in years:
+        if parquet_root.exists():
+            frame = read_usace_table(parquet_root, columns=columns, years=[year],
+                                     directions=[config['usace_direction']])
+            source = f"{parquet_root.name} (Year={year}, Direction={config['usace_direction']})"
+        else:
+            path = usace_dir / f"usace_{year}_{config['usace_label']}_transformed_v2.2.0.csv"
+            if not path.exists():
+                print(f"   [--] {path.name} not found, skipping {year}")
+                continue
+            frame = read_usace_table(path, columns=columns)
+            source = path.name
+        frame['Match_Date'], invalid_dates = decode_usace_dates(frame[config['usace_date']], year)
+        frame['Source_Year'] = year
+        print(f"   {source}: {len(frame):,} records, {int(frame['Match_Date'].notna().sum()):,} dates parsed")
+        if invalid_dates:
+            print(f"      Invalid dates: {dict(invalid_dates)}")
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def load_panjiva(config, years, panjiva_dir):
+    """Latest Panjiva port call file per year, renamed to the engine schema, with Panjiva_Year"""
+    frames = []
+    for year in years:
+        files = sorted(Path(panjiva_dir).glob(f"panjiva_{config['panjiva_label']}_{year}_PORTCALL_*.csv"))
+        if not files:
+            print(f"   [--] No panjiva_{config['panjiva_label']}_{year}_PORTCALL_*.csv, skipping {year}")
+            continue
+        calls = panjiva_call_frame(pd.read_csv(files[-1], low_memory=False), config)
+        calls['Panjiva_Year'] = year
+        print(f"   {files[-1].name}: {len(calls):,} port calls "
+              f"({int(calls['IMO'].notna().sum()):,} with IMO)")
+        frames.append(calls)
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Match USACE entrances/clearances to Panjiva import/export port calls")
+    parser.add_argument('--direction', choices=sorted(DIRECTIONS), required=True)
+    parser.add_argument('--years', type=int, nargs='+', default=[2023])
+    parser.add_argument('--panjiva-years', type=int, nargs='+', default=None,
+                        help="Panjiva port call years to load (default: --years; add neighbours for year-end calls)")
+    parser.add_argument('--strategies', nargs='+', choices=STRATEGIES, default=None,
+                        help="Key strategies in order (default per direction)")
+    parser.add_argument('--passes', default='2,4,7', help="Tolerance schedule in days, one per pass (default %(default)s)")
+    parser.add_argument('--assignment', choices=['nearest', 'one-to-one'], default='nearest',
+                        help="nearest: best call per USACE record; one-to-one: each VOY_RECID assigned at most once")
+    parser.add_argument('--fuzzy-threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Minimum vessel name similarity for Vessel_Fuzzy (default %(default)s)")
+    parser.add_argument('--no-fuzzy', action='store_true', help="Drop the Vessel_Fuzzy strategy")
+    parser.add_argument('--keys-only', action='store_true',
+                        help="Read only the USACE columns matching needs (output without pass-through columns)")
+    parser.add_argument('--usace-dir', type=Path, default=STAGE02_DIR)
+    parser.add_argument('--parquet-root', type=Path, default=USACE_PARQUET_ROOT)
+    parser.add_argument('--panjiva-dir', type=Path, default=PANJIVA_DIR)
+    parser.add_argument('--output-dir', type=Path, default=STAGE02_DIR)
+    args = parser.parse_args()
+
+    config = DIRECTIONS[args.direction]
+    passes = parse_passes(args.passes)
+    strategies = args.strategies or config['strategies']
+    if args.no_fuzzy:
+        strategies = [strategy for strategy in strategies if strategy != 'Vessel_Fuzzy']
+    years = sorted(set(args.years))
+    year_label = '_'.join(str(year) for year in years)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+
+    print("="*80)
+    print(f"USACE-PANJIVA {args.direction.upper()} MATCHING v1.0.0")
+    print("="*80)
+    print(f"Strategies: {' -> '.join(strategies)}")
+    print(f"Passes: " + ', '.join(f"{number}: +/-{days}d" for number, days in passes.items()))
+    print(f"Assignment: {args.assignment}")
+
+    start = time.perf_counter()
+    print(f"\n1. Loading USACE {config['usace_label']} records ({', '.join(map(str, years))})...")
+    usace = load_usace(config, years, args.usace_dir, args.parquet_root,
+                       columns=usace_match_columns(config) if args.keys_only else None)
+    if usace is None:
+        print("   ERROR: No USACE records found!")
+        return
+    print(f"   Records: {len(usace):,}")
+
+    print(f"\n2. Loading Panjiva {config['panjiva_label']} port calls...")
+    panjiva = load_panjiva(config, sorted(set(args.panjiva_years or years)), args.panjiva_dir)
+    if panjiva is None:
+        print(f"   ERROR: No Panjiva {config['panjiva_label']} port call files found!")
+        return
+    print(f"   Port calls: {len(panjiva):,}")
+
+    print(f"\n3. Resolving port keys...")
+    port_resolver = PortKeyResolver.load()
+    usace['Port_Key'] = port_resolver.keys(usace[config['usace_port']])
+    panjiva['Port_Key'] = port_resolver.keys(panjiva['Port_Name'])
+    for label, frame in (('USACE', usace), ('Panjiva', panjiva)):
+        known = (frame['Port_Key'] >= 0) & (frame['Port_Key'] < UNRESOLVED_KEY_BASE)
+        print(f"   {label} port keys: {frame['Port_Key'].nunique():,} distinct, "
+              f"{int(known.sum()):,} rows on dictionary ports ({known.mean()*100:.1f}%)")
+
+    print(f"\n4. Matching...")
+    matches, stats, report = match_port_calls(
+        usace, panjiva, strategies, assignment=args.assignment, passes=passes,
+        fuzzy_threshold=args.fuzzy_threshold, port_col=config['usace_port'],
+        date_label=f"{config['usace_date']}_Parsed")
+
+    print(f"\n5. Saving...")
+    output = usace.drop(columns=['Match_Date'])
+    output['VOY_RECID'] = matches['VOY_RECID']
+    output['Panjiva_Year'] = matches['Panjiva_Row'].map(panjiva['Panjiva_Year'])
+    output['Panjiva_Carrier'] = matches['Carrier']
+    output[config['party_output']] = matches['Party']
+    output['Panjiva_Tons'] = matches['Total_Tons']
+    output['Match_Days_Offset'] = matches['Days_Offset']
+    output['Match_Pass'] = matches['Pass']
+    output['Match_Method'] = matches['Method']
+    output['Match_Name_Score'] = matches['Name_Score']
+
+    output_file = args.output_dir / f"usace_{year_label}_{args.direction}_with_panjiva_match_v2.0.0.csv"
+    stats_file = args.output_dir / f"usace_{year_label}_{args.direction}_panjiva_match_stats_{timestamp}.csv"
+    output.to_csv(output_file, index=False)
+    stats.to_csv(stats_file, index=False)
+    print(f"   {output_file.name}")
+    print(f"   {stats_file.name}")
+    if report is not None:
+        for side in ('Nearest', 'Assigned'):
+            report.insert(report.columns.get_loc(f"{side}_Panjiva_Row"), f"{side}_Panjiva_Year",
+                          report[f"{side}_Panjiva_Row"].map(panjiva['Panjiva_Year']))
+        report_file = args.output_dir / f"usace_{year_label}_{args.direction}_panjiva_conflict_report_{timestamp}.csv"
+        report.to_csv(report_file, index=False)
+        print(f"   {report_file.name}")
+
+    print("\n" + "="*80)
+    print("MATCH RATES BY STRATEGY AND PASS")
+    print("="*80)
+    print(stats.to_string(index=False))
+
+    matched = output['VOY_RECID'].notna()
+    print(f"\nTotal USACE {args.direction} records: {len(output):,}")
+    print(f"  [OK] Matched:   {int(matched.sum()):,} ({matched.mean()*100:.1f}%)")
+    print(f"  [--] Unmatched: {int((~matched).sum()):,} ({(~matched).mean()*100:.1f}%)")
+    if len(years) > 1:
+        print(f"\nBy year:")
+        for year, rate in matched.groupby(output['Source_Year']).mean().items():
+            print(f"  {year}: {rate*100:.1f}%")
+        cross_year = int((matched & (output['Panjiva_Year'] != output['Source_Year'])).sum())
+        print(f"  Matches to another year's Panjiva file: {cross_year:,}")
+    claimed = output.loc[matched, ['VOY_RECID', 'Panjiva_Year']]
+    print(f"  Distinct port calls matched: {len(claimed.drop_duplicates()):,}")
+
+    print(f"\nCompleted in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
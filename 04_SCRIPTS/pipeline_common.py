@@ -0,0 +1,585 @@
+"""
+Shared Pipeline Helpers
+Version: 1.0.0
+Date: 2026-10-19
+
+Purpose:
+- Single place for logic that several 04_SCRIPTS stages need
+- Load the USACE reference dictionaries once into a picklable bundle
+  (ports, foreign ports, ships register, cargo class, agency fees), including
+  the trigram index used for fuzzy vessel name matching
+- Parse year/direction from raw USACE file names
+- Decode USACE mmydd dates (ECDATE / Clearance_Date) vectorized, with the
+  decade anchored on the source file's year
+- Merge per-chunk counters for streaming transforms; the shared streaming
+  driver and summary printout of the entrance/clearance transforms
+- Peak resident memory of the current process (resource, or optional psutil on Windows)
+- Enrich by low-cardinality key: look each distinct key up once and
+  broadcast the result to every row through its factorized code
+- Write/read transformed USACE data as Parquet partitioned by
+  Year / Direction / Port_Coast (optional dependency: pyarrow)
+
+Usage:
+    from pipeline_common import load_reference_bundle
+    refs = load_reference_bundle()
+"""
+
+import re
+import shutil
+import sys
+import time
+from collections import Counter
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from fuzzy_match import TrigramIndex, fuzzy_vessel_key
+
+PROJECT_ROOT = Path(r"G:\My Drive\LLM\project_manifest")
+DICT_PATH = PROJECT_ROOT / "01.01_dictionary"
+USACE_RAW_DIR = PROJECT_ROOT / "00_raw_data" / "00_03_usace_entrance_clearance_raw"
+STAGE02_DIR = PROJECT_ROOT / "02_STAGE02_CLASSIFICATION"
+
+# Transformed USACE data as one Parquet dataset: Year=/Direction=/Port_Coast=
+USACE_PARQUET_ROOT = STAGE02_DIR / "usace_transformed_parquet"
+PARQUET_PARTITIONS = ['Year', 'Direction', 'Port_Coast']
+PARQUET_EMPTY_COAST = 'Unknown'  # partition value for rows with no Port_Coast
+
+# Entrances_Clearances_2023_2023_Inbound.csv -> (2023, 2023, 'Inbound')
+USACE_RAW_PATTERN = re.compile(r"Entrances_Clearances_(\d{4})_(\d{4})_(Inbound|Outbound)\.csv$", re.IGNORECASE)
+
+
+def normalize_name(name):
+    """Vessel name key for ships register lookup (uppercase, alphanumerics only)"""
+    if pd.isna(name) or name == '':
+        return ''
+    name = str(name).upper()
+    name = re.sub(r'[^A-Z0-9]', '', name)
+    return name
+
+
+def parse_usace_raw_filename(path):
+    """Return (start_year, end_year, direction) for a raw USACE file, or None"""
+    match = USACE_RAW_PATTERN.search(Path(path).name)
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2)), match.group(3).capitalize()
+
+
+def source_year_from_filename(path):
+    """First 4-digit year in a pipeline file name (usace_2023_... / ..._2023_2023_Inbound.csv)"""
+    match = re.search(r"(?<!\d)(19|20)(\d{2})(?!\d)", Path(path).name)
+    if not match:
+        raise ValueError(f"Cannot derive a year from file name: {Path(path).name}")
+    return int(match.group(1) + match.group(2))
+
+
+def parquet_partition_year(path):
+    """
+    Year partition of a transformed USACE file in the Parquet dataset.
+
+    Raw names carry a start and end year; a file spanning several years has no
+    single Year= partition (writing it under the start year would also collide
+    with that year's own file), so it is rejected - transform it to CSV instead.
+    """
+    parsed = parse_usace_raw_filename(path)
+    if parsed is None:
+        return source_year_from_filename(path)
+    start_year, end_year, _ = parsed
+    if start_year != end_year:
+        raise ValueError(f"{Path(path).name} spans {start_year}-{end_year}; the Parquet dataset is "
+                         f"partitioned by single Year - use CSV output for multi-year files")
+    return start_year
+
+
+def decode_usace_dates(values, anchor_year):
+    """
+    Decode USACE mmydd dates (8329 -> 2023-08-29) with integer arithmetic.
+
+    The single year digit resolves to the year ending in that digit nearest
+    anchor_year (the source file's year, see source_year_from_filename), so a
+    2023 file reads digits 8-9 as 2018-2019 and 0-7 as 2020-2027.
+
+    Returns (datetime64 Series aligned to values, Counter of invalid reasons:
+    missing, non_numeric, not_integer, bad_month, bad_day). Invalid rows are NaT.
+    """
+    values = pd.Series(values)
+    number = pd.to_numeric(values, errors='coerce').to_numpy(dtype='float64')
+    missing = values.isna().to_numpy()
+    non_numeric = np.isnan(number) & ~missing
+    finite = ~np.isnan(number)
+    not_integer = finite & (number != np.floor(np.where(finite, number, 0)))
+
+    # Decode every possible code 0..12999 once, then gather per row
+    table = np.arange(13000)
+    month = table // 1000
+    digit = (table // 100) % 10
+    day = table % 100
+    year = anchor_year + (digit - anchor_year + 5) % 10 - 5
+    table_bad_month = (month < 1) | (month > 12)
+    month_start = ((year - 1970) * 12 + np.clip(month, 1, 12) - 1).astype('datetime64[M]')
+    first_day = month_start.astype('datetime64[D]')
+    days_in_month = ((month_start + 1).astype('datetime64[D]') - first_day).astype(np.int64)
+    table_bad_day = ~table_bad_month & ((day < 1) | (day > days_in_month))
+    table_dates = (first_day + (day - 1)).astype('datetime64[ns]')
+    table_dates[table_bad_month | table_bad_day] = np.datetime64('NaT')
+
+    candidate = finite & ~not_integer
+    code = np.where(candidate, number, 0).astype(np.int64)
+    in_range = (code >= 0) & (code < len(table))
+    code[~in_range] = 0
+    bad_month = candidate & (~in_range | table_bad_month[code])
+    bad_day = candidate & ~bad_month & table_bad_day[code]
+    dates = table_dates[code]
+    dates[~candidate | bad_month] = np.datetime64('NaT')
+    reasons = Counter({
+        'missing': int(missing.sum()),
+        'non_numeric': int(non_numeric.sum()),
+        'not_integer': int(not_integer.sum()),
+        'bad_month': int(bad_month.sum()),
+        'bad_day': int(bad_day.sum()),
+    })
+    return pd.Series(dates, index=values.index), +reasons
+
+
+def load_reference_bundle(dict_path=DICT_PATH, verbose=True):
+    """
+    Load every dictionary the USACE transforms need into plain dict lookups.
+
+    The bundle is built once and can be shared across transforms (and pickled
+    to worker processes) instead of re-reading the ships register per file.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    dict_path = Path(dict_path)
+    refs = {}
+
+    log("Loading dictionaries...")
+
+    # USACE Port Codes (extracted from USACE entrance data itself)
+    df_usace_ports = pd.read_csv(dict_path / "usace_port_codes_from_data.csv", dtype=str)
+    usace_port_lookup = {}
+    for _, row in df_usace_ports.iterrows():
+        code = str(row['Port_Code']).strip()
+        usace_port_lookup[code] = str(row['Port_Name']).strip()
+    refs['usace_port_lookup'] = usace_port_lookup
+    log(f"  Loaded {len(usace_port_lookup)} USACE port codes")
+
+    # US Port Dictionary (for Port_Consolidated, Port_Coast, Port_Region)
+    df_us_ports = pd.read_csv(dict_path / "01_us_port_dictionary.csv", dtype=str)
+    us_port_lookup = {}
+    for _, row in df_us_ports.iterrows():
+        code = str(row['Code']).strip()
+        us_port_lookup[code] = {
+            'Port_Consolidated': str(row.get('Port_Consolidated', '')).strip(),
+            'Port_Coast': str(row.get('Port_Coast', '')).strip(),
+            'Port_Region': str(row.get('Port_Region', '')).strip()
+        }
+    refs['us_port_lookup'] = us_port_lookup
+    log(f"  Loaded {len(us_port_lookup)} US ports (for statistical categories)")
+
+    # Foreign ports dictionary (Sked K)
+    df_foreign_ports = pd.read_csv(dict_path / "usace_sked_k_foreign_ports.csv", dtype=str)
+    foreign_port_lookup = {}
+    for _, row in df_foreign_ports.iterrows():
+        code = str(row['FORPORT_CD']).strip()
+        foreign_port_lookup[code] = {
+            'Foreign_Port': str(row.get('FORPORT_NAME', '')).strip(),
+            'Foreign_Country': str(row.get('CTRY_NAME', '')).strip()
+        }
+    refs['foreign_port_lookup'] = foreign_port_lookup
+    log(f"  Loaded {len(foreign_port_lookup)} foreign ports")
+
+    # Ships register
+    log("  Loading ships register...")
+    df_ships = pd.read_csv(dict_path / "01_ships_register.csv", dtype=str)
+
+    def vessel_specs(row):
+        return {
+            'Type': str(row.get('Type', '')).strip(),
+            'DWT': str(row.get('DWT', '')).strip(),
+            'Grain': str(row.get('Grain', '')).strip(),
+            'TPC': str(row.get('TPC', '')).strip(),
+            'Dwt_Draft_m': str(row.get('Dwt_Draft(m)', '')).strip()
+        }
+
+    imo_lookup = {}
+    name_lookup = {}
+    fuzzy_name_lookup = {}
+    for _, row in df_ships.iterrows():
+        imo = str(row.get('IMO', '')).strip()
+        if imo and imo != '' and imo != 'nan':
+            imo_lookup[imo] = vessel_specs(row)
+        vessel = normalize_name(row.get('Vessel', ''))
+        if vessel:
+            name_lookup[vessel] = vessel_specs(row)
+        fuzzy_key = fuzzy_vessel_key(row.get('Vessel', ''))
+        if fuzzy_key:
+            fuzzy_name_lookup[fuzzy_key] = vessel_specs(row)
+    refs['imo_lookup'] = imo_lookup
+    refs['name_lookup'] = name_lookup
+    refs['fuzzy_name_lookup'] = fuzzy_name_lookup
+    refs['vessel_trigram_index'] = TrigramIndex(fuzzy_name_lookup)
+    log(f"    IMO matches: {len(imo_lookup)} vessels")
+    log(f"    Name matches: {len(name_lookup)} vessels")
+    log(f"    Fuzzy index: {len(fuzzy_name_lookup)} vessel keys, "
+        f"{len(refs['vessel_trigram_index'].postings)} trigram postings")
+
+    # Cargo classification dictionary
+    log("  Loading cargo classification dictionary...")
+    df_cargo_class = pd.read_csv(dict_path / "usace_cargoclass.csv", dtype=str)
+    cargo_class_lookup = {}
+    for _, row in df_cargo_class.iterrows():
+        icst_type = str(row['icst type']).strip().upper()
+        cargo_class_lookup[icst_type] = {
+            'Group': str(row.get('Group', '')).strip(),
+            'Commodity': str(row.get('Commodity', '')).strip()
+        }
+    refs['cargo_class_lookup'] = cargo_class_lookup
+    log(f"    Loaded {len(cargo_class_lookup)} cargo classifications")
+
+    # Agency fee dictionary
+    log("  Loading agency fee dictionary...")
+    df_agency_fee = pd.read_csv(dict_path / "agency_fee_by_icst.csv", dtype=str)
+    agency_fee_lookup = {}
+    for _, row in df_agency_fee.iterrows():
+        icst_type = str(row['ICST_DESC']).strip().upper()
+        agency_fee_lookup[icst_type] = str(row.get('Agency_Fee', '')).strip()
+    refs['agency_fee_lookup'] = agency_fee_lookup
+    log(f"    Loaded {len(agency_fee_lookup)} agency fees")
+
+    log()
+    return refs
+
+
+def merge_counts(total, part):
+    """Add one chunk's counters into a running total (ints and Counters)"""
+    for key, value in part.items():
+        if isinstance(value, Counter):
+            total.setdefault(key, Counter()).update(value)
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+def print_transform_summary(counts, n_columns, port_label='US Port (USACE)'):
+    """Print a USACE transformation summary from (merged) per-frame counters"""
+    total = counts['records']
+    pct = lambda n: n / total * 100 if total else 0.0
+
+    print("=" * 80)
+    print("TRANSFORMATION SUMMARY")
+    print("=" * 80)
+    print()
+    print(f"Total Records:        {total:,}")
+    print(f"Total Columns:        {n_columns}")
+    print()
+
+    print("Value Distributions:")
+    print(f"  TYPEDOC:            {dict(counts['TYPEDOC'].most_common())}")
+    print(f"  PWW_IND:            {dict(counts['PWW_IND'].most_common())}")
+    print(f"  WHERE_IND:          {dict(counts['WHERE_IND'].most_common())}")
+    print()
+
+    print("Port Mapping Success Rates:")
+    usace_mapped = counts['usace_mapped']
+    port_stats_mapped = counts['port_stats_mapped']
+    prev_us_mapped = counts['prev_us_mapped']
+    prev_foreign_mapped = counts['prev_foreign_mapped']
+    print(f"  {port_label + ':':<29}{usace_mapped:,} / {total:,} ({pct(usace_mapped):.1f}%)")
+    print(f"  Port Statistical Categories: {port_stats_mapped:,} / {total:,} ({pct(port_stats_mapped):.1f}%)")
+    print(f"  Previous US Port:            {prev_us_mapped:,} / {total:,} ({pct(prev_us_mapped):.1f}%)")
+    print(f"  Previous Foreign Port:       {prev_foreign_mapped:,} / {total:,} ({pct(prev_foreign_mapped):.1f}%)")
+    print()
+
+    print("Vessel Matching Success Rates:")
+    imo_matches = counts['imo_matches']
+    name_matches = counts['name_matches']
+    fuzzy_matches = counts['fuzzy_matches']
+    total_matched = imo_matches + name_matches + fuzzy_matches
+    print(f"  Matched by IMO:              {imo_matches:,} / {total:,} ({pct(imo_matches):.1f}%)")
+    print(f"  Matched by Name:             {name_matches:,} / {total:,} ({pct(name_matches):.1f}%)")
+    print(f"  Matched by Fuzzy:            {fuzzy_matches:,} / {total:,} ({pct(fuzzy_matches):.1f}%)")
+    print(f"  Total Matched:               {total_matched:,} / {total:,} ({pct(total_matched):.1f}%)")
+    print()
+
+    print("Draft Analysis & Forecasted Activity:")
+    print(f"  Draft % Calculated:          {counts['draft_calcs']:,} / {total:,} ({pct(counts['draft_calcs']):.1f}%)")
+    print(f"  Forecasted Load:             {counts['load_count']:,} ({pct(counts['load_count']):.1f}%)")
+    print(f"  Forecasted Discharge:        {counts['discharge_count']:,} ({pct(counts['discharge_count']):.1f}%)")
+    print()
+
+    print("Cargo Classification (from ICST type):")
+    print(f"  Classified:                  {counts['matched_cargo']:,} / {total:,} ({pct(counts['matched_cargo']):.1f}%)")
+    print()
+
+    print("Agency Fees:")
+    print(f"  Fees Assigned:               {counts['matched_fees']:,} / {total:,} ({pct(counts['matched_fees']):.1f}%)")
+    print()
+
+    print("Distinct-Key Enrichment Time:")
+    for label, seconds in counts['enrich_seconds'].items():
+        print(f"  {label + ':':<29}{seconds:.3f}s")
+    print()
+
+
+def stream_usace_transform(input_file, output_file, transform_frame, direction, title, refs=None,
+                           chunk_size=250_000, output_format='csv', port_label='US Port (USACE)'):
+    """
+    Streaming mode: run the same transformation on fixed-size chunks of the raw
+    file and append each chunk to the output, so only one chunk is in memory.
+
+    transform_frame is the transform script's _transform_frame(df, refs,
+    recid_start, verbose) -> (frame, counts); direction is its Parquet
+    partition value. RECID continues monotonically across chunks; the summary
+    is built from merged per-chunk counters. Returns the merged counters.
+    """
+
+    print("=" * 80)
+    print(f"{title} (STREAMING, {chunk_size:,} rows/chunk)")
+    print("=" * 80)
+    print()
+
+    if refs is None:
+        refs = load_reference_bundle()
+
+    print(f"Streaming: {input_file.name}")
+    if output_format == 'parquet':
+        year = parquet_partition_year(input_file)
+        clear_usace_parquet_partition(output_file, year, direction)
+    totals = {}
+    n_columns = 0
+    next_recid = 1
+    for chunk_no, chunk in enumerate(pd.read_csv(input_file, chunksize=chunk_size), 1):
+        start = time.perf_counter()
+        df_chunk, counts = transform_frame(chunk, refs, recid_start=next_recid, verbose=False)
+        if output_format == 'parquet':
+            write_usace_parquet(df_chunk, output_file, year, direction, part_name=f"part-{chunk_no:05d}")
+        else:
+            df_chunk.to_csv(output_file, mode='w' if chunk_no == 1 else 'a', header=(chunk_no == 1), index=False)
+        merge_counts(totals, counts)
+        n_columns = len(df_chunk.columns)
+        next_recid += len(df_chunk)
+        print(f"  Chunk {chunk_no:>4}: {len(df_chunk):>9,} rows  (RECID to {next_recid - 1:,})  "
+              f"{time.perf_counter() - start:.1f}s")
+
+    if not totals:
+        print("  [--] Input file has no rows")
+        return totals
+    totals['columns'] = n_columns
+    print()
+
+    print_transform_summary(totals, n_columns, port_label)
+
+    print(f"[OK] Streamed {totals['records']:,} rows to: {output_file.name}")
+    print()
+    print("=" * 80)
+
+    return totals
+
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of the current process in MB, or None when it
+    cannot be measured (Windows without psutil).
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, kilobytes on Linux
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+
+
+def enrich_by_key(df, key_col, lookup, columns, normalize=str, default=''):
+    """
+    Add lookup-derived columns to df, doing the lookup once per distinct key.
+
+    columns maps output column -> field of the lookup value (None when the
+    lookup value itself is the output). Keys are factorized, each distinct
+    key is normalized and looked up once, and the per-key results are
+    broadcast back with np.take on the codes; NaN keys and misses get default.
+
+    Returns stats: rows, distinct keys, distinct keys found, matched rows, seconds.
+    """
+    start = time.perf_counter()
+    codes, uniques = pd.factorize(df[key_col])
+    found = [lookup.get(normalize(key)) for key in uniques]
+
+    # Trailing slot is the default for code -1 (NaN keys)
+    hit = np.array([value is not None for value in found] + [False])
+    for out_col, field in columns.items():
+        per_key = [default if value is None else (value if field is None else value.get(field, default))
+                   for value in found]
+        per_key.append(default)
+        df[out_col] = np.take(np.array(per_key, dtype=object), codes)
+
+    return {
+        'key': key_col,
+        'rows': len(df),
+        'distinct': len(uniques),
+        'distinct_found': int(hit.sum()),
+        'matched_rows': int(np.take(hit, codes).sum()),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def format_enrich_stats(stats):
+    """One log line for an enrich_by_key() result"""
+    return (f"{stats['distinct']:,} distinct {stats['key']} keys ({stats['distinct_found']:,} in dictionary) "
+            f"-> {stats['matched_rows']:,}/{stats['rows']:,} rows in {stats['seconds']:.3f}s")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet output needs pyarrow: pip install pyarrow") from None
+    return pq
+
+
+# Strings pd.read_csv reads as NaN by default (so Parquet reads match the CSV output)
+CSV_NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                 '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+
+def _is_text(series):
+    return series.dtype == object or pd.api.types.is_string_dtype(series)
+
+
+def numeric_like_csv(series):
+    """
+    A text column typed the way pd.read_csv types it on the CSV output:
+    int64 / float64 when every non-blank value parses as a number (an all-blank
+    column is float64), otherwise the column unchanged. The check runs on the
+    distinct values only.
+    """
+    values = series.mask(series.isin(CSV_NA_VALUES))
+    uniques = pd.Series(pd.unique(values.dropna()), dtype=object)
+    if pd.to_numeric(uniques, errors='coerce').notna().all():
+        return pd.to_numeric(values.astype(object))
+    return series
+
+
+def clear_usace_parquet_partition(root, year, direction):
+    """Remove an existing Year/Direction partition so a rerun does not mix old parts"""
+    target = Path(root) / f"Year={year}" / f"Direction={direction}"
+    if target.exists():
+        shutil.rmtree(target)
+
+
+def write_usace_parquet(df, root, year, direction, part_name="part-0"):
+    """
+    Write transformed USACE rows into the partitioned Parquet dataset.
+
+    Partitions: Year / Direction / Port_Coast. Numeric columns held as text
+    (IMO, PORT, tonnages ...) are written typed, as the CSV output reads back;
+    the remaining string columns are written as dictionary (categorical)
+    columns, which is where most of the size win is - port names, vessel types
+    and ICST descriptions repeat on every row.
+    """
+    import pyarrow as pa
+    pq = _require_pyarrow()
+
+    out = df.copy()
+    out['Year'] = int(year)
+    out['Direction'] = direction
+    out['Port_Coast'] = out['Port_Coast'].replace('', pd.NA).fillna(PARQUET_EMPTY_COAST)
+    for col in out.columns:
+        if col not in PARQUET_PARTITIONS and _is_text(out[col]):
+            out[col] = numeric_like_csv(out[col])
+            if _is_text(out[col]):
+                out[col] = out[col].astype('category')
+
+    table = pa.Table.from_pandas(out, preserve_index=False)
+    pq.write_to_dataset(table, root_path=str(root), partition_cols=PARQUET_PARTITIONS,
+                        basename_template=f"{part_name}-{{i}}.parquet",
+                        existing_data_behavior='overwrite_or_ignore')
+    return len(out)
+
+
+def read_usace_table(source, columns=None, years=None, directions=None, coasts=None, as_category=False):
+    """
+    Load transformed/matched USACE data from either a CSV file or a Parquet
+    dataset directory.
+
+    Parquet reads only the requested columns and prunes partitions by
+    year, direction and coast; CSV reads fall back to usecols. Parquet rows
+    come back in RECID order with the original column order and without the
+    partition helper columns. Text columns that are all numbers (datasets
+    written before numeric columns were typed) are cast as pd.read_csv would,
+    so either source gives the same frame and dtypes - IMO/PORT keys join
+    across sources (compare_usace_sources checks this).
+    """
+    source = Path(source)
+    if not source.is_dir():
+        return pd.read_csv(source, usecols=columns, low_memory=False)
+
+    _require_pyarrow()
+    import json
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    partitioning = ds.partitioning(
+        pa.schema([('Year', pa.int32()), ('Direction', pa.string()), ('Port_Coast', pa.string())]),
+        flavor='hive')
+    expr = None
+    for field, values in (('Year', years), ('Direction', directions), ('Port_Coast', coasts)):
+        if values:
+            values = [int(v) for v in values] if field == 'Year' else list(values)
+            term = ds.field(field).isin(values)
+            expr = term if expr is None else expr & term
+
+    # Entrance and clearance partitions carry different date/port column names,
+    # so unify the schemas of just the fragments being read
+    dataset = ds.dataset(str(source), format='parquet', partitioning=partitioning)
+    fragments = list(dataset.get_fragments(filter=expr))
+    if not fragments:
+        return pd.DataFrame(columns=columns or [])
+    schema = pa.unify_schemas([f.physical_schema for f in fragments] + [partitioning.schema],
+                              promote_options='permissive')
+    dataset = ds.dataset([f.path for f in fragments], schema=schema, format='parquet',
+                         partitioning=partitioning, partition_base_dir=str(source))
+    df = dataset.to_table(columns=columns).to_pandas()
+
+    if not as_category:
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype(df[col].cat.categories.dtype)
+    if 'Port_Coast' in df.columns:
+        df['Port_Coast'] = df['Port_Coast'].replace(PARQUET_EMPTY_COAST, '')
+    # NA strings come back as NaN and numeric text as numbers, the same as pd.read_csv on the CSV output
+    for col in df.columns:
+        if _is_text(df[col]):
+            df[col] = numeric_like_csv(df[col].mask(df[col].isin(CSV_NA_VALUES)))
+    if columns is None:
+        metadata = fragments[0].physical_schema.metadata or {}
+        written = [c['name'] for c in json.loads(metadata.get(b'pandas', b'{"columns": []}'))['columns']]
+        order = [c for c in written if c in df.columns] + [c for c in df.columns if c not in written]
+        df = df[order].drop(columns=['Year', 'Direction'], errors='ignore')
+    if 'RECID' in df.columns:
+        df = df.sort_values('RECID', kind='stable').reset_index(drop=True)
+    return df
+
+
+def compare_usace_sources(csv_df, parquet_df):
+    """
+    Round-trip check between the CSV and Parquet reads of the same partition:
+    list of (column, csv dtype, parquet dtype) for missing columns or dtype
+    mismatches (empty when the two sources are interchangeable).
+    """
+    problems = []
+    for col in csv_df.columns:
+        if col not in parquet_df.columns:
+            problems.append((col, str(csv_df[col].dtype), 'missing'))
+        elif str(csv_df[col].dtype) != str(parquet_df[col].dtype):
+            problems.append((col, str(csv_df[col].dtype), str(parquet_df[col].dtype)))
+    return problems
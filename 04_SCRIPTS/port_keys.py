@@ -0,0 +1,255 @@
+"""
+Canonical Port Keys
+Version: 1.0.0
+Date: 2026-10-19
+
+Purpose:
+- One stable integer key per US port, shared by the USACE/Panjiva matcher and
+  the port rollup stage, so both join on an integer instead of re-cleaning
+  port names with chained .replace() calls on every row
+- Built once from three dictionaries:
+    usace_to_census_port_mapping.csv   USACE port code/name -> Census Schedule D code
+    01_us_port_dictionary.csv          Schedule D code, names and rollups
+    01.05.ACE_Port_Codes_Merged_*.csv  ACE Schedule D codes (fills codes the dictionary lacks)
+- Raw port strings ("Port Freeport, Freeport, Texas", "Houston, TX",
+  "Port of Houston Authority of Harris County, TX") resolve through
+  (city, state) aliases; each distinct string is resolved once and memoized
+
+Key space:
+- Schedule D code (0 - 9999) for every port the dictionaries can tie to one;
+  USACE ports join their Schedule D code only through exact or manually
+  reviewed mappings (a fuzzy city mapping must not merge two ports)
+- USACE_KEY_BASE + USACE port code for USACE ports without such a mapping
+- UNRESOLVED_KEY_BASE + crc32("CITY|ST") for strings no dictionary knows, so
+  the same unknown port still gets the same key in both data sets and runs
+- -1 for a missing port
+
+Usage:
+    from port_keys import PortKeyResolver
+    resolver = PortKeyResolver.load()
+    panjiva['Port_Key'] = resolver.keys(panjiva['Port_of_Lading'])
+    rollups = resolver.rollups()   # Port_Key -> Port_Consolidated, Port_Coast, Port_Region
+"""
+
+import re
+import zlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from pipeline_common import DICT_PATH
+
+PORT_MAPPING_FILE = DICT_PATH / "usace_to_census_port_mapping.csv"
+US_PORT_DICTIONARY_FILE = DICT_PATH / "01_us_port_dictionary.csv"
+ACE_PORT_CODES_FILE = DICT_PATH / "01.05.ACE_Port_Codes_Merged_v20260111_1527.csv"
+
+USACE_KEY_BASE = 100_000
+UNRESOLVED_KEY_BASE = 1 << 32
+MISSING_KEY = -1
+
+# USACE -> Schedule D mappings trusted to mean "same port"
+TRUSTED_MAPPINGS = {'City+State Exact', 'Manual Override'}
+ROLLUP_COLUMNS = ['Port_Consolidated', 'Port_Coast', 'Port_Region']
+
+US_STATES = {
+    'ALABAMA': 'AL', 'ALASKA': 'AK', 'ARIZONA': 'AZ', 'ARKANSAS': 'AR', 'CALIFORNIA': 'CA',
+    'COLORADO': 'CO', 'CONNECTICUT': 'CT', 'DELAWARE': 'DE', 'DISTRICT OF COLUMBIA': 'DC',
+    'FLORIDA': 'FL', 'GEORGIA': 'GA', 'HAWAII': 'HI', 'IDAHO': 'ID', 'ILLINOIS': 'IL',
+    'INDIANA': 'IN', 'IOWA': 'IA', 'KANSAS': 'KS', 'KENTUCKY': 'KY', 'LOUISIANA': 'LA',
+    'MAINE': 'ME', 'MARYLAND': 'MD', 'MASSACHUSETTS': 'MA', 'MICHIGAN': 'MI', 'MINNESOTA': 'MN',
+    'MISSISSIPPI': 'MS', 'MISSOURI': 'MO', 'MONTANA': 'MT', 'NEBRASKA': 'NE', 'NEVADA': 'NV',
+    'NEW HAMPSHIRE': 'NH', 'NEW JERSEY': 'NJ', 'NEW MEXICO': 'NM', 'NEW YORK': 'NY',
+    'NORTH CAROLINA': 'NC', 'NORTH DAKOTA': 'ND', 'OHIO': 'OH', 'OKLAHOMA': 'OK', 'OREGON': 'OR',
+    'PENNSYLVANIA': 'PA', 'RHODE ISLAND': 'RI', 'SOUTH CAROLINA': 'SC', 'SOUTH DAKOTA': 'SD',
+    'TENNESSEE': 'TN', 'TEXAS': 'TX', 'UTAH': 'UT', 'VERMONT': 'VT', 'VIRGINIA': 'VA',
+    'WASHINGTON': 'WA', 'WEST VIRGINIA': 'WV', 'WISCONSIN': 'WI', 'WYOMING': 'WY',
+    'PUERTO RICO': 'PR', 'VIRGIN ISLANDS': 'VI', 'GUAM': 'GU', 'AMERICAN SAMOA': 'AS',
+    'NORTHERN MARIANA ISLANDS': 'MP',
+}
+STATE_CODES = set(US_STATES.values())
+
+# Port-authority wording that varies between data sets (same list the matcher and rollups used)
+PORT_PREFIX_RE = re.compile(r'^(PORT ENTRY-|ENTRY-|PORT OF |PORT |THE )+')
+PORT_SUFFIX_RE = re.compile(r'( UNIFIED PORT DISTRICT| PORT DISTRICT| STATE PORT AUTHORITY| STATE AUTHORITY'
+                            r'| PORT AUTHORITY| AUTHORITY OF HARRIS COUNTY)$')
+
+
+def port_city(text):
+    """Uppercase city/port part with port-authority prefixes and suffixes removed"""
+    city = ' '.join(str(text).upper().split())
+    city = PORT_PREFIX_RE.sub('', city)
+    city = PORT_SUFFIX_RE.sub('', city)
+    return city.strip()
+
+
+def split_port_name(name):
+    """
+    Raw port string -> (city candidates, two-letter state or None).
+
+    "Houston, TX" -> (['HOUSTON'], 'TX'); "Port Freeport, Freeport, Texas" ->
+    (['FREEPORT'], 'TX'); "Boston, MA Main Waterfront" -> (['BOSTON'], 'MA').
+    """
+    if pd.isna(name):
+        return [], None
+    parts = [part.strip() for part in str(name).upper().split(',') if part.strip()]
+    if not parts:
+        return [], None
+
+    state = None
+    if len(parts) > 1:
+        last = ' '.join(parts[-1].split())
+        first_word = last.split()[0]
+        if last in US_STATES:
+            state = US_STATES[last]
+        elif last in STATE_CODES:
+            state = last
+        elif first_word in STATE_CODES:
+            state = first_word
+        if state is not None:
+            parts = parts[:-1]
+
+    cities = []
+    for part in parts[:2]:
+        city = port_city(part)
+        if city and city not in cities:
+            cities.append(city)
+    return cities, state
+
+
+def unresolved_key(cities, state):
+    """Deterministic key for a port string no dictionary knows"""
+    text = f"{cities[0] if cities else ''}|{state or ''}"
+    return UNRESOLVED_KEY_BASE + zlib.crc32(text.encode('utf-8'))
+
+
+def _code(value):
+    """'0152' / '2417.0' / 2417 -> 2417; None when not a code"""
+    number = pd.to_numeric(pd.Series([value]), errors='coerce').iloc[0]
+    return None if pd.isna(number) else int(number)
+
+
+class PortKeyResolver:
+    """Raw port strings and USACE port codes -> canonical integer Port_Key"""
+
+    def __init__(self, aliases, usace_codes, rollups, names):
+        self.aliases = aliases          # (city, state) -> key
+        self.usace_codes = usace_codes  # USACE port code -> key
+        self._rollups = rollups         # key -> {Port_Consolidated, Port_Coast, Port_Region}
+        self.names = names              # key -> canonical port name
+        self._cache = {}
+
+        # City-only fallback for strings without a state: only when the city is unambiguous
+        city_keys = {}
+        for (city, _), key in aliases.items():
+            city_keys.setdefault(city, set()).add(key)
+        self.city_aliases = {city: keys.pop() for city, keys in city_keys.items() if len(keys) == 1}
+
+    @classmethod
+    def load(cls, mapping_file=PORT_MAPPING_FILE, dictionary_file=US_PORT_DICTIONARY_FILE,
+             ace_file=ACE_PORT_CODES_FILE):
+        """Build the resolver from the port dictionaries (the ACE file is optional)"""
+        rollups, names = {}, {}
+        # Alias candidates: (priority, key) per (city, state); lowest wins
+        candidates = {}
+
+        def add_alias(name, key, priority):
+            cities, state = split_port_name(name)
+            for rank, city in enumerate(cities):
+                alias = (city, state)
+                candidate = (priority + rank, key)
+                if alias not in candidates or candidate < candidates[alias]:
+                    candidates[alias] = candidate
+
+        def add_schedule_d(table, overwrite):
+            for row in table.itertuples(index=False):
+                key = _code(row.Code)
+                if key is None:
+                    continue
+                if overwrite or key not in rollups:
+                    # Later dictionary rows win, as in the transform's us_port_lookup
+                    rollups[key] = {col: str(getattr(row, col)).strip() for col in ROLLUP_COLUMNS}
+                    names.setdefault(key, str(row.Sked_D_E).strip())
+                add_alias(row.Sked_D, key, 0)
+                add_alias(row.Sked_D_E, key, 2)
+
+        add_schedule_d(pd.read_csv(dictionary_file, dtype=str).fillna(''), overwrite=True)
+        if Path(ace_file).exists():
+            add_schedule_d(pd.read_csv(ace_file, dtype=str).fillna(''), overwrite=False)
+
+        usace_codes = {}
+        mapping = pd.read_csv(mapping_file, dtype=str).fillna('')
+        for row in mapping.itertuples(index=False):
+            code = _code(row.USACE_PORT)
+            if code is None:
+                continue
+            census = _code(row.Census_Code)
+            if census is not None and row.Match_Type in TRUSTED_MAPPINGS:
+                key = census
+            else:
+                key = USACE_KEY_BASE + code
+                names[key] = row.USACE_PORT_NAME.strip()
+                if row.Port_Consolidated.strip():
+                    rollups[key] = {col: getattr(row, col).strip() for col in ROLLUP_COLUMNS}
+            usace_codes[code] = key
+            add_alias(row.USACE_PORT_NAME, key, 4)
+
+        aliases = {alias: key for alias, (_, key) in candidates.items()}
+        return cls(aliases, usace_codes, rollups, names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def resolve(self, name):
+        """Port_Key for one raw port string (memoized)"""
+        if name in self._cache:
+            return self._cache[name]
+        cities, state = split_port_name(name)
+        key = MISSING_KEY if not cities else None
+        for city in cities:
+            key = self.aliases.get((city, state)) if state else self.city_aliases.get(city)
+            if key is None and state:
+                key = self.aliases.get((city, None))
+            if key is not None:
+                break
+        if key is None:
+            key = unresolved_key(cities, state)
+        self._cache[name] = key
+        return key
+
+    def keys(self, names):
+        """Port_Key array for a column of raw port strings, resolving each distinct string once"""
+        codes, uniques = pd.factorize(pd.Series(names), use_na_sentinel=True)
+        resolved = np.array([self.resolve(name) for name in uniques], dtype=np.int64)
+        return np.where(codes >= 0, resolved[codes] if len(resolved) else MISSING_KEY, MISSING_KEY)
+
+    def code_keys(self, codes):
+        """Port_Key array for USACE port codes (mapping first, then Schedule D, else USACE_KEY_BASE + code)"""
+        numbers = pd.to_numeric(pd.Series(codes), errors='coerce')
+        uniques = numbers.dropna().unique()
+        lookup = {}
+        for number in uniques:
+            code = int(number)
+            if code in self.usace_codes:
+                lookup[number] = self.usace_codes[code]
+            elif code in self._rollups and code < USACE_KEY_BASE:
+                lookup[number] = code
+            else:
+                lookup[number] = USACE_KEY_BASE + code
+        return numbers.map(lookup).fillna(MISSING_KEY).to_numpy(dtype=np.int64)
+
+    def rollups(self):
+        """Port_Key -> Port_Name, Port_Consolidated, Port_Coast, Port_Region"""
+        table = pd.DataFrame.from_dict(self._rollups, orient='index', columns=ROLLUP_COLUMNS)
+        table.insert(0, 'Port_Name', pd.Series(self.names))
+        table.index.name = 'Port_Key'
+        return table.sort_index()
+
+    def summary(self):
+        """Counts for logging"""
+        return {
+            'ports': len(self.names),
+            'aliases': len(self.aliases),
+            'usace_codes': len(self.usace_codes),
+            'with_rollups': len(self._rollups),
+            'resolved_strings': len(self._cache),
+        }
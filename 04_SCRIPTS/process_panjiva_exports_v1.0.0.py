@@ -5,158 +5,463 @@ Date: 2026-01-15
 
 Purpose:
 - Unzip and consolidate raw export zip files
-- Extract HS code levels (HS2, HS4, HS6)
+- Extract HS code levels (HS2, HS4, HS6) and flag codes missing from
+  hs6_lookup.csv (HS_Check) - shared normalizer in hs_codes.py
 - Standardize column names (Weight (t) → Tons)
 - Add year column
 - Generate unique RAW_REC_ID
 - Split by year
 
+Parallel ingestion (no global concat):
+- Phase 1: every CSV member of every zip is one job on a process pool; the
+  worker decompresses and parses its member, applies the year extraction,
+  Tons standardization and HS split, and saves one part per year
+- Phase 2: RAW_REC_ID offsets follow from the per-member row counts (zips by
+  name, members in archive order - the same numbering as one consolidated
+  table); workers number their parts, align them to the union of columns
+  and format them as headerless CSV
+- The per-year outputs are then assembled by appending the CSV parts in
+  member order, so no process ever holds more than one member
+- Wall time, per-job seconds and peak RSS (main process and workers) are reported
+
+Incremental reruns (panjiva_exports_ingest_manifest.csv):
+- The manifest records each zip's SHA-256 and size, its members, their row
+  counts and RAW_REC_ID ranges, and the year file each member/year fed
+- A rerun hashes the zips and parses only new or changed ones; new rows are
+  numbered after the highest RAW_REC_ID issued, so existing IDs never change
+- Only the years those zips (and replaced or removed ones) touch get a new
+  timestamped file: retained rows are byte-copied from the previous file,
+  or filtered by RAW_REC_ID range when a zip was replaced or removed
+- Unaffected years keep their existing file; a year left without records
+  gets a header-only file that supersedes the stale one; --full ignores the manifest
+
 Input: 00_raw_data/00_02_panjiva_exports_raw/*.zip (12 files)
 Output: 01_STAGE01_PREPROCESSING/01.01_annual_files/panjiva_exports_{YEAR}_PREPROCESSED_*.csv
+        01_STAGE01_PREPROCESSING/01.01_annual_files/panjiva_exports_ingest_report_{timestamp}.csv
+        01_STAGE01_PREPROCESSING/01.01_annual_files/panjiva_exports_ingest_manifest.csv
+
+Usage:
+    python process_panjiva_exports_v1.0.0.py
+    python process_panjiva_exports_v1.0.0.py --workers 4
+    python process_panjiva_exports_v1.0.0.py --full
 """
 
-import pandas as pd
-import zipfile
+import argparse
+import hashlib
 import os
-from pathlib import Path
+import shutil
+import time
+import zipfile
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from pathlib import Path
 
-print("="*80)
-print("PROCESS PANJIVA EXPORT DATA v1.0.0")
-print("="*80)
+from hs_codes import HS6_LOOKUP_FILE, HS_CHECK_VALUES, add_hs_columns, load_hs6_lookup
+from pipeline_common import peak_rss_mb
 
 # Paths
 RAW_DIR = Path(r"G:\My Drive\LLM\project_manifest\00_raw_data\00_02_panjiva_exports_raw")
 OUTPUT_DIR = Path(r"G:\My Drive\LLM\project_manifest\01_STAGE01_PREPROCESSING\01.01_annual_files")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-
-# Find all zip files
-print(f"\n1. Finding export zip files in: {RAW_DIR}")
-zip_files = list(RAW_DIR.glob("*.zip"))
-print(f"   Found {len(zip_files)} zip files")
-
-# Extract and read all CSVs
-print(f"\n2. Extracting and reading CSV files...")
-all_dfs = []
-total_records = 0
-
-for i, zip_path in enumerate(zip_files, 1):
-    print(f"   [{i}/{len(zip_files)}] Processing: {zip_path.name}")
-
-    with zipfile.ZipFile(zip_path, 'r') as z:
-        csv_files = [f for f in z.namelist() if f.endswith('.csv')]
-
-        for csv_file in csv_files:
-            with z.open(csv_file) as f:
-                df = pd.read_csv(f, low_memory=False)
-                all_dfs.append(df)
-                total_records += len(df)
-                print(f"      - {csv_file}: {len(df):,} records")
-
-# Concatenate all dataframes
-print(f"\n3. Concatenating all export data...")
-df_all = pd.concat(all_dfs, ignore_index=True)
-print(f"   Total records: {len(df_all):,}")
-print(f"   Total columns: {len(df_all.columns)}")
-
-# Add unique RAW_REC_ID
-print(f"\n4. Adding RAW_REC_ID...")
-df_all['RAW_REC_ID'] = range(1, len(df_all) + 1)
-
-# Parse Shipment Date and add year
-print(f"\n5. Parsing dates and adding year column...")
-df_all['Shipment Date'] = pd.to_datetime(df_all['Shipment Date'], errors='coerce')
-df_all['Year'] = df_all['Shipment Date'].dt.year
-
-year_counts = df_all['Year'].value_counts().sort_index()
-print(f"   Year distribution:")
-for year, count in year_counts.items():
-    print(f"     {year}: {count:,} records")
-
-# Standardize tonnage column name
-print(f"\n6. Standardizing column names...")
-if 'Weight (t)' in df_all.columns:
-    df_all['Tons'] = df_all['Weight (t)']
-    print(f"   Renamed 'Weight (t)' -> 'Tons'")
-
-# Extract HS code levels
-print(f"\n7. Extracting HS code levels...")
-def extract_hs_codes(hs_code):
-    """Extract HS2, HS4, HS6 from HS Code"""
-    if pd.isna(hs_code):
-        return '', '', ''
-
-    hs_str = str(hs_code).replace('.', '').strip()
-
-    # Pad to 6 digits if shorter
-    hs_str = hs_str.ljust(6, '0')
-
-    hs2 = hs_str[:2] if len(hs_str) >= 2 else ''
-    hs4 = hs_str[:4] if len(hs_str) >= 4 else ''
-    hs6 = hs_str[:6] if len(hs_str) >= 6 else ''
-
-    return hs2, hs4, hs6
-
-# Apply extraction
-hs_extracted = df_all['HS Code'].apply(extract_hs_codes)
-df_all['HS2'] = [x[0] for x in hs_extracted]
-df_all['HS4'] = [x[1] for x in hs_extracted]
-df_all['HS6'] = [x[2] for x in hs_extracted]
-
-print(f"   HS2 codes extracted: {df_all['HS2'].notna().sum():,}")
-print(f"   HS4 codes extracted: {df_all['HS4'].notna().sum():,}")
-print(f"   HS6 codes extracted: {df_all['HS6'].notna().sum():,}")
-
-# Split by year and save
-print(f"\n8. Splitting by year and saving...")
-
-for year in sorted(df_all['Year'].dropna().unique()):
-    year = int(year)
-    df_year = df_all[df_all['Year'] == year].copy()
-
-    output_file = OUTPUT_DIR / f"panjiva_exports_{year}_PREPROCESSED_v{timestamp}.csv"
-    df_year.to_csv(output_file, index=False)
-
-    print(f"   Year {year}: {len(df_year):,} records -> {output_file.name}")
-
-# Summary statistics
-print("\n" + "="*80)
-print("SUMMARY STATISTICS")
-print("="*80)
-
-print(f"\nTotal export records processed: {len(df_all):,}")
-print(f"Total columns: {len(df_all.columns)}")
-
-print(f"\nColumn additions:")
-print(f"  - RAW_REC_ID (unique row ID)")
-print(f"  - Year (from Shipment Date)")
-print(f"  - Tons (standardized from Weight (t))")
-print(f"  - HS2, HS4, HS6 (extracted from HS Code)")
-
-print(f"\nKey columns present:")
-key_cols = ['Vessel', 'Port of Lading', 'Shipment Date', 'Voyage', 'IMO', 'Carrier',
-            'Shipper', 'HS Code', 'Goods Shipped', 'Tons']
-for col in key_cols:
-    exists = col in df_all.columns
-    print(f"  {col:<25} {'[OK]' if exists else '[--]'}")
-
-# Check for carrier column name
-if 'Carrier' in df_all.columns:
-    print(f"\n  Carrier column name: 'Carrier' (not 'Carrier Name')")
-elif 'Carrier Name' in df_all.columns:
-    print(f"\n  Carrier column name: 'Carrier Name'")
-
-# Sample data
-print(f"\n" + "="*80)
-print("SAMPLE DATA (First 3 Records)")
-print("="*80)
-sample_cols = ['Vessel', 'Port of Lading', 'Shipment Date', 'Carrier', 'Tons', 'HS2']
-available_cols = [c for c in sample_cols if c in df_all.columns]
-if len(available_cols) > 0:
-    print(df_all[available_cols].head(3).to_string(index=False))
-
-print(f"\n" + "="*80)
-print("COMPLETE!")
-print("="*80)
+# Columns every member gets after the raw columns (in this order)
+DERIVED_COLUMNS = ['RAW_REC_ID', 'Year', 'Tons', 'HS2', 'HS4', 'HS6', 'HS_Check']
+
+# Ingestion state kept next to the outputs: one row per zip member and year
+MANIFEST_FILE = "panjiva_exports_ingest_manifest.csv"
+MANIFEST_COLUMNS = ['Zip', 'Zip_SHA256', 'Zip_Bytes', 'Member', 'Member_Rows', 'First_RAW_REC_ID',
+                    'Last_RAW_REC_ID', 'Year', 'Year_Rows', 'Output_File', 'Ingested']
+
+# Set once per worker process by _init_worker
+_HS_LOOKUP = None
+
+
+def _init_worker(hs_lookup):
+    """Pool initializer: receive the HS6 lookup once per process"""
+    global _HS_LOOKUP
+    _HS_LOOKUP = hs_lookup
+
+
+def discover_members(zip_files):
+    """One job per CSV member: zips by name, members in archive order"""
+    jobs = []
+    for zip_path in zip_files:
+        with zipfile.ZipFile(zip_path, 'r') as z:
+            for member in z.namelist():
+                if member.endswith('.csv'):
+                    jobs.append({'Job': len(jobs), 'Zip': zip_path, 'Member': member})
+    return jobs
+
+
+def parse_member(job, part_dir):
+    """
+    Phase 1 worker: decompress and parse one member, add Year, Tons,
+    HS2/HS4/HS6 and HS_Check, and save one part per year (RAW_REC_ID holds the row's
+    position within the member until phase 2).
+    """
+    start = time.perf_counter()
+    with zipfile.ZipFile(job['Zip'], 'r') as z, z.open(job['Member']) as f:
+        df = pd.read_csv(f, low_memory=False)
+    raw_columns = list(df.columns)
+
+    df['RAW_REC_ID'] = np.arange(len(df))
+    df['Shipment Date'] = pd.to_datetime(df['Shipment Date'], errors='coerce')
+    df['Year'] = df['Shipment Date'].dt.year
+    if 'Weight (t)' in df.columns:
+        df['Tons'] = df['Weight (t)']
+    hs_stats = add_hs_columns(df, 'HS Code', lookup=_HS_LOOKUP)
+
+    year_rows = {}
+    for year, part in df.groupby('Year', sort=True):
+        year = int(year)
+        part.drop(columns=['Year']).to_pickle(part_dir / f"{job['Job']:05d}_{year}.pkl")
+        year_rows[year] = len(part)
+
+    return {
+        'Job': job['Job'],
+        'Zip': job['Zip'].name,
+        'Member': job['Member'],
+        'Rows': len(df),
+        'Columns': raw_columns,
+        'Has_Tons': 'Weight (t)' in raw_columns,
+        'Year_Rows': year_rows,
+        'No_Year': int(df['Year'].isna().sum()),
+        **{f"HS_{value}": hs_stats[value] for value in HS_CHECK_VALUES},
+        'Parse_Seconds': round(time.perf_counter() - start, 2),
+        'Worker_PID': os.getpid(),
+        'Worker_Peak_RSS_MB': peak_rss_mb(),
+    }
+
+
+def write_member_parts(job, part_dir, offset, columns):
+    """
+    Phase 2 worker: number one member's year parts (RAW_REC_ID = offset +
+    position + 1), align them to the output columns and write headerless CSV.
+    """
+    start = time.perf_counter()
+    for year in job['Year_Rows']:
+        part_file = part_dir / f"{job['Job']:05d}_{year}.pkl"
+        part = pd.read_pickle(part_file)
+        part['RAW_REC_ID'] = part['RAW_REC_ID'] + offset + 1
+        part['Year'] = year
+        part.reindex(columns=columns).to_csv(part_file.with_suffix('.csv'), index=False, header=False)
+        part_file.unlink()
+    return {
+        'Job': job['Job'],
+        'Write_Seconds': round(time.perf_counter() - start, 2),
+        'Worker_PID': os.getpid(),
+        'Worker_Peak_RSS_MB': peak_rss_mb(),
+    }
+
+
+def output_columns(parsed, existing=None):
+    """
+    Union of raw columns in first-seen member order (as pd.concat would), then
+    the derived columns. On incremental runs the existing output header comes
+    first, so unchanged years keep their column order.
+    """
+    existing = list(existing or [])
+    columns = [col for col in existing if col not in DERIVED_COLUMNS]
+    for job in parsed:
+        columns.extend(col for col in job['Columns'] if col not in columns)
+    has_tons = 'Tons' in existing or any(job['Has_Tons'] for job in parsed)
+    derived = [col for col in DERIVED_COLUMNS if col != 'Tons' or has_tons]
+    return [col for col in columns if col not in derived] + derived
+
+
+def previous_columns(output_dir, kept, years):
+    """Union of the headers of the rewritten years' previous files (first-seen order)"""
+    columns = []
+    files = kept.loc[kept['Year'].isin(years), 'Output_File'].dropna()
+    for name in pd.unique(files[files != '']):
+        columns.extend(col for col in pd.read_csv(output_dir / name, nrows=0).columns if col not in columns)
+    return columns
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Content hash of a zip (streamed, so large zips are not held in memory)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    """Ingestion manifest from a previous run, or None"""
+    if not path.exists():
+        return None
+    manifest = pd.read_csv(path, dtype={'Zip_SHA256': str, 'Output_File': str, 'Ingested': str})
+    manifest['Year'] = manifest['Year'].astype('Int64')
+    return manifest.reindex(columns=MANIFEST_COLUMNS)
+
+
+def save_manifest(manifest, path):
+    """Write the manifest atomically (temp file then replace)"""
+    tmp = path.with_name(path.name + ".tmp")
+    manifest.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def manifest_rows(parsed, offsets, zip_info, output_files, timestamp):
+    """One manifest row per member and year (Year empty when no row had a Shipment Date)"""
+    rows = []
+    for job, offset in zip(parsed, offsets):
+        sha256, zip_bytes = zip_info[job['Zip']]
+        member = {'Zip': job['Zip'], 'Zip_SHA256': sha256, 'Zip_Bytes': zip_bytes, 'Member': job['Member'],
+                  'Member_Rows': job['Rows'], 'First_RAW_REC_ID': offset + 1,
+                  'Last_RAW_REC_ID': offset + job['Rows'], 'Ingested': timestamp}
+        for year, count in (job['Year_Rows'] or {None: 0}).items():
+            rows.append({**member, 'Year': year, 'Year_Rows': count, 'Output_File': output_files.get(year, '')})
+    return pd.DataFrame(rows, columns=MANIFEST_COLUMNS)
+
+
+def copy_retained_rows(existing_file, out, columns, drop_ranges, chunksize=500_000):
+    """
+    Append an existing year file's rows to out, minus the RAW_REC_ID ranges
+    of replaced or removed zips. Byte copy when nothing is dropped and the
+    columns are unchanged; otherwise filtered and realigned in chunks. The
+    output header must hold every existing column - rows are never narrowed.
+    """
+    existing = list(pd.read_csv(existing_file, nrows=0).columns)
+    missing = [col for col in existing if col not in columns]
+    if missing:
+        raise ValueError(f"{existing_file.name}: columns {missing} are not in the output header")
+    with open(existing_file, 'r', encoding='utf-8', newline='') as f:
+        if not drop_ranges and existing == columns:
+            f.readline()
+            shutil.copyfileobj(f, out)
+            return
+    for chunk in pd.read_csv(existing_file, dtype=str, keep_default_na=False, chunksize=chunksize):
+        ids = pd.to_numeric(chunk['RAW_REC_ID'])
+        drop = np.zeros(len(chunk), dtype=bool)
+        for first, last in drop_ranges:
+            drop |= ids.between(first, last).to_numpy()
+        chunk[~drop].reindex(columns=columns, fill_value='').to_csv(out, index=False, header=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest Panjiva export zips into per-year preprocessed files")
+    parser.add_argument('--raw-dir', type=Path, default=RAW_DIR)
+    parser.add_argument('--output-dir', type=Path, default=OUTPUT_DIR)
+    parser.add_argument('--hs6-lookup', type=Path, default=HS6_LOOKUP_FILE)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Process pool size (default: one per zip member, capped at CPU count)")
+    parser.add_argument('--full', action='store_true',
+                        help="Reprocess every zip and rewrite every year, ignoring the manifest")
+    args = parser.parse_args()
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+    run_start = time.perf_counter()
+    manifest_file = args.output_dir / MANIFEST_FILE
+
+    print("="*80)
+    print("PROCESS PANJIVA EXPORT DATA v1.0.0 (PARALLEL INGESTION)")
+    print("="*80)
+
+    # Find all zip files and compare their content hashes with the manifest
+    print(f"\n1. Finding export zip files in: {args.raw_dir}")
+    zip_files = sorted(args.raw_dir.glob("*.zip"))
+    print(f"   Found {len(zip_files)} zip files")
+    zip_info = {path.name: (file_sha256(path), path.stat().st_size) for path in zip_files}
+
+    manifest = None if args.full else load_manifest(manifest_file)
+    if manifest is not None:
+        outputs = manifest['Output_File'].dropna().loc[lambda names: names != ''].unique()
+        missing = [name for name in outputs if not (args.output_dir / name).exists()]
+        if missing:
+            print(f"   [--] Manifest outputs missing ({', '.join(missing[:3])}) - full reload")
+            manifest = None
+
+    if manifest is None:
+        print(f"   Mode: full reload")
+        to_process = zip_files
+        kept = manifest_rows([], [], zip_info, {}, timestamp)
+        stale = kept
+        first_id = 0
+    else:
+        previous = manifest.groupby('Zip')['Zip_SHA256'].first()
+        new = [path for path in zip_files if path.name not in previous.index]
+        changed = [path for path in zip_files
+                   if path.name in previous.index and previous[path.name] != zip_info[path.name][0]]
+        removed = [name for name in previous.index if name not in zip_info]
+        print(f"   Mode: incremental ({manifest_file.name})")
+        print(f"   Unchanged: {len(zip_files) - len(new) - len(changed)}  New: {len(new)}  "
+              f"Changed: {len(changed)}  Removed: {len(removed)}")
+        for label, names in (('New', new), ('Changed', changed)):
+            for path in names:
+                print(f"      {label}: {path.name}")
+        for name in removed:
+            print(f"      Removed: {name}")
+        if not (new or changed or removed):
+            print(f"\n   [OK] All zips already ingested - nothing to do")
+            return
+        to_process = sorted(new + changed)
+        replaced = {path.name for path in changed} | set(removed)
+        stale = manifest[manifest['Zip'].isin(replaced)]
+        kept = manifest[~manifest['Zip'].isin(replaced)]
+        # New rows are numbered after every ID ever issued, so existing RAW_REC_IDs never change
+        first_id = int(manifest['Last_RAW_REC_ID'].max())
+
+    jobs = discover_members(to_process)
+    if not jobs and manifest is None:
+        print("   ERROR: No CSV members found in the export zips!")
+        exit(1)
+    print(f"   CSV members to parse: {len(jobs)}")
+
+    part_dir = args.output_dir / f"_panjiva_exports_parts_{timestamp}"
+    part_dir.mkdir(parents=True, exist_ok=True)
+    workers = args.workers or max(1, min(len(jobs), os.cpu_count() or 1))
+    hs_lookup = load_hs6_lookup(args.hs6_lookup)
+    print(f"   HS6 lookup: {len(hs_lookup['HS6']):,} codes")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(hs_lookup,)) as pool:
+        # Phase 1: parse and transform each member
+        print(f"\n2. Parsing {len(jobs)} members on {workers} worker processes "
+              f"(year, Tons, HS2/HS4/HS6 per member)...")
+        parse_start = time.perf_counter()
+        parsed = list(pool.map(parse_member, jobs, [part_dir] * len(jobs)))
+        parse_seconds = time.perf_counter() - parse_start
+        for job in parsed:
+            print(f"   [{job['Job'] + 1}/{len(jobs)}] {job['Zip']} / {job['Member']}: "
+                  f"{job['Rows']:,} records  {job['Parse_Seconds']:.1f}s")
+
+        # Only years fed by parsed members or by replaced/removed zips are rewritten; their
+        # header is the union of those years' previous headers and the parsed members' columns
+        years = sorted({year for job in parsed for year in job['Year_Rows']} |
+                       set(stale['Year'].dropna().astype(int)))
+        columns = output_columns(parsed, previous_columns(args.output_dir, kept, years))
+
+        # Phase 2: RAW_REC_ID offsets from the row counts, then number and format the parts
+        offsets = (first_id + np.concatenate([[0], np.cumsum([job['Rows'] for job in parsed])[:-1]])).tolist() \
+            if parsed else []
+        print(f"\n3. Numbering RAW_REC_ID and formatting year parts "
+              f"({sum(job['Rows'] for job in parsed):,} records, {len(columns)} columns)...")
+        write_start = time.perf_counter()
+        written = list(pool.map(write_member_parts, parsed, [part_dir] * len(parsed), offsets,
+                                [columns] * len(parsed)))
+        write_seconds = time.perf_counter() - write_start
+
+    retained = kept.dropna(subset=['Year']).groupby('Year')['Year_Rows'].sum()
+    print(f"\n4. Writing per-year outputs ({len(years)} affected)...")
+    header = pd.DataFrame(columns=columns).to_csv(index=False)
+    year_counts = {}
+    output_files = {}
+    for year in years:
+        year_counts[year] = int(retained.get(year, 0)) + sum(job['Year_Rows'].get(year, 0) for job in parsed)
+        output_file = args.output_dir / f"panjiva_exports_{year}_PREPROCESSED_v{timestamp}.csv"
+        # Written under a temp name: the previous file may carry the same timestamp
+        tmp_file = output_file.with_name(output_file.name + ".tmp")
+        with open(tmp_file, 'w', encoding='utf-8', newline='') as out:
+            out.write(header)
+            if year in retained.index:
+                previous_file = kept.loc[kept['Year'] == year, 'Output_File'].iloc[0]
+                drop_ranges = stale.loc[stale['Year'] == year, ['First_RAW_REC_ID', 'Last_RAW_REC_ID']]
+                copy_retained_rows(args.output_dir / previous_file, out, columns,
+                                   list(drop_ranges.itertuples(index=False, name=None)))
+            for job in parsed:
+                if year in job['Year_Rows']:
+                    part_file = part_dir / f"{job['Job']:05d}_{year}.csv"
+                    with open(part_file, 'r', encoding='utf-8', newline='') as part:
+                        shutil.copyfileobj(part, out)
+        os.replace(tmp_file, output_file)
+        output_files[year] = output_file.name
+        if not year_counts[year]:
+            # Supersedes the previous file, which still holds the removed zips' rows
+            print(f"   [--] Year {year}: no records left after removed zips -> {output_file.name} (header only)")
+            continue
+        print(f"   Year {year}: {year_counts[year]:,} records "
+              f"({int(retained.get(year, 0)):,} retained) -> {output_file.name}")
+    shutil.rmtree(part_dir)
+
+    # Manifest: unchanged zips keep their rows (pointing at the rewritten year files), parsed members are added
+    manifest = pd.concat([kept, manifest_rows(parsed, offsets, zip_info, output_files, timestamp)],
+                         ignore_index=True)
+    for year, name in output_files.items():
+        manifest.loc[manifest['Year'] == year, 'Output_File'] = name
+    save_manifest(manifest, manifest_file)
+    wall_seconds = time.perf_counter() - run_start
+
+    # Ingest report
+    report = pd.DataFrame(parsed, columns=['Job', 'Zip', 'Member', 'Rows', 'No_Year',
+                                           *[f"HS_{value}" for value in HS_CHECK_VALUES], 'Parse_Seconds'])
+    report['Write_Seconds'] = [job['Write_Seconds'] for job in written]
+    report['First_RAW_REC_ID'] = [offset + 1 for offset in offsets]
+    report_file = args.output_dir / f"panjiva_exports_ingest_report_{timestamp}.csv"
+    report.to_csv(report_file, index=False)
+
+    # Summary statistics
+    total_records = int(report['Rows'].sum())
+    no_year = int(report['No_Year'].sum())
+    print("\n" + "="*80)
+    print("SUMMARY STATISTICS")
+    print("="*80)
+
+    print(f"\nTotal export records processed: {total_records:,}")
+    print(f"Total columns: {len(columns)}")
+    print(f"Year distribution (rewritten years):")
+    for year, count in year_counts.items():
+        print(f"  {year}: {count:,} records")
+    if no_year:
+        print(f"  [--] No parseable Shipment Date (not written): {no_year:,}")
+
+    print(f"\nColumn additions:")
+    print(f"  - RAW_REC_ID (unique row ID)")
+    print(f"  - Year (from Shipment Date)")
+    print(f"  - Tons (standardized from Weight (t))")
+    print(f"  - HS2, HS4, HS6 (extracted from HS Code)")
+    print(f"  - HS_Check (HS6 validated against hs6_lookup.csv)")
+
+    print(f"\nHS code check:")
+    for value in HS_CHECK_VALUES:
+        count = int(report[f"HS_{value}"].sum())
+        print(f"  {value:<10} {count:>12,} ({count / max(total_records, 1) * 100:.1f}%)")
+
+    print(f"\nKey columns present:")
+    key_cols = ['Vessel', 'Port of Lading', 'Shipment Date', 'Voyage', 'IMO', 'Carrier',
+                'Shipper', 'HS Code', 'Goods Shipped', 'Tons']
+    for col in key_cols:
+        exists = col in columns
+        print(f"  {col:<25} {'[OK]' if exists else '[--]'}")
+
+    # Check for carrier column name
+    if 'Carrier' in columns:
+        print(f"\n  Carrier column name: 'Carrier' (not 'Carrier Name')")
+    elif 'Carrier Name' in columns:
+        print(f"\n  Carrier column name: 'Carrier Name'")
+
+    print(f"\nTimings:")
+    print(f"  Parse phase:  {parse_seconds:.1f}s wall (sum of member times {report['Parse_Seconds'].sum():.1f}s)")
+    print(f"  Write phase:  {write_seconds:.1f}s wall (sum of member times {report['Write_Seconds'].sum():.1f}s)")
+    print(f"  Total wall:   {wall_seconds:.1f}s on {workers} workers")
+    worker_peaks = [job['Worker_Peak_RSS_MB'] for job in parsed + written if job['Worker_Peak_RSS_MB'] is not None]
+    main_peak = peak_rss_mb()
+    if main_peak is not None:
+        print(f"  Peak RSS:     main {main_peak:,.0f} MB, largest worker {max(worker_peaks, default=0):,.0f} MB")
+    else:
+        print(f"  Peak RSS:     not available (install psutil on Windows)")
+    print(f"  Report:       {report_file.name}")
+    print(f"  Manifest:     {manifest_file.name} ({manifest['Zip'].nunique()} zips, "
+          f"{len(output_files)} of {manifest['Year'].nunique()} years rewritten)")
+
+    # Sample data
+    if output_files:
+        print(f"\n" + "="*80)
+        print("SAMPLE DATA (First 3 Records)")
+        print("="*80)
+        sample_cols = ['Vessel', 'Port of Lading', 'Shipment Date', 'Carrier', 'Tons', 'HS2']
+        available_cols = [c for c in sample_cols if c in columns]
+        first_file = args.output_dir / output_files[min(output_files)]
+        if len(available_cols) > 0:
+            print(pd.read_csv(first_file, usecols=available_cols, nrows=3,
+                              dtype={'HS2': str})[available_cols].to_string(index=False))
+
+    print(f"\n" + "="*80)
+    print("COMPLETE!")
+    print("="*80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Run USACE Entrance/Clearance Transforms for All Years (Parallel)
+Version: 1.0.0
+Date: 2026-10-19
+
+Purpose:
+- Discover every raw USACE file in 00_03_usace_entrance_clearance_raw
+- Transform the files concurrently on a process pool
+  (Inbound -> transform_entrance_data, Outbound -> transform_clearance_data)
+- Load the reference dictionaries ONCE and share the bundle with every worker
+- Write per-year, per-direction outputs plus a consolidated run report
+
+Input:
+- 00_raw_data/00_03_usace_entrance_clearance_raw/Entrances_Clearances_{YEAR}_{YEAR}_{Inbound|Outbound}.csv
+
+Output:
+- 02_STAGE02_CLASSIFICATION/usace_{YEAR}_inbound_entrance_transformed_v2.2.0.csv
+- 02_STAGE02_CLASSIFICATION/usace_{YEAR}_outbound_clearance_transformed_v2.2.0.csv
+- or, with --format parquet: 02_STAGE02_CLASSIFICATION/usace_transformed_parquet/
+  (one dataset partitioned Year=/Direction=/Port_Coast=)
+- 02_STAGE02_CLASSIFICATION/usace_transform_run_report_{timestamp}.csv
+- 02_STAGE02_CLASSIFICATION/transform_logs/*.log (full console output per file)
+
+Usage:
+    python run_usace_transforms_v1.0.0.py
+    python run_usace_transforms_v1.0.0.py --workers 4 --years 2022 2023
+    python run_usace_transforms_v1.0.0.py --chunk-size 250000   (streaming, bounded memory)
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import os
+import time
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from pipeline_common import (DICT_PATH, STAGE02_DIR, USACE_PARQUET_ROOT, USACE_RAW_DIR,
+                             load_reference_bundle, parquet_partition_year, parse_usace_raw_filename)
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+OUTPUT_VERSION = "v2.2.0"
+
+# Direction -> (transform script, function name, streaming function name, output label)
+TRANSFORMS = {
+    'Inbound': ("transform_usace_entrance_data_v2.1.0.py", "transform_entrance_data",
+                "stream_transform_entrance_data", "inbound_entrance"),
+    'Outbound': ("transform_usace_clearance_data_v2.1.0.py", "transform_clearance_data",
+                 "stream_transform_clearance_data", "outbound_clearance"),
+}
+
+# Set once per worker process by _init_worker
+_REFS = None
+_MODULES = {}
+
+
+def load_transform(direction, streaming=False):
+    """Import the versioned transform script for a direction (file names contain dots)"""
+    script, func_name, stream_func_name, _ = TRANSFORMS[direction]
+    if direction not in _MODULES:
+        spec = importlib.util.spec_from_file_location(f"usace_transform_{direction.lower()}", SCRIPT_DIR / script)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _MODULES[direction] = module
+    return getattr(_MODULES[direction], stream_func_name if streaming else func_name)
+
+
+def discover_raw_files(raw_dir, years=None):
+    """Find raw USACE files and return one job per file, sorted by year then direction"""
+    jobs = []
+    for path in sorted(Path(raw_dir).glob("Entrances_Clearances_*.csv")):
+        parsed = parse_usace_raw_filename(path)
+        if parsed is None:
+            print(f"   [--] Skipping unrecognized file: {path.name}")
+            continue
+        start_year, end_year, direction = parsed
+        if years and start_year not in years:
+            continue
+        year_label = str(start_year) if start_year == end_year else f"{start_year}_{end_year}"
+        jobs.append({
+            'Year': year_label,
+            'Direction': direction,
+            'Input_File': path,
+        })
+    return jobs
+
+
+def output_path_for(job, output_dir, output_format='csv'):
+    if output_format == 'parquet':
+        return Path(output_dir) / USACE_PARQUET_ROOT.name
+    label = TRANSFORMS[job['Direction']][3]
+    return Path(output_dir) / f"usace_{job['Year']}_{label}_transformed_{OUTPUT_VERSION}.csv"
+
+
+def parquet_partition_conflicts(jobs):
+    """
+    Problems that would corrupt the shared Parquet dataset: multi-year files
+    (no single Year= partition) and several jobs writing one Year/Direction
+    partition, where one job's clear_usace_parquet_partition would delete the
+    other's parts.
+    """
+    problems = []
+    partitions = {}
+    for job in jobs:
+        try:
+            year = parquet_partition_year(job['Input_File'])
+        except ValueError as exc:
+            problems.append(str(exc))
+            continue
+        partitions.setdefault((year, job['Direction']), []).append(job['Input_File'].name)
+    for (year, direction), names in sorted(partitions.items()):
+        if len(names) > 1:
+            problems.append(f"Year={year}/Direction={direction} written by {len(names)} files: {', '.join(names)}")
+    return problems
+
+
+def _init_worker(refs):
+    """Pool initializer: receive the shared reference bundle once per process"""
+    global _REFS
+    _REFS = refs
+
+
+def run_transform_job(job, output_file, log_file, test_mode=False, chunk_size=None, output_format='csv'):
+    """Transform one raw file; console output goes to its own log file"""
+    start = time.perf_counter()
+    result = {
+        'Year': job['Year'],
+        'Direction': job['Direction'],
+        'Input_File': job['Input_File'].name,
+        'Output_File': output_file.name,
+        'Rows': 0,
+        'Columns': 0,
+        'Seconds': 0.0,
+        'Status': 'OK',
+        'Error': '',
+        'Worker_PID': os.getpid(),
+    }
+    try:
+        transform = load_transform(job['Direction'], streaming=bool(chunk_size))
+        with open(log_file, 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+            if chunk_size:
+                totals = transform(job['Input_File'], output_file, refs=_REFS, chunk_size=chunk_size,
+                                   output_format=output_format)
+                result['Rows'] = totals.get('records', 0)
+                result['Columns'] = totals.get('columns', 0)
+            else:
+                df_final = transform(job['Input_File'], output_file, test_mode=test_mode, refs=_REFS,
+                                     output_format=output_format)
+                result['Rows'] = len(df_final)
+                result['Columns'] = len(df_final.columns)
+    except Exception as exc:
+        result['Status'] = 'FAILED'
+        result['Error'] = f"{type(exc).__name__}: {exc}"
+    result['Seconds'] = round(time.perf_counter() - start, 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transform all raw USACE entrance/clearance files in parallel")
+    parser.add_argument('--raw-dir', type=Path, default=USACE_RAW_DIR)
+    parser.add_argument('--output-dir', type=Path, default=STAGE02_DIR)
+    parser.add_argument('--dict-path', type=Path, default=DICT_PATH)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Process pool size (default: one per file, capped at CPU count)")
+    parser.add_argument('--years', type=int, nargs='*', default=None, help="Only process these years")
+    parser.add_argument('--test', action='store_true', help="TEST MODE: first 100 rows per file, nothing saved")
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help="Streaming mode: transform each file in chunks of N rows (bounded memory per worker)")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                        help="parquet: write one Year/Direction/Port_Coast partitioned dataset")
+    args = parser.parse_args()
+    if args.test and args.chunk_size:
+        parser.error("--test reads 100 rows and saves nothing; it cannot be combined with --chunk-size")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+
+    print("=" * 80)
+    print("USACE TRANSFORM RUNNER v1.0.0 (PARALLEL, MULTI-YEAR)")
+    print("=" * 80)
+
+    print(f"\n1. Discovering raw files in: {args.raw_dir}")
+    jobs = discover_raw_files(args.raw_dir, set(args.years) if args.years else None)
+    if not jobs:
+        print("   ERROR: No raw USACE files found!")
+        exit(1)
+    for job in jobs:
+        print(f"   {job['Year']:<10} {job['Direction']:<9} {job['Input_File'].name}")
+
+    if args.format == 'parquet':
+        problems = parquet_partition_conflicts(jobs)
+        if problems:
+            for problem in problems:
+                print(f"   ERROR: {problem}")
+            exit(1)
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    log_dir = args.output_dir / "transform_logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"\n2. Loading shared reference bundle...")
+    start = time.perf_counter()
+    refs = load_reference_bundle(args.dict_path)
+    print(f"   Bundle loaded in {time.perf_counter() - start:.1f}s")
+
+    workers = args.workers or min(len(jobs), os.cpu_count() or 1)
+    print(f"\n3. Transforming {len(jobs)} files on {workers} worker processes...")
+    run_start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(refs,)) as pool:
+        futures = {}
+        for job in jobs:
+            output_file = output_path_for(job, args.output_dir, args.format)
+            log_file = log_dir / f"{output_path_for(job, args.output_dir).stem}_{timestamp}.log"
+            futures[pool.submit(run_transform_job, job, output_file, log_file, args.test,
+                                args.chunk_size, args.format)] = job
+
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            status = '[OK]' if result['Status'] == 'OK' else '[--]'
+            print(f"   {status} {result['Year']:<10} {result['Direction']:<9} "
+                  f"{result['Rows']:>10,} rows  {result['Seconds']:>8.1f}s  {result['Error']}")
+    wall_seconds = time.perf_counter() - run_start
+
+    # Consolidated run report
+    report = pd.DataFrame(results).sort_values(['Year', 'Direction']).reset_index(drop=True)
+    report_file = args.output_dir / f"usace_transform_run_report_{timestamp}.csv"
+    report.to_csv(report_file, index=False)
+
+    print("\n" + "=" * 80)
+    print("RUN REPORT")
+    print("=" * 80)
+    print(report[['Year', 'Direction', 'Rows', 'Columns', 'Seconds', 'Status']].to_string(index=False))
+
+    ok = report[report['Status'] == 'OK']
+    serial_seconds = report['Seconds'].sum()
+    print(f"\nFiles transformed: {len(ok)} / {len(report)}")
+    print(f"Total rows:        {ok['Rows'].sum():,}")
+    print(f"Wall time:         {wall_seconds:.1f}s (sum of file times {serial_seconds:.1f}s)")
+    if wall_seconds > 0:
+        print(f"Parallel speedup:  {serial_seconds / wall_seconds:.1f}x")
+    if args.test:
+        print("\n[TEST MODE] Outputs not saved - review logs for results")
+    print(f"\nReport: {report_file}")
+    print(f"Logs:   {log_dir}")
+
+
+if __name__ == "__main__":
+    main()
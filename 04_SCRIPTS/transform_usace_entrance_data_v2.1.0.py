@@ -7,214 +7,130 @@ Updates in v2.1.0:
 - Added Carrier_Name column (placeholder)
 - Added Agency_Fee column (matched from ICST_DESC)
 - Added Agency_Fee_Adj column (placeholder)
+- Dictionaries load through pipeline_common.load_reference_bundle() and can be
+  passed in as `refs` (see run_usace_transforms_v1.0.0.py for multi-year runs)
+- Streaming mode (stream_transform_entrance_data, or --chunk-size N): processes
+  the raw file in fixed-size chunks and appends each chunk to the output
+- Optional Parquet output (output_format='parquet', or --format parquet):
+  output_file is then the dataset root, partitioned Year/Direction/Port_Coast
+- Fuzzy vessel fallback: names that miss the exact IMO/Name lookups are matched
+  against the ships register through a trigram index (Vessel_Match_Method = 'Fuzzy')
+- Port, foreign port, cargo class and agency fee mappings look up each distinct
+  key once (pipeline_common.enrich_by_key) and log cardinality and timing
 
 Author: WSD3 / Claude Code
 Date: 2026-01-15
 Version: 2.1.0
 """
 
+import argparse
 import pandas as pd
-import re
+from collections import Counter
 from pathlib import Path
 
-def transform_entrance_data(input_file, output_file, test_mode=False):
-    """Transform USACE entrance/clearance data"""
-
-    print("=" * 80)
-    print("USACE Entrance Data Transformation v2.1.0")
-    print("=" * 80)
-    print()
-
-    # Load dictionaries
-    print("Loading dictionaries...")
-
-    dict_path = Path(r"G:\My Drive\LLM\project_manifest\01.01_dictionary")
-
-    # USACE Port Codes (extracted from USACE entrance data itself)
-    df_usace_ports = pd.read_csv(dict_path / "usace_port_codes_from_data.csv", dtype=str)
-    usace_port_lookup = {}
-    for _, row in df_usace_ports.iterrows():
-        code = str(row['Port_Code']).strip()
-        usace_port_lookup[code] = str(row['Port_Name']).strip()
-    print(f"  Loaded {len(usace_port_lookup)} USACE port codes")
-
-    # US Port Dictionary (for Port_Consolidated, Port_Coast, Port_Region)
-    df_us_ports = pd.read_csv(dict_path / "01_us_port_dictionary.csv", dtype=str)
-    us_port_lookup = {}
-    for _, row in df_us_ports.iterrows():
-        code = str(row['Code']).strip()
-        us_port_lookup[code] = {
-            'Port_Consolidated': str(row.get('Port_Consolidated', '')).strip(),
-            'Port_Coast': str(row.get('Port_Coast', '')).strip(),
-            'Port_Region': str(row.get('Port_Region', '')).strip()
-        }
-    print(f"  Loaded {len(us_port_lookup)} US ports (for statistical categories)")
-
-    # Foreign ports dictionary (Sked K)
-    df_foreign_ports = pd.read_csv(dict_path / "usace_sked_k_foreign_ports.csv", dtype=str)
-    foreign_port_lookup = {}
-    for _, row in df_foreign_ports.iterrows():
-        code = str(row['FORPORT_CD']).strip()
-        foreign_port_lookup[code] = {
-            'Foreign_Port': str(row.get('FORPORT_NAME', '')).strip(),
-            'Foreign_Country': str(row.get('CTRY_NAME', '')).strip()
-        }
-    print(f"  Loaded {len(foreign_port_lookup)} foreign ports")
-
-    # Ships register
-    print("  Loading ships register...")
-    df_ships = pd.read_csv(dict_path / "01_ships_register.csv", dtype=str)
-
-    # Build IMO lookup
-    imo_lookup = {}
-    for _, row in df_ships.iterrows():
-        imo = str(row.get('IMO', '')).strip()
-        if imo and imo != '' and imo != 'nan':
-            imo_lookup[imo] = {
-                'Type': str(row.get('Type', '')).strip(),
-                'DWT': str(row.get('DWT', '')).strip(),
-                'Grain': str(row.get('Grain', '')).strip(),
-                'TPC': str(row.get('TPC', '')).strip(),
-                'Dwt_Draft_m': str(row.get('Dwt_Draft(m)', '')).strip()
-            }
-    print(f"    IMO matches: {len(imo_lookup)} vessels")
-
-    # Build name lookup
-    def normalize_name(name):
-        if pd.isna(name) or name == '':
-            return ''
-        name = str(name).upper()
-        name = re.sub(r'[^A-Z0-9]', '', name)
-        return name
-
-    name_lookup = {}
-    for _, row in df_ships.iterrows():
-        vessel = normalize_name(row.get('Vessel', ''))
-        if vessel:
-            name_lookup[vessel] = {
-                'Type': str(row.get('Type', '')).strip(),
-                'DWT': str(row.get('DWT', '')).strip(),
-                'Grain': str(row.get('Grain', '')).strip(),
-                'TPC': str(row.get('TPC', '')).strip(),
-                'Dwt_Draft_m': str(row.get('Dwt_Draft(m)', '')).strip()
-            }
-    print(f"    Name matches: {len(name_lookup)} vessels")
-
-    # Cargo classification dictionary
-    print("  Loading cargo classification dictionary...")
-    df_cargo_class = pd.read_csv(dict_path / "usace_cargoclass.csv", dtype=str)
-    cargo_class_lookup = {}
-    for _, row in df_cargo_class.iterrows():
-        icst_type = str(row['icst type']).strip().upper()
-        cargo_class_lookup[icst_type] = {
-            'Group': str(row.get('Group', '')).strip(),
-            'Commodity': str(row.get('Commodity', '')).strip()
-        }
-    print(f"    Loaded {len(cargo_class_lookup)} cargo classifications")
-
-    # Agency fee dictionary
-    print("  Loading agency fee dictionary...")
-    df_agency_fee = pd.read_csv(dict_path / "agency_fee_by_icst.csv", dtype=str)
-    agency_fee_lookup = {}
-    for _, row in df_agency_fee.iterrows():
-        icst_type = str(row['ICST_DESC']).strip().upper()
-        agency_fee_lookup[icst_type] = str(row.get('Agency_Fee', '')).strip()
-    print(f"    Loaded {len(agency_fee_lookup)} agency fees")
-
-    print()
-
-    # Read data
-    print(f"Reading: {input_file.name}")
-
-    if test_mode:
-        df = pd.read_csv(input_file, nrows=100)
-        print(f"  TEST MODE: Loaded first 100 rows")
-    else:
-        df = pd.read_csv(input_file)
-        print(f"  Loaded {len(df):,} rows")
-
-    print(f"  Original columns: {len(df.columns)}")
-    print()
+from pipeline_common import (clear_usace_parquet_partition, enrich_by_key, format_enrich_stats,
+                             load_reference_bundle, normalize_name, parquet_partition_year,
+                             print_transform_summary, stream_usace_transform, write_usace_parquet,
+                             USACE_PARQUET_ROOT)
+from fuzzy_match import fuzzy_match_keys, fuzzy_vessel_key
+
+# Default rows per chunk for stream_transform_entrance_data()
+CHUNK_SIZE = 250_000
+
+# Direction partition value for Parquet output
+DIRECTION = 'Inbound'
+
+def _transform_frame(df, refs, recid_start=1, verbose=True):
+    """
+    Apply every mapping/enrichment step to one frame of raw USACE rows.
+
+    Returns (df_final, counts). counts holds plain integers and Counters so
+    chunk results can be added together with pipeline_common.merge_counts().
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+
+    usace_port_lookup = refs['usace_port_lookup']
+    us_port_lookup = refs['us_port_lookup']
+    foreign_port_lookup = refs['foreign_port_lookup']
+    imo_lookup = refs['imo_lookup']
+    name_lookup = refs['name_lookup']
+    fuzzy_name_lookup = refs['fuzzy_name_lookup']
+    vessel_trigram_index = refs['vessel_trigram_index']
+    cargo_class_lookup = refs['cargo_class_lookup']
+    agency_fee_lookup = refs['agency_fee_lookup']
 
     # Convert numeric code columns to clean text
-    print("Converting numeric codes to text format...")
+    log("Converting numeric codes to text format...")
     code_columns = ['PORT', 'WHERE_PORT', 'WHERE_SCHEDK', 'NRT', 'GRT', 'IMO']
     for col in code_columns:
         if col in df.columns:
             df[col] = df[col].apply(lambda x: str(int(x)) if pd.notna(x) and x != '' else '')
-    print(f"  Converted {len(code_columns)} code columns to text")
-    print()
+    log(f"  Converted {len(code_columns)} code columns to text")
+    log()
 
     # TRANSFORMATIONS
-    print("Applying transformations...")
-    print()
+    log("Applying transformations...")
+    log()
 
     # 1. TYPEDOC: 0->Imports, 1->Exports
-    print("  [1] TYPEDOC: 0->Imports, 1->Exports")
+    log("  [1] TYPEDOC: 0->Imports, 1->Exports")
     df['TYPEDOC'] = df['TYPEDOC'].replace({0: 'Imports', 1: 'Exports', '0': 'Imports', '1': 'Exports'})
-    print(f"      Values: {df['TYPEDOC'].value_counts().to_dict()}")
+    log(f"      Values: {df['TYPEDOC'].value_counts().to_dict()}")
 
     # 2. PWW_IND: P->Port, W->Waterway
-    print("  [2] PWW_IND: P->Port, W->Waterway")
+    log("  [2] PWW_IND: P->Port, W->Waterway")
     df['PWW_IND'] = df['PWW_IND'].replace({'P': 'Port', 'W': 'Waterway'})
-    print(f"      Values: {df['PWW_IND'].value_counts().to_dict()}")
+    log(f"      Values: {df['PWW_IND'].value_counts().to_dict()}")
 
     # 3. WHERE_IND: F->Foreign, D->Coastwise
-    print("  [3] WHERE_IND: F->Foreign, D->Coastwise")
+    log("  [3] WHERE_IND: F->Foreign, D->Coastwise")
     df['WHERE_IND'] = df['WHERE_IND'].replace({'F': 'Foreign', 'D': 'Coastwise'})
-    print(f"      Values: {df['WHERE_IND'].value_counts().to_dict()}")
+    log(f"      Values: {df['WHERE_IND'].value_counts().to_dict()}")
 
-    print()
+    log()
 
     # PORT DICTIONARY MAPPING
-    print("Mapping ports...")
-    print()
+    log("Mapping ports...")
+    log()
+
+    # Each mapping looks up every distinct code once and broadcasts the result
+    enrich_seconds = Counter()
+
+    def enrich(label, key_col, lookup, columns, normalize=str):
+        stats = enrich_by_key(df, key_col, lookup, columns, normalize=normalize)
+        enrich_seconds[label] += stats['seconds']
+        log(f"    {format_enrich_stats(stats)}")
 
     # Map USACE Port (PORT column)
-    print("  Mapping US Port (USACE codes)...")
-    df['US_Port_USACE'] = df['PORT'].apply(
-        lambda x: usace_port_lookup.get(str(x), '') if pd.notna(x) and x != '' else ''
-    )
+    log("  Mapping US Port (USACE codes)...")
+    enrich('US Port (USACE)', 'PORT', usace_port_lookup, {'US_Port_USACE': None})
     matched_usace = len(df[df['US_Port_USACE'] != ''])
-    print(f"    Matched: {matched_usace}/{len(df)} ({matched_usace/len(df)*100:.1f}%)")
+    log(f"    Matched: {matched_usace}/{len(df)} ({matched_usace/len(df)*100:.1f}%)")
 
     # Map US Port Statistical Categories (PORT column against US port dictionary)
-    print("  Mapping US Port Statistical Categories...")
-    df['Port_Consolidated'] = df['PORT'].apply(
-        lambda x: us_port_lookup.get(str(x), {}).get('Port_Consolidated', '') if pd.notna(x) and x != '' else ''
-    )
-    df['Port_Coast'] = df['PORT'].apply(
-        lambda x: us_port_lookup.get(str(x), {}).get('Port_Coast', '') if pd.notna(x) and x != '' else ''
-    )
-    df['Port_Region'] = df['PORT'].apply(
-        lambda x: us_port_lookup.get(str(x), {}).get('Port_Region', '') if pd.notna(x) and x != '' else ''
-    )
+    log("  Mapping US Port Statistical Categories...")
+    enrich('Port Statistical Categories', 'PORT', us_port_lookup,
+           {'Port_Consolidated': 'Port_Consolidated', 'Port_Coast': 'Port_Coast', 'Port_Region': 'Port_Region'})
     matched_port_stats = len(df[df['Port_Consolidated'] != ''])
-    print(f"    Matched: {matched_port_stats}/{len(df)} ({matched_port_stats/len(df)*100:.1f}%)")
+    log(f"    Matched: {matched_port_stats}/{len(df)} ({matched_port_stats/len(df)*100:.1f}%)")
 
     # Map Previous Port - Domestic (WHERE_PORT)
-    print("  Mapping Previous Port (domestic)...")
-    df['Previous_US_Port_USACE'] = df['WHERE_PORT'].apply(
-        lambda x: usace_port_lookup.get(str(x), '') if pd.notna(x) and x != '' else ''
-    )
+    log("  Mapping Previous Port (domestic)...")
+    enrich('Previous US Port', 'WHERE_PORT', usace_port_lookup, {'Previous_US_Port_USACE': None})
     matched_prev_us = len(df[df['Previous_US_Port_USACE'] != ''])
-    print(f"    Matched: {matched_prev_us}/{len(df)} ({matched_prev_us/len(df)*100:.1f}%)")
+    log(f"    Matched: {matched_prev_us}/{len(df)} ({matched_prev_us/len(df)*100:.1f}%)")
 
     # Map Previous Port - Foreign (WHERE_SCHEDK)
-    print("  Mapping Previous Port (foreign)...")
-    df['Previous_Foreign_Port'] = df['WHERE_SCHEDK'].apply(
-        lambda x: foreign_port_lookup.get(str(x), {}).get('Foreign_Port', '') if pd.notna(x) and x != '' else ''
-    )
-    df['Previous_Foreign_Country'] = df['WHERE_SCHEDK'].apply(
-        lambda x: foreign_port_lookup.get(str(x), {}).get('Foreign_Country', '') if pd.notna(x) and x != '' else ''
-    )
+    log("  Mapping Previous Port (foreign)...")
+    enrich('Previous Foreign Port', 'WHERE_SCHEDK', foreign_port_lookup,
+           {'Previous_Foreign_Port': 'Foreign_Port', 'Previous_Foreign_Country': 'Foreign_Country'})
     matched_foreign = len(df[df['Previous_Foreign_Port'] != ''])
-    print(f"    Matched: {matched_foreign}/{len(df)} ({matched_foreign/len(df)*100:.1f}%)")
+    log(f"    Matched: {matched_foreign}/{len(df)} ({matched_foreign/len(df)*100:.1f}%)")
 
-    print()
+    log()
 
     # VESSEL MATCHING
-    print("Matching vessels to ships register...")
+    log("Matching vessels to ships register...")
     df['Vessel_Type'] = ''
     df['Vessel_DWT'] = ''
     df['Vessel_Grain'] = ''
@@ -271,14 +187,39 @@ def transform_entrance_data(input_file, output_file, test_mode=False):
                 df.at[idx, 'Vessel_Match_Method'] = 'Name'
                 name_matches += 1
 
-    print(f"  Matched by IMO:   {imo_matches:,} ({imo_matches/len(df)*100:.1f}%)")
-    print(f"  Matched by Name:  {name_matches:,} ({name_matches/len(df)*100:.1f}%)")
-    print(f"  Total Matched:    {imo_matches+name_matches:,} ({(imo_matches+name_matches)/len(df)*100:.1f}%)")
-    print(f"  Unmatched:        {len(df)-imo_matches-name_matches:,} ({(len(df)-imo_matches-name_matches)/len(df)*100:.1f}%)")
-    print()
+    # Fuzzy fallback for names the exact lookups missed ("M/V SEA STAR II" vs "SEA STAR 2",
+    # typos). Each distinct name is matched once through the trigram index.
+    unmatched = (df['Vessel_Match_Method'] == '') & (df['VESSNAME'].fillna('').astype(str).str.strip() != '')
+    fuzzy_keys = df.loc[unmatched, 'VESSNAME'].map(fuzzy_vessel_key)
+    fuzzy_hits = fuzzy_match_keys(fuzzy_keys.unique(), vessel_trigram_index)
+    fuzzy_matches = 0
+    for idx, key in fuzzy_keys.items():
+        if key not in fuzzy_hits:
+            continue
+        specs = fuzzy_name_lookup[fuzzy_hits[key][0]]
+        df.at[idx, 'Vessel_Type'] = specs['Type']
+        df.at[idx, 'Vessel_DWT'] = specs['DWT']
+        df.at[idx, 'Vessel_Grain'] = specs['Grain']
+        df.at[idx, 'Vessel_TPC'] = specs['TPC']
+        df.at[idx, 'Vessel_Dwt_Draft_m'] = specs['Dwt_Draft_m']
+        try:
+            df.at[idx, 'Vessel_Dwt_Draft_ft'] = f"{float(specs['Dwt_Draft_m']) * 3.28084:.2f}"
+        except:
+            df.at[idx, 'Vessel_Dwt_Draft_ft'] = ''
+        df.at[idx, 'Vessel_Match_Method'] = 'Fuzzy'
+        fuzzy_matches += 1
+
+    total_matched = imo_matches + name_matches + fuzzy_matches
+    log(f"  Matched by IMO:   {imo_matches:,} ({imo_matches/len(df)*100:.1f}%)")
+    log(f"  Matched by Name:  {name_matches:,} ({name_matches/len(df)*100:.1f}%)")
+    log(f"  Matched by Fuzzy: {fuzzy_matches:,} ({fuzzy_matches/len(df)*100:.1f}%) "
+        f"[{len(fuzzy_hits):,} of {fuzzy_keys.nunique():,} distinct unmatched names]")
+    log(f"  Total Matched:    {total_matched:,} ({total_matched/len(df)*100:.1f}%)")
+    log(f"  Unmatched:        {len(df)-total_matched:,} ({(len(df)-total_matched)/len(df)*100:.1f}%)")
+    log()
 
     # CALCULATE DRAFT PERCENTAGE AND FORECASTED ACTIVITY
-    print("Calculating draft percentage and forecasted activity...")
+    log("Calculating draft percentage and forecasted activity...")
 
     df['Draft_Pct_of_Max'] = ''
     df['Forecasted_Activity'] = ''
@@ -311,55 +252,45 @@ def transform_entrance_data(input_file, output_file, test_mode=False):
         except:
             pass
 
-    print(f"  Calculated draft % and forecast for {draft_calcs:,} vessels ({draft_calcs/len(df)*100:.1f}%)")
-    print()
+    log(f"  Calculated draft % and forecast for {draft_calcs:,} vessels ({draft_calcs/len(df)*100:.1f}%)")
+    log()
 
     # MATCH CARGO CLASSIFICATION FROM ICST TYPE
-    print("Matching cargo classification from ICST type...")
-    df['Group'] = ''
-    df['Commodity'] = ''
-
-    for idx, row in df.iterrows():
-        icst_desc = str(row.get('ICST_DESC', '')).strip().upper()
-        if icst_desc and icst_desc in cargo_class_lookup:
-            df.at[idx, 'Group'] = cargo_class_lookup[icst_desc]['Group']
-            df.at[idx, 'Commodity'] = cargo_class_lookup[icst_desc]['Commodity']
+    log("Matching cargo classification from ICST type...")
+    icst_key = lambda x: str(x).strip().upper()
+    enrich('Cargo Classification', 'ICST_DESC', cargo_class_lookup,
+           {'Group': 'Group', 'Commodity': 'Commodity'}, normalize=icst_key)
 
     matched_cargo = len(df[df['Group'] != ''])
-    print(f"  Matched {matched_cargo:,} records to cargo classification ({matched_cargo/len(df)*100:.1f}%)")
-    print()
+    log(f"  Matched {matched_cargo:,} records to cargo classification ({matched_cargo/len(df)*100:.1f}%)")
+    log()
 
     # MATCH AGENCY FEE FROM ICST TYPE
-    print("Matching agency fees from ICST type...")
-    df['Agency_Fee'] = ''
-
-    for idx, row in df.iterrows():
-        icst_desc = str(row.get('ICST_DESC', '')).strip().upper()
-        if icst_desc and icst_desc in agency_fee_lookup:
-            df.at[idx, 'Agency_Fee'] = agency_fee_lookup[icst_desc]
+    log("Matching agency fees from ICST type...")
+    enrich('Agency Fees', 'ICST_DESC', agency_fee_lookup, {'Agency_Fee': None}, normalize=icst_key)
 
     matched_fees = len(df[df['Agency_Fee'] != ''])
-    print(f"  Matched {matched_fees:,} records to agency fees ({matched_fees/len(df)*100:.1f}%)")
-    print()
+    log(f"  Matched {matched_fees:,} records to agency fees ({matched_fees/len(df)*100:.1f}%)")
+    log()
 
     # ADD PLACEHOLDER COLUMNS
-    print("Adding placeholder columns...")
+    log("Adding placeholder columns...")
     df['Tons'] = ''
     df['Carrier_Name'] = ''
     df['Agency_Fee_Adj'] = ''
-    print("  Added: Tons, Carrier_Name, Agency_Fee_Adj (placeholders)")
-    print()
+    log("  Added: Tons, Carrier_Name, Agency_Fee_Adj (placeholders)")
+    log()
 
     # ADD COUNT AND RECID COLUMNS
-    print("Adding Count and RECID columns...")
+    log("Adding Count and RECID columns...")
     df['Count'] = 1
-    df['RECID'] = range(1, len(df) + 1)
-    print("  Count column added (all values = 1)")
-    print(f"  RECID column added (sequential 1 to {len(df):,})")
-    print()
+    df['RECID'] = range(recid_start, recid_start + len(df))
+    log("  Count column added (all values = 1)")
+    log(f"  RECID column added (sequential {recid_start:,} to {recid_start + len(df) - 1:,})")
+    log()
 
     # COLUMN RENAMING
-    print("Renaming columns...")
+    log("Renaming columns...")
     rename_map = {
         'ECDATE': 'Arrival_Date',
         'PORT_NAME': 'Arrival_Port_Name',
@@ -369,12 +300,12 @@ def transform_entrance_data(input_file, output_file, test_mode=False):
     df.rename(columns=rename_map, inplace=True)
 
     for old, new in rename_map.items():
-        print(f"  {old:20s} -> {new}")
+        log(f"  {old:20s} -> {new}")
 
-    print()
+    log()
 
     # COLUMN SELECTION
-    print("Selecting columns to retain...")
+    log("Selecting columns to retain...")
 
     columns_to_keep = [
         # Core identification
@@ -442,59 +373,77 @@ def transform_entrance_data(input_file, output_file, test_mode=False):
 
     df_final = df[columns_to_keep]
 
-    print(f"  Retained {len(columns_to_keep)} columns")
-    print()
+    log(f"  Retained {len(columns_to_keep)} columns")
+    log()
+
+    # Per-frame counters (merged across chunks in streaming mode)
+    counts = {
+        'records': len(df_final),
+        'TYPEDOC': Counter(df_final['TYPEDOC'].value_counts().to_dict()),
+        'PWW_IND': Counter(df_final['PWW_IND'].value_counts().to_dict()),
+        'WHERE_IND': Counter(df_final['WHERE_IND'].value_counts().to_dict()),
+        'usace_mapped': int((df_final['US_Port_USACE'] != '').sum()),
+        'port_stats_mapped': int((df_final['Port_Consolidated'] != '').sum()),
+        'prev_us_mapped': int((df_final['Previous_US_Port_USACE'] != '').sum()),
+        'prev_foreign_mapped': int((df_final['Previous_Foreign_Port'] != '').sum()),
+        'imo_matches': imo_matches,
+        'name_matches': name_matches,
+        'fuzzy_matches': fuzzy_matches,
+        'draft_calcs': draft_calcs,
+        'discharge_count': int((df_final['Forecasted_Activity'] == 'Discharge').sum()),
+        'load_count': int((df_final['Forecasted_Activity'] == 'Load').sum()),
+        'matched_cargo': matched_cargo,
+        'matched_fees': matched_fees,
+        'enrich_seconds': enrich_seconds,
+    }
+
+    return df_final, counts
+
+def transform_entrance_data(input_file, output_file, test_mode=False, refs=None, output_format='csv'):
+    """
+    Transform USACE entrance/clearance data
+
+    refs: optional dictionary bundle from pipeline_common.load_reference_bundle();
+          loaded here when not supplied (single-file runs)
+    output_format: 'csv' (output_file is a CSV) or 'parquet' (output_file is the
+          partitioned dataset root; year comes from the input file name)
+    """
 
-    # SUMMARY STATISTICS
     print("=" * 80)
-    print("TRANSFORMATION SUMMARY")
+    print("USACE Entrance Data Transformation v2.1.0")
     print("=" * 80)
     print()
-    print(f"Total Records:        {len(df_final):,}")
-    print(f"Total Columns:        {len(df_final.columns)}")
-    print()
 
-    print("Value Distributions:")
-    print(f"  TYPEDOC:            {dict(df_final['TYPEDOC'].value_counts())}")
-    print(f"  PWW_IND:            {dict(df_final['PWW_IND'].value_counts())}")
-    print(f"  WHERE_IND:          {dict(df_final['WHERE_IND'].value_counts())}")
-    print()
+    # Load dictionaries (or reuse a bundle shared by the multi-file runner)
+    if refs is None:
+        refs = load_reference_bundle()
 
-    print("Port Mapping Success Rates:")
-    usace_mapped = len(df_final[df_final['US_Port_USACE'] != ''])
-    port_stats_mapped = len(df_final[df_final['Port_Consolidated'] != ''])
-    prev_us_mapped = len(df_final[df_final['Previous_US_Port_USACE'] != ''])
-    prev_foreign_mapped = len(df_final[df_final['Previous_Foreign_Port'] != ''])
-    print(f"  US Port (USACE):             {usace_mapped:,} / {len(df_final):,} ({usace_mapped/len(df_final)*100:.1f}%)")
-    print(f"  Port Statistical Categories: {port_stats_mapped:,} / {len(df_final):,} ({port_stats_mapped/len(df_final)*100:.1f}%)")
-    print(f"  Previous US Port:            {prev_us_mapped:,} / {len(df_final):,} ({prev_us_mapped/len(df_final)*100:.1f}%)")
-    print(f"  Previous Foreign Port:       {prev_foreign_mapped:,} / {len(df_final):,} ({prev_foreign_mapped/len(df_final)*100:.1f}%)")
-    print()
+    # Read data
+    print(f"Reading: {input_file.name}")
 
-    print("Vessel Matching Success Rates:")
-    print(f"  Matched by IMO:              {imo_matches:,} / {len(df_final):,} ({imo_matches/len(df_final)*100:.1f}%)")
-    print(f"  Matched by Name:             {name_matches:,} / {len(df_final):,} ({name_matches/len(df_final)*100:.1f}%)")
-    print(f"  Total Matched:               {imo_matches+name_matches:,} / {len(df_final):,} ({(imo_matches+name_matches)/len(df_final)*100:.1f}%)")
-    print()
+    if test_mode:
+        df = pd.read_csv(input_file, nrows=100)
+        print(f"  TEST MODE: Loaded first 100 rows")
+    else:
+        df = pd.read_csv(input_file)
+        print(f"  Loaded {len(df):,} rows")
 
-    print("Draft Analysis & Forecasted Activity:")
-    print(f"  Draft % Calculated:          {draft_calcs:,} / {len(df_final):,} ({draft_calcs/len(df_final)*100:.1f}%)")
-    discharge_count = len(df_final[df_final['Forecasted_Activity'] == 'Discharge'])
-    load_count = len(df_final[df_final['Forecasted_Activity'] == 'Load'])
-    print(f"  Forecasted Load:             {load_count:,} ({load_count/len(df_final)*100:.1f}%)")
-    print(f"  Forecasted Discharge:        {discharge_count:,} ({discharge_count/len(df_final)*100:.1f}%)")
+    print(f"  Original columns: {len(df.columns)}")
     print()
 
-    print("Cargo Classification (from ICST type):")
-    print(f"  Classified:                  {matched_cargo:,} / {len(df_final):,} ({matched_cargo/len(df_final)*100:.1f}%)")
-    print()
+    df_final, counts = _transform_frame(df, refs)
 
-    print("Agency Fees:")
-    print(f"  Fees Assigned:               {matched_fees:,} / {len(df_final):,} ({matched_fees/len(df_final)*100:.1f}%)")
-    print()
+    # SUMMARY STATISTICS
+    print_transform_summary(counts, len(df_final.columns))
 
     # Save output
-    if not test_mode:
+    if not test_mode and output_format == 'parquet':
+        year = parquet_partition_year(input_file)
+        print(f"Saving Parquet partitions to: {output_file} (Year={year}/Direction={DIRECTION})")
+        clear_usace_parquet_partition(output_file, year, DIRECTION)
+        write_usace_parquet(df_final, output_file, year, DIRECTION)
+        print("[OK] Partitions saved successfully")
+    elif not test_mode:
         print(f"Saving to: {output_file.name}")
         df_final.to_csv(output_file, index=False)
         print("[OK] File saved successfully")
@@ -506,13 +455,32 @@ def transform_entrance_data(input_file, output_file, test_mode=False):
 
     return df_final
 
+def stream_transform_entrance_data(input_file, output_file, refs=None, chunk_size=CHUNK_SIZE, output_format='csv'):
+    """
+    Streaming mode: the same transformation on fixed-size chunks of the raw
+    file, appended to the output (pipeline_common.stream_usace_transform).
+    Returns the merged counters.
+    """
+    return stream_usace_transform(input_file, output_file, _transform_frame, DIRECTION,
+                                  "USACE Entrance Data Transformation v2.1.0", refs=refs,
+                                  chunk_size=chunk_size, output_format=output_format)
+
 def main():
     """Main execution"""
 
+    parser = argparse.ArgumentParser(description="Transform USACE entrance data")
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help="Streaming mode: process the raw file in chunks of N rows")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                        help="parquet: write to the partitioned dataset under 02_STAGE02_CLASSIFICATION")
+    args = parser.parse_args()
+
     # Paths
     INPUT_FILE = Path(r"G:\My Drive\LLM\project_manifest\00_raw_data\00_03_usace_entrance_clearance_raw\Entrances_Clearances_2023_2023_Inbound.csv")
     OUTPUT_FILE = Path(r"G:\My Drive\LLM\project_manifest\02_STAGE02_CLASSIFICATION\usace_2023_inbound_entrance_transformed_v2.2.0.csv")
 
+    if args.format == 'parquet':
+        OUTPUT_FILE = USACE_PARQUET_ROOT
     OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
 
     # Run full dataset
@@ -522,7 +490,10 @@ def main():
     print("#" * 80)
     print("\n")
 
-    df_final = transform_entrance_data(INPUT_FILE, OUTPUT_FILE, test_mode=False)
+    if args.chunk_size:
+        stream_transform_entrance_data(INPUT_FILE, OUTPUT_FILE, chunk_size=args.chunk_size, output_format=args.format)
+    else:
+        df_final = transform_entrance_data(INPUT_FILE, OUTPUT_FILE, test_mode=False, output_format=args.format)
 
     print("\n")
     print("=" * 80)
@@ -0,0 +1,190 @@
+"""
+Persistent Tug-Barge Pairing Store
+Version: 1.0.0
+Date: 2026-10-19
+
+Purpose:
+- Keep tug/barge co-occurrence counts across years instead of rebuilding
+  them from the current run's unmatched records only
+- One record per (side, source, tug, barge, PORT, month) with the count and
+  the last day the pair was seen
+- Folding a source (one port call master file) replaces that source's earlier
+  records, so re-running a year never double counts
+- Queries sum over sources and ports, optionally limited to a trailing
+  window of months and/or decayed by a half-life in months
+
+Storage is a single uncompressed .npz of integer columns plus fixed-width
+string vocabularies (vessels, ports, sources) - no pickle - so a multi-year
+store loads in milliseconds.
+
+Usage:
+    from tug_barge_pairing_store import PairingStore
+    store = PairingStore.load(PAIRING_STORE_FILE)
+    store.fold("usace_2023_portcall_master_v1.0.0.csv", "ENTRANCE", observations)
+    store.save(PAIRING_STORE_FILE)
+    counts = store.counts("ENTRANCE", window_months=36)
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from pipeline_common import STAGE02_DIR
+
+PAIRING_STORE_FILE = STAGE02_DIR / "usace_tug_barge_pairing_store_v1.0.0.npz"
+
+SIDES = ['ENTRANCE', 'CLEARANCE']
+RECORD_COLUMNS = {
+    'side': np.int8,
+    'source': np.int32,
+    'tug': np.int32,
+    'barge': np.int32,
+    'port': np.int32,
+    'month': np.int32,      # year * 12 + month - 1
+    'count': np.int32,
+    'last_day': np.int32,   # days since 1970-01-01
+}
+
+
+def month_numbers(days):
+    """Days since epoch -> year * 12 + month - 1"""
+    months = np.asarray(days, dtype='datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    return months + 1970 * 12
+
+
+def _vocabulary_codes(vocabulary, values):
+    """Codes of values in vocabulary, appending unseen values; returns (vocabulary, codes)"""
+    values = pd.Index(values).astype(str)
+    codes = pd.Index(vocabulary).get_indexer(values)
+    unseen = pd.unique(values[codes < 0])
+    if len(unseen):
+        vocabulary = np.concatenate([vocabulary, np.asarray(unseen, dtype=str)])
+        codes = pd.Index(vocabulary).get_indexer(values)
+    return vocabulary, codes
+
+
+class PairingStore:
+    """Multi-year (tug, barge, PORT, month) co-occurrence counts"""
+
+    def __init__(self, vessels=None, ports=None, sources=None, records=None):
+        self.vessels = np.asarray([] if vessels is None else vessels, dtype=str)
+        self.ports = np.asarray([] if ports is None else ports, dtype=str)
+        self.sources = np.asarray([] if sources is None else sources, dtype=str)
+        records = records or {}
+        self.records = {col: np.asarray(records.get(col, []), dtype=dtype)
+                        for col, dtype in RECORD_COLUMNS.items()}
+
+    def __len__(self):
+        return len(self.records['count'])
+
+    @classmethod
+    def load(cls, path):
+        """Load a store; a missing file gives an empty store"""
+        path = Path(path)
+        if not path.exists():
+            return cls()
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['vessels'], data['ports'], data['sources'],
+                       {col: data[col] for col in RECORD_COLUMNS})
+
+    def save(self, path):
+        """Write atomically (temporary file, then replace)"""
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, 'wb') as f:
+            np.savez(f, vessels=self.vessels, ports=self.ports, sources=self.sources, **self.records)
+        os.replace(tmp, path)
+
+    def fold(self, source, side, observations):
+        """
+        Replace source/side's records with new observations.
+
+        observations: one row per co-occurrence with Tug_Vessel, Barge_Vessel,
+        PORT and Date (datetime). Returns the number of records written.
+        """
+        side_code = SIDES.index(side)
+        self.sources, (source_code,) = _vocabulary_codes(self.sources, [source])
+        keep = ~((self.records['side'] == side_code) & (self.records['source'] == source_code))
+        self.records = {col: values[keep] for col, values in self.records.items()}
+
+        observations = observations.dropna(subset=['Tug_Vessel', 'Barge_Vessel', 'PORT', 'Date'])
+        if len(observations) == 0:
+            return 0
+        days = observations['Date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+        ports = observations['PORT']
+        if pd.api.types.is_float_dtype(ports):
+            ports = ports.astype(np.int64)  # 4601.0 -> "4601", same key as an all-integer year
+        self.vessels, tug_codes = _vocabulary_codes(self.vessels, observations['Tug_Vessel'])
+        self.vessels, barge_codes = _vocabulary_codes(self.vessels, observations['Barge_Vessel'])
+        self.ports, port_codes = _vocabulary_codes(self.ports, ports)
+
+        folded = pd.DataFrame({
+            'tug': tug_codes, 'barge': barge_codes, 'port': port_codes,
+            'month': month_numbers(days), 'day': days,
+        }).groupby(['tug', 'barge', 'port', 'month'], sort=False).agg(
+            count=('day', 'size'), last_day=('day', 'max')).reset_index()
+        folded['side'] = side_code
+        folded['source'] = source_code
+
+        self.records = {col: np.concatenate([self.records[col], folded[col].to_numpy().astype(dtype)])
+                        for col, dtype in RECORD_COLUMNS.items()}
+        return len(folded)
+
+    def counts(self, side, as_of_month=None, window_months=None, half_life_months=None):
+        """
+        (Tug_Vessel, Barge_Vessel) -> co-occurrences over all sources and ports.
+
+        window_months keeps only the trailing months up to as_of_month (default:
+        the newest month in the store). half_life_months weights each month by
+        0.5 ** (age / half_life), giving float counts rounded to 2 decimals.
+        """
+        records = self.records
+        mask = records['side'] == SIDES.index(side)
+        if as_of_month is None:
+            as_of_month = int(records['month'][mask].max()) if mask.any() else 0
+        if window_months is not None:
+            mask &= records['month'] > as_of_month - window_months
+        mask &= records['month'] <= as_of_month
+
+        tug, barge, count = records['tug'][mask], records['barge'][mask], records['count'][mask]
+        if half_life_months:
+            age = as_of_month - records['month'][mask]
+            weights = count * 0.5 ** (age / half_life_months)
+        else:
+            weights = count.astype(np.int64)
+
+        n_vessels = max(len(self.vessels), 1)
+        keys = tug.astype(np.int64) * n_vessels + barge
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse, weights=weights, minlength=len(unique_keys))
+        totals = totals.round(2) if half_life_months else totals.astype(np.int64)
+        index = pd.MultiIndex.from_arrays([self.vessels[unique_keys // n_vessels],
+                                           self.vessels[unique_keys % n_vessels]],
+                                          names=['Tug_Vessel', 'Barge_Vessel'])
+        return pd.Series(totals, index=index, name='Co_Occurrences')
+
+    def last_seen(self, side):
+        """(Tug_Vessel, Barge_Vessel, PORT) -> last date seen together"""
+        records = self.records
+        mask = records['side'] == SIDES.index(side)
+        frame = pd.DataFrame({
+            'Tug_Vessel': self.vessels[records['tug'][mask]],
+            'Barge_Vessel': self.vessels[records['barge'][mask]],
+            'PORT': self.ports[records['port'][mask]],
+            'last_day': records['last_day'][mask],
+        })
+        last = frame.groupby(['Tug_Vessel', 'Barge_Vessel', 'PORT'])['last_day'].max()
+        return pd.to_datetime(last.to_numpy(), unit='D').to_series(index=last.index, name='Last_Seen')
+
+    def summary(self):
+        """Record, vessel, source and month-range counts for logging"""
+        months = self.records['month']
+        return {
+            'records': len(self),
+            'vessels': len(self.vessels),
+            'ports': len(self.ports),
+            'sources': len(self.sources),
+            'first_month': f"{months.min() // 12}-{months.min() % 12 + 1:02d}" if len(months) else None,
+            'last_month': f"{months.max() // 12}-{months.max() % 12 + 1:02d}" if len(months) else None,
+        }
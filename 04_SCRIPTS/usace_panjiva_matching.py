@@ -0,0 +1,494 @@
+"""
+USACE <-> Panjiva Port Call Matching Engine
+Version: 1.0.0
+Date: 2026-10-19
+
+Purpose:
+- One matching engine for both directions:
+    entrance  <-> Panjiva imports  (IMO available, then vessel name)
+    clearance <-> Panjiva exports  (vessel name only)
+- Pluggable key strategies, tried in order on the records earlier strategies
+  left unmatched:
+    IMO           valid 7-digit IMO + Port_Key
+    Vessel_Name   normalized vessel name + Port_Key
+    Vessel_Fuzzy  fuzzy_match.py name score + Port_Key (unclaimed calls only)
+- Tolerance schedule: pass -> max days offset (default 2 / 4 / 7); the join
+  runs once at the widest tolerance and each match's pass follows from its offset
+- Assignment: nearest (best call per record) or one-to-one (each Panjiva port
+  call assigned at most once, claimed globally by smallest offset)
+- Per strategy and pass match rates and timings
+
+Both sides are matched on a small internal schema:
+    USACE:   Vessel, IMO, Port_Key, Match_Date (other columns are left alone)
+    Panjiva: VOY_RECID, Vessel, IMO, Port_Key, Call_Date, Carrier, Party, Total_Tons
+panjiva_call_frame() renames a Panjiva port call file to it using DIRECTIONS.
+Dates join on the calendar only, so multi-year inputs need no special
+handling: a 31-Dec clearance finds a 2-Jan shipment in the next year's file.
+
+Usage:
+    from usace_panjiva_matching import DIRECTIONS, match_port_calls, panjiva_call_frame
+    panjiva = panjiva_call_frame(raw_calls, DIRECTIONS['entrance'])
+    matches, stats, conflicts = match_port_calls(usace, panjiva, ['IMO', 'Vessel_Name'])
+"""
+
+import re
+import time
+import numpy as np
+import pandas as pd
+
+from fuzzy_match import DEFAULT_THRESHOLD, TrigramIndex, fuzzy_match_key_pairs, fuzzy_vessel_key
+
+# Tolerance schedule: pass -> max days offset
+MATCH_PASSES = {1: 2, 2: 4, 3: 7}
+MATCH_TOLERANCE_DAYS = max(MATCH_PASSES.values())
+
+# Composite (key code, day) sort key: key code * DAY_SPAN + days since epoch
+DAY_SPAN = 1 << 20
+
+# Per-direction configuration: USACE columns and Panjiva port call column candidates
+# (first one present wins; Panjiva columns not listed keep their names)
+DIRECTIONS = {
+    'entrance': {
+        'usace_direction': 'Inbound',
+        'usace_label': 'inbound_entrance',
+        'usace_date': 'Arrival_Date',
+        'usace_port': 'Arrival_Port_Name',
+        'panjiva_label': 'imports',
+        'panjiva_columns': {
+            'Call_Date': ['Arrival_Date', 'Arrival Date'],
+            'Port_Name': ['Port_of_Discharge', 'Port_of_Discharge_D', 'Port of Discharge (D)'],
+            'Party': ['Consignee'],
+            'IMO': ['IMO'],
+        },
+        'party_output': 'Panjiva_Consignee',
+        'strategies': ['IMO', 'Vessel_Name', 'Vessel_Fuzzy'],
+    },
+    'clearance': {
+        'usace_direction': 'Outbound',
+        'usace_label': 'outbound_clearance',
+        'usace_date': 'Clearance_Date',
+        'usace_port': 'Clearance_Port_Name',
+        'panjiva_label': 'exports',
+        'panjiva_columns': {
+            'Call_Date': ['Shipment_Date', 'Shipment Date'],
+            'Port_Name': ['Port_of_Lading', 'Port of Lading'],
+            'Party': ['Shipper'],
+            'IMO': ['IMO'],  # missing in export data
+        },
+        'party_output': 'Panjiva_Shipper',
+        'strategies': ['Vessel_Name', 'Vessel_Fuzzy'],
+    },
+}
+
+PANJIVA_REQUIRED = ['VOY_RECID', 'Vessel', 'Call_Date', 'Port_Name']
+PANJIVA_OPTIONAL = ['IMO', 'Carrier', 'Party', 'Total_Tons']
+
+# Engine result columns (indexed like the USACE frame; Panjiva_Row is the call's panjiva index label)
+MATCH_COLUMNS = ['VOY_RECID', 'Carrier', 'Party', 'Total_Tons', 'Days_Offset', 'Pass',
+                 'Method', 'Name_Score', 'Panjiva_Row']
+
+
+def normalize_vessel_name(name):
+    if pd.isna(name) or name == '':
+        return ''
+    normalized = re.sub(r'[^a-zA-Z0-9\s]', '', str(name))
+    return ' '.join(normalized.lower().split())
+
+
+def vessel_name_keys(frame):
+    """Vessel_Name strategy key: normalized name per distinct name (NaN when empty)"""
+    names = {name: normalize_vessel_name(name) or np.nan for name in pd.unique(frame['Vessel'].dropna())}
+    return frame['Vessel'].map(names)
+
+
+def imo_keys(frame):
+    """IMO strategy key: 7-digit IMO number as float64 (NaN when missing or invalid)"""
+    if 'IMO' not in frame.columns:
+        return pd.Series(np.nan, index=frame.index)
+    # float64 on both sides: "9630755", 9630755 and 9630755.0 are the same key
+    numbers = pd.to_numeric(frame['IMO'], errors='coerce').astype('float64')
+    valid = (numbers >= 1_000_000) & (numbers <= 9_999_999) & (numbers == np.floor(numbers))
+    return numbers.where(valid)
+
+
+# Exact key strategies: name -> key function (frame -> Series, NaN = no key)
+KEY_STRATEGIES = {
+    'IMO': imo_keys,
+    'Vessel_Name': vessel_name_keys,
+}
+FUZZY_STRATEGY = 'Vessel_Fuzzy'
+STRATEGIES = list(KEY_STRATEGIES) + [FUZZY_STRATEGY]
+
+
+def parse_passes(text):
+    """'2,4,7' -> {1: 2, 2: 4, 3: 7} (tolerances must increase)"""
+    tolerances = [int(value) for value in str(text).split(',') if value.strip()]
+    if not tolerances or tolerances != sorted(set(tolerances)) or tolerances[0] < 0:
+        raise ValueError(f"Tolerance schedule must be increasing day counts, got {text!r}")
+    return {number: days for number, days in enumerate(tolerances, start=1)}
+
+
+def panjiva_call_frame(calls, config):
+    """
+    Panjiva port calls renamed to the engine schema for one direction.
+
+    Raises ValueError when VOY_RECID, Vessel, the call date or the port column
+    is missing; IMO, Carrier, Party and Total_Tons become NaN when absent.
+    """
+    calls = calls.copy()
+    for target, candidates in config['panjiva_columns'].items():
+        present = [col for col in candidates if col in calls.columns]
+        if present and present[0] != target:
+            calls = calls.drop(columns=[target], errors='ignore').rename(columns={present[0]: target})
+    missing = [col for col in PANJIVA_REQUIRED if col not in calls.columns]
+    if missing:
+        raise ValueError(f"Panjiva {config['panjiva_label']} port calls lack columns: {missing}")
+    for col in PANJIVA_OPTIONAL:
+        if col not in calls.columns:
+            calls[col] = np.nan
+    calls['Call_Date'] = pd.to_datetime(calls['Call_Date'], errors='coerce')
+    return calls
+
+
+def match_pass(days_offset, passes=MATCH_PASSES):
+    """Pass number for a day offset; NaN when beyond the schedule"""
+    days_offset = pd.Series(days_offset)
+    pass_numbers = pd.Series(np.nan, index=days_offset.index)
+    for pass_number, tolerance in sorted(passes.items(), reverse=True):
+        pass_numbers[days_offset <= tolerance] = pass_number
+    return pass_numbers
+
+
+def nearest_date_matches(usace, panjiva, passes=MATCH_PASSES, keys=('Match_Key', 'Port_Key')):
+    """
+    Best Panjiva port call per USACE record: same keys, nearest Call_Date to
+    Match_Date within the widest tolerance of passes.
+
+    merge_asof on the distinct (keys, date) rows finds the nearest date (ties
+    go to the earlier date); the port calls on that date are then joined back
+    and the lowest VOY_RECID kept. Returns a frame indexed like usace with
+    VOY_RECID, Carrier, Party, Total_Tons, Days_Offset, Pass and Panjiva_Row
+    (NaN = no match).
+    """
+    keys = list(keys)
+    columns = ['VOY_RECID', 'Carrier', 'Party', 'Total_Tons', 'Days_Offset', 'Pass', 'Panjiva_Row']
+    # merge_asof needs one datetime resolution (decoded USACE dates are ns, parsed CSV dates may not be)
+    left = usace[keys].assign(Match_Date=usace['Match_Date'].astype('datetime64[ns]'))
+    left = left[left['Match_Date'].notna()].rename_axis('USACE_Row').reset_index()
+    left = left.sort_values('Match_Date', kind='stable')
+    calls = panjiva[['VOY_RECID'] + keys + ['Carrier', 'Party', 'Total_Tons']].assign(
+        Call_Date=panjiva['Call_Date'].astype('datetime64[ns]'), Panjiva_Row=panjiva.index)
+    dates = (calls.loc[calls['Call_Date'].notna(), keys + ['Call_Date']]
+             .drop_duplicates().sort_values('Call_Date', kind='stable'))
+    if left.empty or dates.empty:
+        return pd.DataFrame(columns=columns, index=usace.index, dtype=object)
+
+    nearest = pd.merge_asof(left, dates, left_on='Match_Date', right_on='Call_Date', by=keys,
+                            direction='nearest', tolerance=pd.Timedelta(days=max(passes.values())))
+    nearest = nearest[nearest['Call_Date'].notna()]
+
+    best = (nearest.merge(calls, on=keys + ['Call_Date'])
+            .sort_values(['USACE_Row', 'VOY_RECID'], kind='stable')
+            .drop_duplicates('USACE_Row')
+            .set_index('USACE_Row'))
+    best['Days_Offset'] = (best['Match_Date'] - best['Call_Date']).abs().dt.days
+    best['Pass'] = match_pass(best['Days_Offset'], passes)
+    return best[columns].reindex(usace.index)
+
+
+def day_numbers(dates):
+    """Days since epoch as int64 (-1 where missing) and the valid mask"""
+    days = pd.Series(dates).to_numpy(dtype='datetime64[D]')
+    valid = ~np.isnat(days)
+    return np.where(valid, days.astype(np.int64), -1), valid
+
+
+def candidate_matches(usace, panjiva, tolerance_days=MATCH_TOLERANCE_DAYS, keys=('Match_Key', 'Port_Key')):
+    """
+    Every (USACE position, Panjiva position) pair with the same keys and
+    dates within tolerance_days, with Days_Offset and Call_Day.
+
+    Panjiva rows are sorted once by (key, day); each USACE record's candidates
+    are one binary-searched range of that order.
+    """
+    keys = list(keys)
+    panjiva_keys = pd.MultiIndex.from_frame(panjiva[keys])
+    key_index = panjiva_keys.unique()
+    panjiva_codes = key_index.get_indexer(panjiva_keys)
+    usace_codes = key_index.get_indexer(pd.MultiIndex.from_frame(usace[keys]))
+    call_days, call_valid = day_numbers(panjiva['Call_Date'])
+    match_days, match_valid = day_numbers(usace['Match_Date'])
+
+    dated = np.flatnonzero(call_valid)
+    composite = panjiva_codes[dated] * DAY_SPAN + call_days[dated]
+    order = np.argsort(composite, kind='stable')
+    sorted_keys, sorted_rows = composite[order], dated[order]
+
+    rows = np.flatnonzero(match_valid & (usace_codes >= 0))
+    centre = usace_codes[rows] * DAY_SPAN + match_days[rows]
+    lo = np.searchsorted(sorted_keys, centre - tolerance_days, side='left')
+    hi = np.searchsorted(sorted_keys, centre + tolerance_days, side='right')
+    counts = hi - lo
+    usace_pos = np.repeat(rows, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    panjiva_pos = sorted_rows[np.repeat(lo, counts) + offsets]
+
+    return pd.DataFrame({
+        'USACE_Pos': usace_pos,
+        'Panjiva_Pos': panjiva_pos,
+        'Days_Offset': np.abs(match_days[usace_pos] - call_days[panjiva_pos]),
+        'Call_Day': call_days[panjiva_pos],
+    })
+
+
+def voy_ranks(panjiva):
+    """Rank of each Panjiva row's VOY_RECID (deterministic tie-breaker)"""
+    ranks = np.empty(len(panjiva), dtype=np.int64)
+    ranks[np.argsort(panjiva['VOY_RECID'].to_numpy(dtype=object).astype(str), kind='stable')] = np.arange(len(panjiva))
+    return ranks
+
+
+def claim_one_to_one(order, usace_pos, panjiva_pos):
+    """
+    Walk candidates in order and keep a pair when neither its USACE record nor
+    its Panjiva call is taken yet; returns the kept candidate positions.
+    """
+    usace_taken = set()
+    panjiva_taken = set()
+    accepted = []
+    for i, u, p in zip(order.tolist(), usace_pos[order].tolist(), panjiva_pos[order].tolist()):
+        if u not in usace_taken and p not in panjiva_taken:
+            usace_taken.add(u)
+            panjiva_taken.add(p)
+            accepted.append(i)
+    return accepted
+
+
+def assigned_matches(usace, panjiva, usace_pos, panjiva_pos, days_offset, passes=MATCH_PASSES):
+    """Match frame (nearest_date_matches columns) for assigned (USACE, Panjiva) positions"""
+    panjiva_pos = np.asarray(panjiva_pos, dtype=np.int64)
+    calls = panjiva.iloc[panjiva_pos]
+    best = pd.DataFrame({
+        'VOY_RECID': calls['VOY_RECID'].to_numpy(),
+        'Carrier': calls['Carrier'].to_numpy(),
+        'Party': calls['Party'].to_numpy(),
+        'Total_Tons': calls['Total_Tons'].to_numpy(),
+        'Days_Offset': np.asarray(days_offset),
+        'Panjiva_Row': panjiva.index[panjiva_pos],
+    }, index=usace.index[np.asarray(usace_pos, dtype=np.int64)])
+    best.insert(5, 'Pass', match_pass(best['Days_Offset'], passes))
+    return best
+
+
+def one_to_one_matches(usace, panjiva, passes=MATCH_PASSES, keys=('Match_Key', 'Port_Key')):
+    """
+    Assign each Panjiva port call to at most one USACE record.
+
+    Candidate pairs are claimed in one global order - smallest Days_Offset,
+    earlier Call_Date, lowest VOY_RECID, USACE row order - and a pair is
+    kept when neither side is taken yet. Same return frame as
+    nearest_date_matches.
+    """
+    candidates = candidate_matches(usace, panjiva, max(passes.values()), keys)
+    usace_pos = candidates['USACE_Pos'].to_numpy()
+    panjiva_pos = candidates['Panjiva_Pos'].to_numpy()
+    order = np.lexsort((usace_pos, voy_ranks(panjiva)[panjiva_pos], candidates['Call_Day'].to_numpy(),
+                        candidates['Days_Offset'].to_numpy()))
+    accepted = candidates.iloc[claim_one_to_one(order, usace_pos, panjiva_pos)]
+    return assigned_matches(usace, panjiva, accepted['USACE_Pos'], accepted['Panjiva_Pos'],
+                            accepted['Days_Offset'], passes).reindex(usace.index)
+
+
+def blocked_name_pairs(usace_keys, usace, panjiva, tolerance_days, threshold=DEFAULT_THRESHOLD):
+    """
+    (USACE_Key, Port_Key, Fuzzy_Key, Name_Score) for every admissible name
+    pair, scored inside port/date blocks.
+
+    Per Port_Key, only the Panjiva calls dated within tolerance_days of a USACE
+    record at that port are indexed, and only the keys of that port's USACE
+    records are scored against them - a name is never compared with vessels
+    that could not be joined on port and date anyway.
+    """
+    match_days, match_valid = day_numbers(usace['Match_Date'])
+    call_days, call_valid = day_numbers(panjiva['Call_Date'])
+    records = pd.DataFrame({'Key': usace_keys.to_numpy(), 'Port_Key': usace['Port_Key'].to_numpy(),
+                            'Day': match_days})[match_valid & (usace_keys.to_numpy() != '')]
+    calls = pd.DataFrame({'Key': panjiva['Fuzzy_Key'].to_numpy(), 'Port_Key': panjiva['Port_Key'].to_numpy(),
+                          'Day': call_days})[call_valid & (panjiva['Fuzzy_Key'].to_numpy() != '')]
+    calls_by_port = dict(tuple(calls.groupby('Port_Key', sort=False)))
+
+    pairs = []
+    for port, block in records.groupby('Port_Key', sort=False):
+        port_calls = calls_by_port.get(port)
+        if port_calls is None:
+            continue
+        # Distance from each call to the nearest USACE date at this port
+        days = np.unique(block['Day'].to_numpy())
+        call_day = port_calls['Day'].to_numpy()
+        pos = np.searchsorted(days, call_day)
+        nearest = np.minimum(np.abs(call_day - days[np.maximum(pos - 1, 0)]),
+                             np.abs(days[np.minimum(pos, len(days) - 1)] - call_day))
+        names = pd.unique(port_calls['Key'].to_numpy()[nearest <= tolerance_days])
+        if not len(names):
+            continue
+        index = TrigramIndex(sorted(names))
+        pairs.extend((key, port, name, score)
+                     for key, name, score in fuzzy_match_key_pairs(block['Key'], index, threshold))
+    return pd.DataFrame(pairs, columns=['USACE_Key', 'Port_Key', 'Fuzzy_Key', 'Name_Score'])
+
+
+def fuzzy_vessel_matches(usace, panjiva, threshold=DEFAULT_THRESHOLD, passes=MATCH_PASSES):
+    """
+    Fuzzy pass: pair USACE records with Panjiva calls at the same Port_Key
+    within the widest tolerance whose vessel names score >= threshold
+    (fuzzy_match canonical keys, banded edit distance, hull numbers must agree).
+
+    Names are blocked by port and date before scoring (blocked_name_pairs):
+    each record is then expanded by the names admissible at its port and
+    joined to calls through the (name, port, date) windows of
+    candidate_matches. Pairs are claimed one-to-one by highest score, then
+    smallest offset, earlier date, lowest VOY_RECID. Returns the matched rows
+    only, with Name_Score.
+    """
+    keys = {name: fuzzy_vessel_key(name) for name in pd.unique(pd.concat([usace['Vessel'], panjiva['Vessel']]).dropna())}
+    usace_keys = usace['Vessel'].map(keys).fillna('')
+    panjiva = panjiva.assign(Fuzzy_Key=panjiva['Vessel'].map(keys).fillna(''))
+    names = blocked_name_pairs(usace_keys, usace, panjiva, max(passes.values()), threshold)
+    if names.empty:
+        return assigned_matches(usace, panjiva, [], [], [], passes).assign(Name_Score=np.nan)
+
+    expanded = (pd.DataFrame({'USACE_Pos': np.arange(len(usace)), 'USACE_Key': usace_keys.to_numpy(),
+                              'Port_Key': usace['Port_Key'].to_numpy(), 'Match_Date': usace['Match_Date'].to_numpy()})
+                .merge(names, on=['USACE_Key', 'Port_Key']))
+    candidates = candidate_matches(expanded, panjiva, max(passes.values()), keys=('Fuzzy_Key', 'Port_Key'))
+    usace_pos = expanded['USACE_Pos'].to_numpy()[candidates['USACE_Pos'].to_numpy()]
+    panjiva_pos = candidates['Panjiva_Pos'].to_numpy()
+    score = expanded['Name_Score'].to_numpy()[candidates['USACE_Pos'].to_numpy()]
+    order = np.lexsort((usace_pos, voy_ranks(panjiva)[panjiva_pos], candidates['Call_Day'].to_numpy(),
+                        candidates['Days_Offset'].to_numpy(), -score))
+    accepted = np.asarray(claim_one_to_one(order, usace_pos, panjiva_pos), dtype=np.int64)
+    best = assigned_matches(usace, panjiva, usace_pos[accepted], panjiva_pos[accepted],
+                            candidates['Days_Offset'].to_numpy()[accepted], passes)
+    best['Name_Score'] = score[accepted].round(3)
+    return best
+
+
+def conflict_report(usace, nearest, assigned, port_col='Port_Name', date_label='Match_Date'):
+    """
+    USACE records whose nearest port call was claimed by several records, or
+    whose one-to-one assignment differs from the nearest call.
+
+    Calls are identified by Panjiva_Row, not VOY_RECID: VOY_RECIDs restart
+    every year, so in a multi-year run one ID can name different calls.
+
+    Resolution: KEPT (still has its nearest call), REASSIGNED (another call)
+    or UNMATCHED (lost its call and had no free alternative).
+    """
+    nearest_row, assigned_row = nearest['Panjiva_Row'], assigned['Panjiva_Row']
+    claimants = nearest_row.map(nearest_row.value_counts())
+    same = nearest_row.eq(assigned_row) | (nearest_row.isna() & assigned_row.isna())
+    listed = (claimants > 1) | ~same
+    report = pd.DataFrame({
+        'RECID': usace['RECID'] if 'RECID' in usace.columns else usace.index,
+        'Vessel': usace['Vessel'],
+        port_col: usace[port_col] if port_col in usace.columns else np.nan,
+        date_label: usace['Match_Date'],
+        'Nearest_VOY_RECID': nearest['VOY_RECID'],
+        'Nearest_Panjiva_Row': nearest_row,
+        'Nearest_Days_Offset': nearest['Days_Offset'],
+        'Claimants': claimants,
+        'Assigned_VOY_RECID': assigned['VOY_RECID'],
+        'Assigned_Panjiva_Row': assigned_row,
+        'Assigned_Days_Offset': assigned['Days_Offset'],
+    })[listed]
+    report['Resolution'] = np.select(
+        [same[listed], report['Assigned_Panjiva_Row'].notna()], ['KEPT', 'REASSIGNED'], 'UNMATCHED')
+    return report.sort_values(['Nearest_Panjiva_Row', 'Assigned_Days_Offset']).reset_index(drop=True)
+
+
+def match_port_calls(usace, panjiva, strategies, assignment='nearest', passes=MATCH_PASSES,
+                     fuzzy_threshold=DEFAULT_THRESHOLD, port_col='Port_Name', date_label='Match_Date',
+                     log=print):
+    """
+    Run the key strategies in order; each one only sees the USACE records
+    still unmatched.
+
+    Exact strategies match against every port call in nearest mode and
+    against the calls nobody has claimed yet in one-to-one mode; the fuzzy
+    strategy always takes unclaimed calls. usace needs Vessel, Port_Key and
+    Match_Date (plus IMO for the IMO strategy); panjiva is a
+    panjiva_call_frame() with Port_Key. port_col and date_label name the
+    USACE port and date columns in the conflict report.
+
+    Returns (matches indexed like usace with MATCH_COLUMNS, per strategy/pass
+    stats frame, one-to-one conflict report or None).
+    """
+    unknown = [strategy for strategy in strategies if strategy not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"Unknown key strategies {unknown}; choose from {STRATEGIES}")
+
+    matches = pd.DataFrame(np.nan, index=usace.index, columns=MATCH_COLUMNS).astype(object)
+    claimed = np.zeros(len(panjiva), dtype=bool)
+    stats = []
+    conflicts = []
+
+    for strategy in strategies:
+        start = time.perf_counter()
+        open_rows = matches['VOY_RECID'].isna().to_numpy() & usace['Match_Date'].notna().to_numpy()
+        if strategy == FUZZY_STRATEGY or assignment == 'one-to-one':
+            calls = panjiva[~claimed]
+        else:
+            calls = panjiva
+        log(f"\n   {strategy}: {int(open_rows.sum()):,} records x {len(calls):,} port calls "
+            f"(+/-{max(passes.values())} days, {assignment if strategy != FUZZY_STRATEGY else 'one-to-one'})")
+
+        if strategy == FUZZY_STRATEGY:
+            found = fuzzy_vessel_matches(usace[open_rows], calls, fuzzy_threshold, passes)
+        else:
+            key_func = KEY_STRATEGIES[strategy]
+            records = usace[open_rows].assign(Match_Key=key_func(usace[open_rows]))
+            records = records[records['Match_Key'].notna()]
+            calls = calls.assign(Match_Key=key_func(calls))
+            calls = calls[calls['Match_Key'].notna()]
+            found = nearest_date_matches(records, calls, passes)
+            if assignment == 'one-to-one':
+                nearest = found
+                taken = nearest.dropna(subset=['VOY_RECID'])
+                duplicate_claims = taken['Panjiva_Row'].duplicated()
+                log(f"   Nearest matches: {len(taken):,} claiming {taken['Panjiva_Row'].nunique():,} distinct port calls")
+                log(f"   Double-counted tons under nearest matching: "
+                    f"{pd.to_numeric(taken.loc[duplicate_claims, 'Total_Tons'], errors='coerce').sum():,.0f}")
+                found = one_to_one_matches(records, calls, passes)
+                report = conflict_report(records, nearest, found, port_col, date_label)
+                report['Strategy'] = strategy
+                conflicts.append(report)
+                resolutions = report['Resolution'].value_counts()
+                log(f"   Contested port calls: {int((nearest['Panjiva_Row'].value_counts() > 1).sum()):,}")
+                for resolution in ['KEPT', 'REASSIGNED', 'UNMATCHED']:
+                    log(f"   {resolution:<10}: {int(resolutions.get(resolution, 0)):,} USACE records")
+            found = found.dropna(subset=['VOY_RECID'])
+            found['Name_Score'] = 1.0
+
+        found['Method'] = strategy
+        matches.loc[found.index, found.columns] = found
+        claimed[panjiva.index.get_indexer(pd.Index(found['Panjiva_Row'].unique()))] = True
+        seconds = time.perf_counter() - start
+
+        tried = int(open_rows.sum())
+        pass_counts = found['Pass'].value_counts()
+        for pass_number, tolerance in sorted(passes.items()):
+            matched = int(pass_counts.get(pass_number, 0))
+            stats.append({'Strategy': strategy, 'Pass': pass_number, 'Max_Days_Offset': tolerance,
+                          'Records_Tried': tried, 'Matched': matched,
+                          'Match_Rate_Pct': round(matched / max(len(usace), 1) * 100, 2), 'Seconds': np.nan})
+        stats.append({'Strategy': strategy, 'Pass': 'All', 'Max_Days_Offset': max(passes.values()),
+                      'Records_Tried': tried, 'Matched': len(found),
+                      'Match_Rate_Pct': round(len(found) / max(len(usace), 1) * 100, 2),
+                      'Seconds': round(seconds, 2)})
+        log(f"   [OK] {strategy}: {len(found):,} matches ({len(found) / max(tried, 1) * 100:.1f}% of records tried) "
+            f"in {seconds:.1f}s")
+
+    for column in ['Days_Offset', 'Pass', 'Name_Score', 'Total_Tons']:
+        matches[column] = pd.to_numeric(matches[column], errors='coerce')
+    conflicts = pd.concat(conflicts, ignore_index=True) if conflicts else None
+    return matches, pd.DataFrame(stats), conflicts